@@ -0,0 +1,141 @@
+"""
+Machine-facing analytics endpoints for dashboards: training statistics straight from the database, without the LLM.
+
+Responses carry an ETag derived from the database version; a request whose If-None-Match matches gets
+an empty 304, so polling an unchanged database costs one stat call. The training data export is streamed
+instead and is not tagged.
+"""
+import csv
+import io
+from typing import Any, Callable, Iterator, List, Literal, Optional, Tuple
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from app.db.ciso import get_statistic_summary, fetch_all_employees_with_this_training_status
+from app.db.ciso_export import iter_training_export
+from app.db.common import get_db_version, STATUS_FINISHED, STATUS_IN_PROGRESS, STATUS_NOT_STARTED
+from app.db.regular_employee import fetch_employee_data
+from app.services.llm.llm_config import ROLE_CISO
+from app.services.llm.llm_formatters import format_employees_by_status
+from app.services.session import ChatSession, session_store
+from app.services.serialization import FastJSONResponse, dumps_bytes
+
+ANALYTICS_PAGE_SIZE = 50
+ANALYTICS_MAX_PAGE_SIZE = 500
+# Export rows encoded per streamed chunk; the header is sent on its own so the first byte is immediate
+EXPORT_ROWS_PER_CHUNK = 500
+EXPORT_FORMAT_CSV = "csv"
+EXPORT_FORMAT_NDJSON = "ndjson"
+EXPORT_MEDIA_TYPES = {EXPORT_FORMAT_CSV: "text/csv; charset=utf-8", EXPORT_FORMAT_NDJSON: "application/x-ndjson"}
+
+analytics_router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+
+def require_ciso_session(authorization: Optional[str] = Header(default=None)) -> ChatSession:
+    """Resolve the CISO session from an "Authorization: Bearer <session token>" header."""
+    scheme, _, token = (authorization or "").partition(" ")
+    session = session_store.get(token.strip()) if scheme.lower() == "bearer" else None
+    if session is None:
+        raise HTTPException(status_code=401, detail="A valid session token is required", headers={"WWW-Authenticate": "Bearer"})
+    if session.role != ROLE_CISO:
+        raise HTTPException(status_code=403, detail="Analytics are only available to the CISO")
+    return session
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or any(candidate.removeprefix("W/") == etag for candidate in candidates)
+
+
+def _conditional_response(request: Request, build: Callable[[], Any]) -> Response:
+    """Return 304 when the client's copy is current, otherwise build the body and tag it with the DB version."""
+    etag = f'"{get_db_version()}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    body = build()
+    if body is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    return FastJSONResponse(body, headers=headers)
+
+
+@analytics_router.get("/summary")
+def analytics_summary(request: Request, _: ChatSession = Depends(require_ciso_session)):
+    """Training statistics of all employees, as returned by the statistics tool."""
+    return _conditional_response(request, get_statistic_summary)
+
+
+@analytics_router.get("/employees")
+def analytics_employees_by_status(
+    request: Request,
+    status: Literal[STATUS_FINISHED, STATUS_IN_PROGRESS, STATUS_NOT_STARTED],
+    offset: int = Query(default=0, ge=0),
+    limit: int = Query(default=ANALYTICS_PAGE_SIZE, ge=1, le=ANALYTICS_MAX_PAGE_SIZE),
+    _: ChatSession = Depends(require_ciso_session)
+):
+    """One page of the employees with a training status; count is the total over all pages."""
+    def build():
+        employees = fetch_all_employees_with_this_training_status(status) or []
+        page = format_employees_by_status(employees[offset:offset + limit])
+        return {"employees": page["employees"], "count": len(employees), "offset": offset, "limit": limit}
+    return _conditional_response(request, build)
+
+
+@analytics_router.get("/employees/{employee_id}")
+def analytics_employee_profile(
+    request: Request,
+    employee_id: str,
+    name: str = Query(description="Employee first name"),
+    _: ChatSession = Depends(require_ciso_session)
+):
+    """Personal data, video progress and training status of one employee."""
+    return _conditional_response(request, lambda: fetch_employee_data(employee_id, name))
+
+
+def _csv_chunks(rows: Iterator[Tuple]) -> Iterator[bytes]:
+    """Encode the export as CSV: the header alone, then EXPORT_ROWS_PER_CHUNK rows per chunk."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for count, row in enumerate(rows):
+        writer.writerow(row)
+        if count % EXPORT_ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _ndjson_chunks(rows: Iterator[Tuple]) -> Iterator[bytes]:
+    """Encode the export as one JSON object per employee and line, EXPORT_ROWS_PER_CHUNK lines per chunk."""
+    columns = next(rows)
+    lines: List[bytes] = []
+    for row in rows:
+        lines.append(dumps_bytes(dict(zip(columns, row))))
+        if len(lines) == EXPORT_ROWS_PER_CHUNK:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+
+@analytics_router.get("/export")
+def analytics_export(
+    format: Literal[EXPORT_FORMAT_CSV, EXPORT_FORMAT_NDJSON] = EXPORT_FORMAT_CSV,
+    status: Optional[List[Literal[STATUS_FINISHED, STATUS_IN_PROGRESS, STATUS_NOT_STARTED]]] = Query(default=None),
+    division: Optional[str] = None,
+    _: ChatSession = Depends(require_ciso_session)
+):
+    """
+    Training data of every employee as a CSV or NDJSON download, optionally limited to some statuses
+    (repeat status=) and a division. Rows are streamed from the database cursor in constant memory.
+    """
+    rows = iter_training_export(status, division)
+    encode = _csv_chunks if format == EXPORT_FORMAT_CSV else _ndjson_chunks
+    return StreamingResponse(
+        encode(rows),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="training-export.{format}"'}
+    )
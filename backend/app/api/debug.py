@@ -0,0 +1,41 @@
+"""
+Debug endpoints over the traces recorded by the tracing middleware.
+Spans carry employee IDs, questions and tool arguments, so the traces are only served to the CISO.
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.api.analytics import require_ciso_session
+from app.services.tracing import critical_path, trace_exporter, trace_to_dict
+
+debug_router = APIRouter(prefix="/debug", tags=["debug"], dependencies=[Depends(require_ciso_session)])
+
+
+@debug_router.get("/traces")
+async def recent_traces(
+    limit: int = Query(default=20, ge=1, le=200),
+    min_ms: float = Query(default=0.0, ge=0, description="Only traces at least this slow")
+):
+    """Most recent traces first, each summarised by its duration and critical path."""
+    traces = [trace for trace in trace_exporter.recent() if trace.root.duration_ms >= min_ms][:limit]
+    return {
+        "traces": [
+            {
+                "trace_id": trace.trace_id,
+                "name": trace.root.name,
+                "start": trace.root.start,
+                "duration_ms": trace.root.duration_ms,
+                "status": trace.root.attributes.get("status"),
+                "spans": len(trace.spans),
+                "critical_path": [item.name for item in critical_path(trace)],
+            }
+            for trace in traces
+        ]
+    }
+
+
+@debug_router.get("/traces/{trace_id}")
+async def trace_detail(trace_id: str):
+    """All spans of one trace, with their offsets, self times and critical-path flags."""
+    trace = trace_exporter.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace_to_dict(trace)
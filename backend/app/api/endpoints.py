@@ -1,9 +1,25 @@
 """
 API endpoints for the application.
 """
-from fastapi import APIRouter
-from app.schemas.api_schemas import ChatRequest, ChatResponse
+import asyncio
+from typing import Dict, Tuple
+from fastapi import APIRouter, HTTPException
+from app.schemas.api_schemas import ChatRequest, ChatResponse, ChatBatchRequest, ChatBatchResponse, ChatBatchItem
 from app.services.llm.llm_client import authenticate_employee, regular_employee_query, ciso_query
+from app.services.llm.llm_resilience import request_deadline
+from app.services.llm.llm_metrics import turn_stats
+from app.services.llm.llm_scheduler import scheduler
+from app.services.llm.llm_client_setup import connection_stats
+from app.services.llm.llm_config import (
+    REQUEST_DEADLINE_SECONDS,
+    ROLE_CISO,
+    ROLE_EMPLOYEE,
+    BATCH_CONCURRENCY,
+    ERROR_MESSAGE_PREFIX,
+    DEGRADED_RESPONSE_MESSAGE
+)
+from app.services.session import ChatSession, session_store
+from app.services.tracing import span
 from app.db.verifiers import employee_exists_in_database, is_ciso
 
 api_router = APIRouter()
@@ -13,13 +29,27 @@ async def chat(request: ChatRequest):
     """
     Chat endpoint for direct LLM interaction.
     No authentication required.
+    Successful authentication returns a session token; later turns send only the token and the new message.
+    All LLM calls and tools of the turn share one deadline budget.
     """
-    # Query LLM directly (uses default system prompt)
-    if request.employee_id and request.employee_name and employee_exists_in_database(request.employee_id, request.employee_name):
-        if is_ciso(request.employee_id, request.employee_name):
-            response = await ciso_query(request.message, history=request.history, employee_id=request.employee_id, employee_name=request.employee_name)
+    with request_deadline(REQUEST_DEADLINE_SECONDS):
+        return await _chat(request)
+
+
+async def _chat(request: ChatRequest) -> ChatResponse:
+    """Route a chat message to authentication or to the employee's role."""
+    session = session_store.get(request.session_token)
+    if session is not None:
+        return await _session_chat(session, request.message)
+    # Clients without a session send their identity and full history on every turn
+    with span("verify_identity"):
+        verified = bool(request.employee_id and request.employee_name and employee_exists_in_database(request.employee_id, request.employee_name))
+        ciso = verified and is_ciso(request.employee_id, request.employee_name)
+    if verified:
+        if ciso:
+            response = await ciso_query(request.message, history=request.history, employee_id=request.employee_id, employee_name=request.employee_name, session_id=request.session_id)
         else:
-            response = await regular_employee_query(request.message, history=request.history, employee_id=request.employee_id, employee_name=request.employee_name)
+            response = await regular_employee_query(request.message, history=request.history, employee_id=request.employee_id, employee_name=request.employee_name, session_id=request.session_id)
         return ChatResponse(
             message=response["message"],
             employee_id=request.employee_id,
@@ -27,9 +57,101 @@ async def chat(request: ChatRequest):
         )
     else:
         response = await authenticate_employee(request.message, history=request.history)
+        session_token = None
+        if response["employee_id"] and response["employee_first_name"]:
+            # The role is resolved once here and kept in the session for all later turns
+            role = ROLE_CISO if is_ciso(response["employee_id"], response["employee_first_name"]) else ROLE_EMPLOYEE
+            session_token = session_store.create(response["employee_id"], response["employee_first_name"], role).token
         return ChatResponse(
             message=response["message"],
             employee_id=response["employee_id"],
-            employee_name=response["employee_first_name"]
+            employee_name=response["employee_first_name"],
+            session_token=session_token
         )
 
+
+async def _session_chat(session: ChatSession, message: str) -> ChatResponse:
+    """Answer a turn of an authenticated session from its stored role and conversation log."""
+    query = ciso_query if session.role == ROLE_CISO else regular_employee_query
+    response = await query(
+        message,
+        history=session.history(),
+        employee_id=session.employee_id,
+        employee_name=session.employee_name,
+        session_id=session.session_id,
+        turn=session.turns
+    )
+    session.record_turn(message, response["message"])
+    session_store.touch(session)
+    return ChatResponse(
+        message=response["message"],
+        employee_id=session.employee_id,
+        employee_name=session.employee_name,
+        session_token=session.token
+    )
+
+
+@api_router.post("/chat/batch", response_model=ChatBatchResponse)
+async def chat_batch(request: ChatBatchRequest):
+    """
+    Answer a list of independent questions for one authenticated employee, e.g. for CISO reporting.
+    The employee is resolved once, identical questions are answered once, and the rest run concurrently.
+    Results keep the order of the questions; a failed question is reported in its item's error.
+    """
+    employee_id, employee_name, role = _resolve_principal(request)
+    query = ciso_query if role == ROLE_CISO else regular_employee_query
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def answer(message: str) -> ChatBatchItem:
+        async with semaphore:
+            # Each question gets its own deadline, started when it leaves the batch queue
+            with request_deadline(REQUEST_DEADLINE_SECONDS):
+                try:
+                    response = await query(message, employee_id=employee_id, employee_name=employee_name)
+                except Exception as e:
+                    return ChatBatchItem(error=str(e))
+        text = response["message"]
+        if text.startswith(ERROR_MESSAGE_PREFIX) or text == DEGRADED_RESPONSE_MESSAGE:
+            return ChatBatchItem(error=text)
+        return ChatBatchItem(message=text)
+
+    # Duplicates share one task; answers repeated across batches come from the LLM cache
+    tasks: Dict[str, asyncio.Task] = {}
+    for message in request.messages:
+        if message not in tasks:
+            tasks[message] = asyncio.create_task(answer(message))
+    await asyncio.gather(*tasks.values())
+    return ChatBatchResponse(
+        results=[tasks[message].result() for message in request.messages],
+        employee_id=employee_id,
+        employee_name=employee_name
+    )
+
+
+def _resolve_principal(request: ChatBatchRequest) -> Tuple[str, str, str]:
+    """(employee_id, employee_name, role) from the session token, or from verified credentials."""
+    session = session_store.get(request.session_token)
+    if session is not None:
+        return session.employee_id, session.employee_name, session.role
+    if request.employee_id and request.employee_name and employee_exists_in_database(request.employee_id, request.employee_name):
+        role = ROLE_CISO if is_ciso(request.employee_id, request.employee_name) else ROLE_EMPLOYEE
+        return request.employee_id, request.employee_name, role
+    raise HTTPException(status_code=401, detail="Batch requests need a valid session_token or employee credentials")
+
+
+@api_router.get("/metrics/llm")
+async def llm_metrics():
+    """Rolling per-role, per-query-type token, latency and cache statistics of chat turns."""
+    return turn_stats.snapshot()
+
+
+@api_router.get("/metrics/llm/scheduler")
+async def llm_scheduler_metrics():
+    """Concurrency, token budget, queue depth and admission wait times of the LLM scheduler."""
+    return scheduler.stats()
+
+
+@api_router.get("/metrics/llm/connections")
+async def llm_connection_metrics():
+    """Requests to OpenAI against new connections and TLS handshakes of the shared connection pool."""
+    return connection_stats.snapshot()
@@ -1,11 +1,12 @@
 """CISO-specific functions for analytics and statistics."""
+from collections import Counter
 from typing import Optional, List, Dict, Any, Tuple
 from app.services.cache.db_cache import cache_analytics
 from app.db.common import (
     _execute_query,
+    get_db_connection,
     _build_status_query,
     _extract_employee_info,
-    VIDEO_FINISH_COLUMNS,
     STATUS_FINISHED,
     STATUS_IN_PROGRESS,
     STATUS_NOT_STARTED,
@@ -14,11 +15,49 @@ from app.db.common import (
 )
 from app.db.regular_employee import calculate_employee_time_to_finish_training
 
+MINUTES_PER_DAY = 24 * 60
+LEADERBOARD_ORDER_FASTEST = "fastest"
+LEADERBOARD_ORDER_SLOWEST = "slowest"
+# Rows fetched from SQLite per round trip by the funnel scan
+FUNNEL_FETCH_SIZE = 5_000
+
+# Every (employee, video) state row with the employee's next row, in primary key order. Timestamps are
+# parsed once per row and durations are whole minutes; a next video started before this one was finished
+# counts as no gap.
+_FUNNEL_QUERY = f"""
+SELECT
+    VIDEO_ID,
+    started IS NOT NULL,
+    finished IS NOT NULL,
+    CAST(round((finished - started) * {MINUTES_PER_DAY}) AS INTEGER),
+    lead(VIDEO_ID) OVER employee_videos,
+    CAST(max(0, round((lead(started) OVER employee_videos - finished) * {MINUTES_PER_DAY})) AS INTEGER)
+FROM (
+    SELECT EMPLOYEE_ID, VIDEO_ID, julianday(STARTED_AT) AS started, julianday(FINISHED_AT) AS finished
+    FROM employee_video_state
+)
+WINDOW employee_videos AS (PARTITION BY EMPLOYEE_ID ORDER BY VIDEO_ID)
+"""
+
+# Employees of a status ranked by the days from their first start to their last finish, ties broken by ID in
+# the same direction. The ORDER BY matches idx_employee_training_state_status_days, so SQLite walks the index
+# of the status from either end and stops after K rows (or K rows of the division) instead of sorting.
+_LEADERBOARD_QUERY = """
+SELECT
+    e.EMPLOYEE_ID, e.EMPLOYEE_NAME, e.EMPLOYEE_LAST_NAME, e.EMPLOYEE_DIVISION,
+    julianday(t.LAST_FINISH) - julianday(t.FIRST_START) AS days
+FROM employee_training_state t
+JOIN employees e ON e.EMPLOYEE_ID = t.EMPLOYEE_ID
+WHERE t.STATUS = ? AND t.LAST_FINISH IS NOT NULL {division_filter}
+ORDER BY days {direction}, t.EMPLOYEE_ID {direction}
+LIMIT ?
+"""
+
 
 @cache_analytics
 def fetch_all_employees_with_this_training_status(status: str) -> Optional[List[Tuple]]:
     """Fetch all employees with a given training status."""
-    query = _build_status_query(status, VIDEO_FINISH_COLUMNS)
+    query = _build_status_query(status)
     return _execute_query(query, fetch_one=False)
 
 
@@ -71,3 +110,111 @@ def calculate_time_to_finish_training(
         "average_time_to_finish_training": average_time,
     }
 
+
+def _minutes_distribution(minutes: Counter) -> Dict[str, Any]:
+    """Count, median, 90th percentile and mean in days of a histogram of whole minutes."""
+    count = sum(minutes.values())
+    if not count:
+        return {"count": 0, "median_days": None, "p90_days": None, "mean_days": None}
+    quantiles, seen = {}, 0
+    targets = [("median_days", (count - 1) // 2), ("p90_days", int((count - 1) * 0.9))]
+    for value in sorted(minutes):
+        seen += minutes[value]
+        while targets and targets[0][1] < seen:
+            quantiles[targets.pop(0)[0]] = round(value / MINUTES_PER_DAY, 4)
+    mean = sum(value * n for value, n in minutes.items()) / count
+    return {"count": count, **quantiles, "mean_days": round(mean / MINUTES_PER_DAY, 4)}
+
+
+@cache_analytics
+def get_video_funnel() -> Dict[str, Any]:
+    """
+    Per-video training funnel in catalog order: how many employees started and finished each video,
+    how many stalled in it (started, never finished) or after it (finished, never started the next one),
+    and the distributions of the time spent watching it and of the gap before starting the next one.
+
+    All stages come from one scan of the per-video state; the latencies are kept as histograms of
+    whole minutes, so memory depends on the spread of durations and not on the number of employees.
+    """
+    with get_db_connection() as conn:
+        catalog = conn.execute("SELECT VIDEO_ID, VIDEO_NAME FROM training_videos ORDER BY VIDEO_ID").fetchall()
+        total_employees = conn.execute("SELECT count(*) FROM employees").fetchone()[0]
+        position = {video_id: index for index, (video_id, _) in enumerate(catalog)}
+        next_video = {video_id: catalog[index + 1][0] for index, (video_id, _) in enumerate(catalog[:-1])}
+        started, finished, stalled = [0] * len(catalog), [0] * len(catalog), [0] * len(catalog)
+        dropped = [0] * len(catalog)
+        watch_minutes = [Counter() for _ in catalog]
+        gap_minutes = [Counter() for _ in catalog]
+
+        cursor = conn.execute(_FUNNEL_QUERY)
+        while True:
+            rows = cursor.fetchmany(FUNNEL_FETCH_SIZE)
+            if not rows:
+                break
+            for video_id, has_start, has_finish, watched, following, gap in rows:
+                index = position[video_id]
+                started[index] += has_start
+                if not has_finish:
+                    stalled[index] += has_start
+                    continue
+                finished[index] += 1
+                if watched is not None:
+                    watch_minutes[index][watched] += 1
+                if video_id in next_video:
+                    # The next row is the next video of the catalog only if the employee touched it
+                    if gap is not None and following == next_video[video_id]:
+                        gap_minutes[index][gap] += 1
+                    else:
+                        dropped[index] += 1
+
+    stages = []
+    for index, (video_id, video_name) in enumerate(catalog):
+        stage = {
+            "video": video_name,
+            "started": started[index],
+            "finished": finished[index],
+            "started_not_finished": stalled[index],
+            "watch_time": _minutes_distribution(watch_minutes[index]),
+        }
+        if video_id in next_video:
+            stage["finished_not_started_next"] = dropped[index]
+            stage["gap_to_next_video"] = _minutes_distribution(gap_minutes[index])
+        stages.append(stage)
+    return {"total_employees": total_employees, "stages": stages}
+
+
+@cache_analytics
+def get_time_to_finish_leaderboard(
+    k: int,
+    order: str = LEADERBOARD_ORDER_FASTEST,
+    division: Optional[str] = None,
+    status: str = STATUS_FINISHED
+) -> List[Dict[str, Any]]:
+    """
+    The k fastest or slowest employees of a training status, optionally in one division, with the days from
+    their first start to their last finish (the time to finish the training for FINISHED employees, the
+    time spent so far for IN_PROGRESS ones). Employees who finished no video have no time and are not ranked.
+    """
+    if order not in (LEADERBOARD_ORDER_FASTEST, LEADERBOARD_ORDER_SLOWEST):
+        raise ValueError(f"Unknown leaderboard order '{order}'")
+    if status not in (STATUS_FINISHED, STATUS_IN_PROGRESS, STATUS_NOT_STARTED):
+        raise ValueError(f"Unknown training status '{status}'")
+    if k < 1:
+        raise ValueError("k must be at least 1")
+    query = _LEADERBOARD_QUERY.format(
+        division_filter="AND e.EMPLOYEE_DIVISION = ?" if division else "",
+        direction="DESC" if order == LEADERBOARD_ORDER_SLOWEST else "ASC"
+    )
+    params = (status, division, k) if division else (status, k)
+    rows = _execute_query(query, params, fetch_one=False) or []
+    return [
+        {
+            "rank": rank,
+            "employee_id": employee_id,
+            "employee_name": first_name,
+            "employee_last_name": last_name,
+            "employee_division": employee_division,
+            "days": days,
+        }
+        for rank, (employee_id, first_name, last_name, employee_division, days) in enumerate(rows, start=1)
+    ]
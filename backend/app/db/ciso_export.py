@@ -0,0 +1,86 @@
+"""
+Row-by-row export of every employee's training data for the CISO, for CSV and NDJSON downloads.
+
+Rows are read from a single cursor and grouped per employee as they arrive, so memory stays constant
+whatever the number of employees and the first row is available as soon as SQLite returns it.
+Columns follow fetch_employee_data and _build_video_data: personal data, training status, then the
+start, finish and time to finish of every video of the catalog. Durations are computed in SQL.
+"""
+from typing import Iterator, List, Optional, Sequence, Tuple
+from app.db.common import get_db_connection, STATUS_FINISHED, STATUS_NOT_STARTED
+
+# Rows fetched from SQLite per round trip
+EXPORT_FETCH_SIZE = 2_000
+
+EXPORT_PERSONAL_COLUMNS = ["employee_id", "employee_name", "employee_last_name", "employee_division"]
+EXPORT_TRAINING_COLUMNS = ["training_status", "first_start_time", "last_finish_time", "time_to_finish_training"]
+
+# One row per employee and catalog video, ordered so each employee's videos are adjacent
+_EXPORT_QUERY = f"""
+SELECT
+    e.EMPLOYEE_ID, e.EMPLOYEE_NAME, e.EMPLOYEE_LAST_NAME, e.EMPLOYEE_DIVISION,
+    coalesce(t.STATUS, '{STATUS_NOT_STARTED}'), t.FIRST_START, t.LAST_FINISH,
+    CASE WHEN t.STATUS = '{STATUS_FINISHED}' THEN round(julianday(t.LAST_FINISH) - julianday(t.FIRST_START), 6) END,
+    s.STARTED_AT, s.FINISHED_AT,
+    coalesce(round(julianday(s.FINISHED_AT) - julianday(s.STARTED_AT), 6), 0.0)
+FROM employees e
+LEFT JOIN employee_training_state t ON t.EMPLOYEE_ID = e.EMPLOYEE_ID
+CROSS JOIN training_videos v
+LEFT JOIN employee_video_state s ON s.EMPLOYEE_ID = e.EMPLOYEE_ID AND s.VIDEO_ID = v.VIDEO_ID
+{{where}}
+ORDER BY e.EMPLOYEE_ID, v.VIDEO_ID
+"""
+
+
+def export_columns(video_names: Sequence[str]) -> List[str]:
+    """Header of the export for a catalog of videos."""
+    video_columns = []
+    for video_name in video_names:
+        video_columns += [
+            f"started_{video_name}_video_time",
+            f"finished_{video_name}_video_time",
+            f"time_to_finish_{video_name}_video",
+        ]
+    return EXPORT_PERSONAL_COLUMNS + EXPORT_TRAINING_COLUMNS + video_columns
+
+
+def _filters(statuses: Optional[Sequence[str]], division: Optional[str]) -> Tuple[str, Tuple]:
+    conditions, params = [], ()
+    if statuses:
+        conditions.append(f"coalesce(t.STATUS, '{STATUS_NOT_STARTED}') IN ({', '.join('?' * len(statuses))})")
+        params += tuple(statuses)
+    if division:
+        conditions.append("e.EMPLOYEE_DIVISION = ?")
+        params += (division,)
+    return (f"WHERE {' AND '.join(conditions)}" if conditions else ""), params
+
+
+def iter_training_export(
+    statuses: Optional[Sequence[str]] = None,
+    division: Optional[str] = None
+) -> Iterator[Tuple]:
+    """
+    Yield the export header, then one tuple per employee in employee ID order, optionally limited to some
+    training statuses and a division. The connection may be used from different threads between rows.
+    """
+    where, params = _filters(statuses, division)
+    with get_db_connection(check_same_thread=False) as conn:
+        video_names = [row[0] for row in conn.execute("SELECT VIDEO_NAME FROM training_videos ORDER BY VIDEO_ID")]
+        yield tuple(export_columns(video_names))
+        if not video_names:
+            return
+
+        cursor = conn.execute(_EXPORT_QUERY.format(where=where), params)
+        current_id, current = None, []
+        while True:
+            rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                if row[0] != current_id:
+                    if current:
+                        yield tuple(current)
+                    current_id, current = row[0], list(row[:8])
+                current += row[8:]
+        if current:
+            yield tuple(current)
@@ -0,0 +1,180 @@
+"""
+Completion velocity for the CISO: training completions per day or week with the cumulative finished
+share, and per-video starts and finishes per bucket.
+
+Each series is computed by one grouped query, with the running total of completions taken by a window
+function. Series are cached per granularity and extended incrementally: when the database changes,
+only the buckets from the newest cached one (or from the earliest new event, if events arrived out of
+order) onwards are recomputed through the time indexes, and older buckets are kept. Registering a
+video or rebuilding the state from an edited log may change any bucket; both bump the state generation
+of the database, which triggers a full recomputation.
+"""
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from app.db.common import get_db_connection, get_db_version, logger, STATUS_FINISHED
+from app.db.training_events import state_generation
+from app.services.tracing import span
+
+GRANULARITY_DAY = "day"
+GRANULARITY_WEEK = "week"
+# SQL expression of the bucket a timestamp falls in; weeks start on Monday
+BUCKET_EXPRESSIONS = {
+    GRANULARITY_DAY: "date({column})",
+    GRANULARITY_WEEK: "date({column}, 'weekday 0', '-6 days')",
+}
+
+# Completions per bucket from the given bucket on, with the running total offset by the earlier completions
+_COMPLETIONS_QUERY = f"""
+SELECT bucket, completed, ? + sum(completed) OVER (ORDER BY bucket) AS cumulative
+FROM (
+    SELECT {{bucket}} AS bucket, count(*) AS completed
+    FROM employee_training_state
+    WHERE STATUS = '{STATUS_FINISHED}' AND LAST_FINISH >= ?
+    GROUP BY bucket
+)
+ORDER BY bucket
+"""
+
+# First starts and first finishes per video and bucket from the given bucket on. Every state timestamp
+# comes from an event at that time, so only pairs with an event since then are read.
+_VIDEO_ACTIVITY_QUERY = """
+SELECT v.VIDEO_NAME, a.bucket, a.started, a.finished
+FROM (
+    SELECT VIDEO_ID, bucket, sum(is_start) AS started, count(*) - sum(is_start) AS finished
+    FROM (
+        SELECT s.VIDEO_ID, {started_bucket} AS bucket, 1 AS is_start FROM employee_video_state s
+        WHERE s.STARTED_AT >= ?1 {pairs_filter}
+        UNION ALL
+        SELECT s.VIDEO_ID, {finished_bucket} AS bucket, 0 AS is_start FROM employee_video_state s
+        WHERE s.FINISHED_AT >= ?1 {pairs_filter}
+    )
+    GROUP BY VIDEO_ID, bucket
+) a
+JOIN training_videos v ON v.VIDEO_ID = a.VIDEO_ID
+ORDER BY a.bucket, a.VIDEO_ID
+"""
+_RECENT_PAIRS_FILTER = (
+    "AND (s.EMPLOYEE_ID, s.VIDEO_ID) IN "
+    "(SELECT EMPLOYEE_ID, VIDEO_ID FROM training_events WHERE EVENT_TIME >= ?1)"
+)
+
+
+@dataclass
+class _Series:
+    """Cached series of one granularity and the database state it reflects."""
+    db_version: str
+    generation: int
+    event_watermark: int
+    catalog: Tuple[str, ...]
+    total_employees: int
+    # bucket -> (completed, cumulative)
+    completions: Dict[str, Tuple[int, int]] = field(default_factory=dict)
+    # (bucket, video) -> (started, finished), in bucket then catalog order
+    video_activity: Dict[Tuple[str, str], Tuple[int, int]] = field(default_factory=dict)
+
+    def newest_bucket(self) -> Optional[str]:
+        buckets = list(self.completions) + [bucket for bucket, _ in self.video_activity]
+        return max(buckets) if buckets else None
+
+
+_series_cache: Dict[str, _Series] = {}
+_series_lock = threading.Lock()
+
+
+def _bucket(granularity: str, column: str) -> str:
+    return BUCKET_EXPRESSIONS[granularity].format(column=column)
+
+
+def _recompute_from(conn, granularity: str, series: _Series, from_bucket: str, incremental: bool) -> None:
+    """Replace the buckets of series from from_bucket on with freshly queried ones."""
+    earlier = [counts for bucket, counts in series.completions.items() if bucket < from_bucket]
+    offset = earlier[-1][1] if earlier else 0
+    series.completions = {bucket: counts for bucket, counts in series.completions.items() if bucket < from_bucket}
+    for bucket, completed, cumulative in conn.execute(
+        _COMPLETIONS_QUERY.format(bucket=_bucket(granularity, "LAST_FINISH")), (offset, from_bucket)
+    ):
+        series.completions[bucket] = (completed, cumulative)
+
+    series.video_activity = {key: counts for key, counts in series.video_activity.items() if key[0] < from_bucket}
+    query = _VIDEO_ACTIVITY_QUERY.format(
+        started_bucket=_bucket(granularity, "s.STARTED_AT"),
+        finished_bucket=_bucket(granularity, "s.FINISHED_AT"),
+        pairs_filter=_RECENT_PAIRS_FILTER if incremental else ""
+    )
+    for video_name, bucket, started, finished in conn.execute(query, (from_bucket,)):
+        series.video_activity[(bucket, video_name)] = (started, finished)
+
+
+def _refresh(granularity: str) -> _Series:
+    """The cached series of this granularity, brought up to date with the database. Call with the lock held."""
+    version = get_db_version()
+    cached = _series_cache.get(granularity)
+    if cached is not None and cached.db_version == version:
+        return cached
+
+    with get_db_connection() as conn:
+        generation = state_generation(conn)
+        event_watermark = conn.execute("SELECT coalesce(max(EVENT_ID), 0) FROM training_events").fetchone()[0]
+        catalog = tuple(row[0] for row in conn.execute("SELECT VIDEO_NAME FROM training_videos ORDER BY VIDEO_ID"))
+        total_employees = conn.execute("SELECT count(*) FROM employees").fetchone()[0]
+        newest = cached.newest_bucket() if cached is not None else None
+
+        extensible = (
+            cached is not None and newest is not None and cached.generation == generation
+            and cached.catalog == catalog and event_watermark >= cached.event_watermark
+        )
+        if extensible:
+            earliest_new = conn.execute(
+                f"SELECT {_bucket(granularity, 'min(EVENT_TIME)')} FROM training_events WHERE EVENT_ID > ?",
+                (cached.event_watermark,)
+            ).fetchone()[0]
+            from_bucket = min(newest, earliest_new) if earliest_new else newest
+            series, incremental = cached, True
+        else:
+            from_bucket = ""
+            series, incremental = _Series(version, generation, event_watermark, catalog, total_employees), False
+
+        with span("timeseries.recompute", granularity=granularity, from_bucket=from_bucket or "start"):
+            _recompute_from(conn, granularity, series, from_bucket, incremental)
+
+    series.db_version, series.generation = version, generation
+    series.event_watermark, series.total_employees = event_watermark, total_employees
+    _series_cache[granularity] = series
+    logger.info(f"Completion time series ({granularity}) recomputed from {from_bucket or 'the first bucket'}")
+    return series
+
+
+def get_completion_timeseries(granularity: str = GRANULARITY_WEEK) -> Dict[str, Any]:
+    """
+    Completions per bucket with the cumulative count and share of all employees finished by then,
+    and per-video first starts and finishes per bucket. Buckets are dates (a week is named by its Monday).
+    """
+    if granularity not in BUCKET_EXPRESSIONS:
+        raise ValueError(f"Unknown granularity '{granularity}', expected one of {sorted(BUCKET_EXPRESSIONS)}")
+    with _series_lock:
+        series = _refresh(granularity)
+        total = series.total_employees
+        return {
+            "granularity": granularity,
+            "total_employees": total,
+            "completions": [
+                {
+                    "bucket": bucket,
+                    "completed": completed,
+                    "cumulative_completed": cumulative,
+                    "cumulative_finished_percentage": round(100 * cumulative / total, 2) if total else 0.0,
+                }
+                for bucket, (completed, cumulative) in sorted(series.completions.items())
+            ],
+            "video_activity": [
+                {"bucket": bucket, "video": video, "started": started, "finished": finished}
+                for (bucket, video), (started, finished) in series.video_activity.items()
+            ],
+        }
+
+
+def clear_timeseries_cache() -> None:
+    """Drop the cached series, so the next call recomputes them in full."""
+    with _series_lock:
+        _series_cache.clear()
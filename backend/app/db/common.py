@@ -1,9 +1,12 @@
+import os
 import sqlite3
 from pathlib import Path
 import logging
+import threading
 from datetime import datetime
 from typing import Optional, Tuple, List, Dict, Any
 from contextlib import contextmanager
+from app.services.tracing import span
 
 # Get the database path relative to this file
 # In Docker: backend/ is mounted to /app, so backend/app/db/queries.py becomes /app/app/db/queries.py
@@ -24,7 +27,8 @@ STATUS_NOT_STARTED = "NOT_STARTED"
 # Division constants
 DIVISION_CISO = "CISO"
 
-# Video column names
+# Legacy wide video columns of the employees table; training progress now lives in the training_events
+# log and the state tables maintained from it (app.db.training_events), seeded from these columns
 VIDEO_NAMES = ["first", "second", "third", "fourth"]
 VIDEO_START_COLUMNS = [
     "START_FIRST_VIDEO_DATE",
@@ -43,21 +47,58 @@ VIDEO_FINISH_COLUMNS = [
 COL_EMPLOYEE_ID = 0
 COL_EMPLOYEE_NAME = 1
 COL_EMPLOYEE_LAST_NAME = 2
-COL_START_FIRST_VIDEO = 4
-COL_FINISH_FIRST_VIDEO = 5
-COL_START_SECOND_VIDEO = 6
-COL_FINISH_SECOND_VIDEO = 7
-COL_START_THIRD_VIDEO = 8
-COL_FINISH_THIRD_VIDEO = 9
-COL_START_FOURTH_VIDEO = 10
-COL_FINISH_FOURTH_VIDEO = 11
+# Status query rows additionally carry the first start and last finish of the training
+COL_FIRST_START = 4
+COL_LAST_FINISH = 5
+
+_migrated_paths = set()
+_migrated_lock = threading.Lock()
+
+
+def _ensure_migrated(conn: sqlite3.Connection) -> None:
+    """Create the training event and state tables once per database file."""
+    if DB_PATH in _migrated_paths:
+        return
+    from app.db.training_events import ensure_training_state
+    with _migrated_lock:
+        if DB_PATH in _migrated_paths:
+            return
+        ensure_training_state(conn)
+        _migrated_paths.add(DB_PATH)
 
 
 @contextmanager
-def get_db_connection():
-    """Context manager for database connections."""
-    with sqlite3.connect(DB_PATH) as conn:
-        yield conn
+def get_db_connection(check_same_thread: bool = True):
+    """
+    Context manager for database connections; commits on success and closes the connection.
+    Pass check_same_thread=False for a connection used from several threads in turn, e.g. by a streamed response.
+    """
+    conn = sqlite3.connect(DB_PATH, check_same_thread=check_same_thread)
+    try:
+        _ensure_migrated(conn)
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+def get_db_version() -> str:
+    """
+    Version tag of the database, from the modification time and size of the database file and its WAL.
+    It changes whenever the database is written, so it can validate caches and ETags.
+    """
+    if DB_PATH not in _migrated_paths:
+        # The first connection migrates the file; a version taken before that would be stale right away
+        with get_db_connection():
+            pass
+    parts = []
+    for path in (DB_PATH, DB_PATH.with_name(DB_PATH.name + "-wal")):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        parts.append(f"{stat.st_mtime_ns:x}.{stat.st_size:x}")
+    return "-".join(parts)
 
 
 def _parse_date(date_str: Optional[str]) -> Optional[datetime]:
@@ -70,16 +111,6 @@ def _parse_date(date_str: Optional[str]) -> Optional[datetime]:
         return None
 
 
-def _parse_dates(date_strings: List[Optional[str]]) -> List[datetime]:
-    """Parse a list of date strings, filtering out None and invalid dates."""
-    valid_dates = []
-    for date_str in date_strings:
-        parsed = _parse_date(date_str)
-        if parsed is not None:
-            valid_dates.append(parsed)
-    return valid_dates
-
-
 def _days_between_dates(finish_date: Optional[datetime], start_date: Optional[datetime]) -> float:
     """Calculate days between two datetime objects."""
     if finish_date is None or start_date is None:
@@ -95,7 +126,7 @@ def _execute_query(
 ) -> Optional[Any]:
     """Execute a database query and return results."""
     try:
-        with get_db_connection() as conn:
+        with span("db.query", sql=" ".join(query.split())[:120]), get_db_connection() as conn:
             cursor = conn.cursor()
             cursor.execute(query, params or ())
             return cursor.fetchone() if fetch_one else cursor.fetchall()
@@ -122,30 +153,20 @@ def _get_employee_by_id_and_name(
     return _execute_query(base_query, params, fetch_one=True)
 
 
-def _calculate_training_status_from_finish_dates(finish_dates: List[Optional[str]]) -> str:
-    """Calculate training status from a list of finish dates."""
-    finished_count = sum(1 for date in finish_dates if date is not None)
-    
-    if finished_count == 0:
-        return STATUS_NOT_STARTED
-    elif finished_count == NUM_VIDEOS:
-        return STATUS_FINISHED
-    else:
-        return STATUS_IN_PROGRESS
-
-
-def _build_status_query(status: str, finish_columns: List[str]) -> str:
-    """Build SQL query for fetching employees by training status."""
-    if status == STATUS_FINISHED:
-        conditions = " AND ".join(f"{col} IS NOT NULL" for col in finish_columns)
-        return f"SELECT * FROM employees WHERE {conditions}"
-    elif status == STATUS_IN_PROGRESS:
-        any_finished = " OR ".join(f"{col} IS NOT NULL" for col in finish_columns)
-        all_finished = " AND ".join(f"{col} IS NOT NULL" for col in finish_columns)
-        return f"SELECT * FROM employees WHERE ({any_finished}) AND NOT ({all_finished})"
+def _build_status_query(status: str) -> str:
+    """Build SQL query for fetching employees by training status, with their first start and last finish."""
+    columns = "e.EMPLOYEE_ID, e.EMPLOYEE_NAME, e.EMPLOYEE_LAST_NAME, e.EMPLOYEE_DIVISION, t.FIRST_START, t.LAST_FINISH"
+    if status in (STATUS_FINISHED, STATUS_IN_PROGRESS):
+        return (
+            f"SELECT {columns} FROM employee_training_state t "
+            f"JOIN employees e ON e.EMPLOYEE_ID = t.EMPLOYEE_ID WHERE t.STATUS = '{status}'"
+        )
     elif status == STATUS_NOT_STARTED:
-        conditions = " AND ".join(f"{col} IS NULL" for col in finish_columns)
-        return f"SELECT * FROM employees WHERE {conditions}"
+        # Employees without any event have no state row yet
+        return (
+            f"SELECT {columns} FROM employees e LEFT JOIN employee_training_state t ON t.EMPLOYEE_ID = e.EMPLOYEE_ID "
+            f"WHERE t.STATUS IS NULL OR t.STATUS = '{STATUS_NOT_STARTED}'"
+        )
     else:
         logger.warning(f"Unknown status: {status}")
         return "SELECT * FROM employees WHERE 1=0"  # Return empty result
@@ -158,17 +179,13 @@ def calculate_time_diff(finish_date: Optional[str], start_date: Optional[str]) -
     return _days_between_dates(finish_dt, start_dt)
 
 
-def _build_video_data(result: Tuple, video_names: List[str]) -> Dict[str, Any]:
-    """Build video data dictionary from query result tuple."""
+def _build_video_data(videos: List[Tuple[str, Optional[str], Optional[str]]]) -> Dict[str, Any]:
+    """Build video data dictionary from (video name, start time, finish time) rows."""
     video_data = {}
-    for i, video_name in enumerate(video_names):
-        start_idx = i * 2
-        finish_idx = start_idx + 1
-        video_data[f"started_{video_name}_video_time"] = result[start_idx]
-        video_data[f"finished_{video_name}_video_time"] = result[finish_idx]
-        video_data[f"time_to_finish_{video_name}_video"] = calculate_time_diff(
-            result[finish_idx], result[start_idx]
-        )
+    for video_name, started, finished in videos:
+        video_data[f"started_{video_name}_video_time"] = started
+        video_data[f"finished_{video_name}_video_time"] = finished
+        video_data[f"time_to_finish_{video_name}_video"] = calculate_time_diff(finished, started)
     return video_data
 
 
@@ -179,25 +196,3 @@ def _extract_employee_info(employee_tuple: Tuple, employee_id: str, employee_nam
         "employee_last_name": employee_tuple[COL_EMPLOYEE_LAST_NAME],
         "employee_id": employee_tuple[COL_EMPLOYEE_ID]
     }
-
-
-def _get_video_dates_from_employee_tuple(employee: Tuple) -> Tuple[List[Optional[str]], List[Optional[str]]]:
-    """Extract start and finish dates from employee tuple."""
-    start_date_indices = [
-        COL_START_FIRST_VIDEO,
-        COL_START_SECOND_VIDEO,
-        COL_START_THIRD_VIDEO,
-        COL_START_FOURTH_VIDEO
-    ]
-    finish_date_indices = [
-        COL_FINISH_FIRST_VIDEO,
-        COL_FINISH_SECOND_VIDEO,
-        COL_FINISH_THIRD_VIDEO,
-        COL_FINISH_FOURTH_VIDEO
-    ]
-    
-    start_dates = [employee[idx] for idx in start_date_indices]
-    finish_dates = [employee[idx] for idx in finish_date_indices]
-    
-    return start_dates, finish_dates
-
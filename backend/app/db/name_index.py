@@ -0,0 +1,200 @@
+"""
+In-memory trigram index over employee first and last names for approximate lookups.
+
+Names are lower-cased and split into words; each word is padded ("  bob ") and cut into trigrams,
+so short names and word starts still match. A query is scored against an employee by the Dice
+coefficient of their trigram sets, taking the better of the first name alone and the full name.
+
+Logins only accept the stored first name in another casing (exact_first_name) and never reveal a
+similar name. Auto-correction against the first or full name (resolve_employee_name) is meant for
+lookups by an already authenticated CISO.
+
+The index follows the database: before each lookup through the module functions it compares the database version with the one it
+was built from and, if they differ, re-reads the names and re-indexes only the employees that were
+added, changed or removed.
+"""
+import heapq
+import threading
+from collections import defaultdict
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+from app.db.common import _execute_query, get_db_version, logger
+from app.services.tracing import span
+
+# Minimum similarity to silently replace a misspelled first name by the stored one
+AUTO_CORRECT_SIMILARITY = 0.5
+# Minimum similarity for a candidate to be suggested
+SUGGEST_SIMILARITY = 0.3
+DEFAULT_SUGGESTIONS = 5
+
+
+class NameMatch(NamedTuple):
+    employee_id: str
+    employee_name: str
+    employee_last_name: Optional[str]
+    score: float
+
+
+def trigrams(text: Optional[str]) -> FrozenSet[str]:
+    """Trigrams of the lower-cased words of text, each word padded with two leading blanks and one trailing."""
+    grams: Set[str] = set()
+    for word in (text or "").lower().split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Dice coefficient of two trigram sets."""
+    if not a or not b:
+        return 0.0
+    return 2 * len(a & b) / (len(a) + len(b))
+
+
+Name = Tuple[str, Optional[str]]
+
+
+class EmployeeNameIndex:
+    """
+    Trigram postings over the distinct (first name, last name) pairs of the employees table, so
+    employees sharing a name are scored once. Kept in step with the table by refresh().
+    """
+
+    def __init__(self) -> None:
+        # Guards the structures below; lookups hold it only for microseconds
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self._names: Dict[str, Name] = {}
+        self._ids_by_name: Dict[Name, Set[str]] = {}
+        self._grams: Dict[Name, Tuple[FrozenSet[str], FrozenSet[str]]] = {}
+        self._postings: Dict[str, Set[Name]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def _add(self, employee_id: str, name: Name) -> None:
+        self._names[employee_id] = name
+        ids = self._ids_by_name.get(name)
+        if ids is None:
+            ids = self._ids_by_name[name] = set()
+            first_name, last_name = name
+            full = trigrams(f"{first_name} {last_name or ''}")
+            self._grams[name] = (trigrams(first_name), full)
+            for gram in full:
+                self._postings[gram].add(name)
+        ids.add(employee_id)
+
+    def _remove(self, employee_id: str) -> None:
+        name = self._names.pop(employee_id, None)
+        if name is None:
+            return
+        ids = self._ids_by_name[name]
+        ids.discard(employee_id)
+        if ids:
+            return
+        del self._ids_by_name[name]
+        _, full = self._grams.pop(name)
+        for gram in full:
+            posting = self._postings[gram]
+            posting.discard(name)
+            if not posting:
+                del self._postings[gram]
+
+    def apply(self, rows: List[Tuple[str, str, Optional[str]]]) -> int:
+        """Make the index hold exactly these (ID, first name, last name) rows; returns the number of employees re-indexed."""
+        current = {str(employee_id): (first_name, last_name) for employee_id, first_name, last_name in rows if first_name}
+        changed = 0
+        for employee_id in [employee_id for employee_id in self._names if employee_id not in current]:
+            self._remove(employee_id)
+            changed += 1
+        for employee_id, name in current.items():
+            if self._names.get(employee_id) != name:
+                self._remove(employee_id)
+                self._add(employee_id, name)
+                changed += 1
+        return changed
+
+    def refresh(self) -> None:
+        """Bring the index up to date with the database if it changed since the last refresh."""
+        version = get_db_version()
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            with span("name_index.refresh"):
+                rows = _execute_query("SELECT EMPLOYEE_ID, EMPLOYEE_NAME, EMPLOYEE_LAST_NAME FROM employees", fetch_one=False)
+                if rows is None:
+                    return
+                changed = self.apply(rows)
+            self._version = version
+            logger.info(f"Employee name index refreshed: {changed} of {len(self._names)} employees re-indexed")
+
+    def _score(self, name: Name, query_grams: FrozenSet[str]) -> float:
+        first, full = self._grams[name]
+        return max(similarity(query_grams, first), similarity(query_grams, full))
+
+    def match_for_id(self, employee_id: str, name: str) -> Optional[NameMatch]:
+        """The employee with this ID, scored against the given name, or None if the ID is unknown."""
+        with self._lock:
+            stored = self._names.get(employee_id)
+            if stored is None:
+                return None
+            return NameMatch(employee_id, stored[0], stored[1], self._score(stored, trigrams(name)))
+
+    def search(self, name: str, limit: int = DEFAULT_SUGGESTIONS, min_score: float = SUGGEST_SIMILARITY) -> List[NameMatch]:
+        """Employees whose first or full name resembles name, best first."""
+        query_grams = trigrams(name)
+        matches: List[NameMatch] = []
+        with self._lock:
+            candidates = {candidate for gram in query_grams for candidate in self._postings.get(gram, ())}
+            scored = sorted(
+                ((score, candidate) for candidate in candidates if (score := self._score(candidate, query_grams)) >= min_score),
+                key=lambda item: (-item[0], item[1][0], item[1][1] or "")
+            )
+            for score, (first_name, last_name) in scored:
+                ids = heapq.nsmallest(limit - len(matches), self._ids_by_name[(first_name, last_name)])
+                matches.extend(NameMatch(employee_id, first_name, last_name, score) for employee_id in ids)
+                if len(matches) == limit:
+                    break
+        return matches
+
+
+employee_name_index = EmployeeNameIndex()
+
+
+def resolve_employee_name(employee_id: Optional[str], employee_name: Optional[str]) -> Optional[str]:
+    """
+    Stored first name of the employee with this ID if the given name is a confident match for it
+    (same name in another casing, or a small typo), otherwise None.
+    """
+    if not employee_id or not employee_name:
+        return None
+    employee_name_index.refresh()
+    match = employee_name_index.match_for_id(str(employee_id), employee_name)
+    if match is None or match.score < AUTO_CORRECT_SIMILARITY:
+        return None
+    return match.employee_name
+
+
+def exact_first_name(employee_id: Optional[str], employee_name: Optional[str]) -> Optional[str]:
+    """Stored first name of the employee with this ID if the given name is the same name in another casing, otherwise None."""
+    if not employee_id or not employee_name:
+        return None
+    employee_name_index.refresh()
+    match = employee_name_index.match_for_id(str(employee_id), employee_name)
+    if match is None or match.employee_name.casefold() != employee_name.strip().casefold():
+        return None
+    return match.employee_name
+
+
+def suggest_employees(employee_id: Optional[str], employee_name: Optional[str], limit: int = DEFAULT_SUGGESTIONS) -> List[NameMatch]:
+    """Ranked candidates for an ID and an approximate name: the employee with that ID first, if any, then similar names."""
+    employee_name_index.refresh()
+    suggestions = []
+    if employee_id:
+        by_id = employee_name_index.match_for_id(str(employee_id), employee_name or "")
+        if by_id is not None:
+            suggestions.append(by_id)
+    if employee_name:
+        suggestions.extend(match for match in employee_name_index.search(employee_name, limit) if match.employee_id != employee_id)
+    return suggestions[:limit]
@@ -0,0 +1,271 @@
+"""
+Append-only training events and the per-employee training state maintained from them.
+
+Progress arrives as "started"/"finished" events for any video of the training_videos catalog and is
+appended to training_events; rows are never rewritten. Each ingested batch also folds its events into
+employee_video_state (first start and first finish per employee and video) and recomputes
+employee_training_state (videos started/finished, first start, last finish, status) for the employees
+it touched only. Reads go to the state tables.
+
+Databases that predate the event tables are migrated on first connection: the catalog is seeded with
+the four legacy videos and the START_*/FINISH_* columns of employees are backfilled as events.
+"""
+import logging
+import sqlite3
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from app.db import common
+from app.db.common import (
+    STATUS_FINISHED,
+    STATUS_IN_PROGRESS,
+    STATUS_NOT_STARTED,
+    VIDEO_NAMES,
+    VIDEO_START_COLUMNS,
+    VIDEO_FINISH_COLUMNS
+)
+
+logger = logging.getLogger("db.training_events")
+
+EVENT_STARTED = "started"
+EVENT_FINISHED = "finished"
+# Events per insert transaction; larger batches amortize the commit and the state refresh
+INGEST_BATCH_SIZE = 5_000
+SQLITE_BUSY_TIMEOUT_SECONDS = 30
+# WAL pages before an automatic checkpoint; fewer, larger checkpoints under a steady event stream
+WAL_AUTOCHECKPOINT_PAGES = 10_000
+# Page cache of the write connection; the state tables are updated at random employee IDs
+WRITER_CACHE_KIB = 64 * 1024
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS training_videos (
+    VIDEO_ID INTEGER PRIMARY KEY,
+    VIDEO_NAME TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS training_events (
+    EVENT_ID INTEGER PRIMARY KEY,
+    EMPLOYEE_ID TEXT NOT NULL,
+    VIDEO_ID INTEGER NOT NULL,
+    EVENT_TYPE TEXT NOT NULL CHECK (EVENT_TYPE IN ('{EVENT_STARTED}', '{EVENT_FINISHED}')),
+    EVENT_TIME TIMESTAMP NOT NULL
+);
+CREATE TABLE IF NOT EXISTS employee_video_state (
+    EMPLOYEE_ID TEXT NOT NULL,
+    VIDEO_ID INTEGER NOT NULL,
+    STARTED_AT TIMESTAMP,
+    FINISHED_AT TIMESTAMP,
+    PRIMARY KEY (EMPLOYEE_ID, VIDEO_ID)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS employee_training_state (
+    EMPLOYEE_ID TEXT PRIMARY KEY,
+    VIDEOS_STARTED INTEGER NOT NULL,
+    VIDEOS_FINISHED INTEGER NOT NULL,
+    FIRST_START TIMESTAMP,
+    LAST_FINISH TIMESTAMP,
+    STATUS TEXT NOT NULL
+) WITHOUT ROWID;
+DROP INDEX IF EXISTS idx_employee_training_state_status;
+CREATE INDEX IF NOT EXISTS idx_employee_training_state_status_finish ON employee_training_state (STATUS, LAST_FINISH);
+-- Events arrive roughly in time order, so this index grows at its right edge
+CREATE INDEX IF NOT EXISTS idx_training_events_time ON training_events (EVENT_TIME);
+-- Days from first start to last finish, so leaderboards of a status read K index entries instead of sorting
+CREATE INDEX IF NOT EXISTS idx_employee_training_state_status_days
+    ON employee_training_state (STATUS, julianday(LAST_FINISH) - julianday(FIRST_START));
+"""
+# Created last by _SCHEMA: a database without it is missing tables or indexes
+_SCHEMA_MARKER = "idx_employee_training_state_status_days"
+
+# Earliest start and earliest finish win; min() is NULL if either side is, so fall back to the other one
+_UPSERT_VIDEO_STATE = """
+INSERT INTO employee_video_state (EMPLOYEE_ID, VIDEO_ID, STARTED_AT, FINISHED_AT) VALUES (?, ?, ?, ?)
+ON CONFLICT (EMPLOYEE_ID, VIDEO_ID) DO UPDATE SET
+    STARTED_AT = coalesce(min(STARTED_AT, excluded.STARTED_AT), STARTED_AT, excluded.STARTED_AT),
+    FINISHED_AT = coalesce(min(FINISHED_AT, excluded.FINISHED_AT), FINISHED_AT, excluded.FINISHED_AT)
+"""
+
+_REFRESH_TRAINING_STATE = f"""
+INSERT OR REPLACE INTO employee_training_state
+SELECT
+    EMPLOYEE_ID,
+    count(STARTED_AT),
+    count(FINISHED_AT),
+    min(STARTED_AT),
+    max(FINISHED_AT),
+    CASE
+        WHEN count(FINISHED_AT) = 0 THEN '{STATUS_NOT_STARTED}'
+        WHEN count(FINISHED_AT) >= (SELECT count(*) FROM training_videos) THEN '{STATUS_FINISHED}'
+        ELSE '{STATUS_IN_PROGRESS}'
+    END
+FROM employee_video_state
+{{where}}
+GROUP BY EMPLOYEE_ID
+"""
+
+
+class TrainingEvent(NamedTuple):
+    employee_id: str
+    video_id: int
+    event_type: str
+    event_time: str
+
+
+_ready_lock = threading.Lock()
+# Serializes writers; also guards the shared write connection
+_ingest_lock = threading.Lock()
+_writer: Optional[sqlite3.Connection] = None
+_writer_path = None
+
+
+def ensure_training_state(conn: sqlite3.Connection) -> None:
+    """Create the event and state tables and their indexes if missing, backfilling them from the legacy video columns."""
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (_SCHEMA_MARKER,)).fetchone()
+    if exists:
+        return
+    with _ready_lock:
+        conn.executescript(_SCHEMA)
+        if conn.execute("SELECT count(*) FROM training_videos").fetchone()[0] == 0:
+            _backfill_from_employee_columns(conn)
+        conn.commit()
+
+
+def _backfill_from_employee_columns(conn: sqlite3.Connection) -> None:
+    conn.executemany(
+        "INSERT INTO training_videos (VIDEO_ID, VIDEO_NAME) VALUES (?, ?)",
+        [(index + 1, name) for index, name in enumerate(VIDEO_NAMES)]
+    )
+    for index, (start_column, finish_column) in enumerate(zip(VIDEO_START_COLUMNS, VIDEO_FINISH_COLUMNS)):
+        video_id = index + 1
+        for event_type, column in ((EVENT_STARTED, start_column), (EVENT_FINISHED, finish_column)):
+            conn.execute(
+                "INSERT INTO training_events (EMPLOYEE_ID, VIDEO_ID, EVENT_TYPE, EVENT_TIME) "
+                f"SELECT EMPLOYEE_ID, ?, ?, {column} FROM employees WHERE {column} IS NOT NULL",
+                (video_id, event_type)
+            )
+        conn.execute(
+            "INSERT INTO employee_video_state (EMPLOYEE_ID, VIDEO_ID, STARTED_AT, FINISHED_AT) "
+            f"SELECT EMPLOYEE_ID, ?, {start_column}, {finish_column} FROM employees "
+            f"WHERE {start_column} IS NOT NULL OR {finish_column} IS NOT NULL",
+            (video_id,)
+        )
+    conn.execute(_REFRESH_TRAINING_STATE.format(where=""))
+    logger.info("Backfilled training events and state from the employee video columns")
+
+
+def _connect() -> sqlite3.Connection:
+    """
+    The write connection, in WAL mode so readers are not blocked while events are ingested.
+    It is kept open between calls (reopening would checkpoint the WAL each time); call with _ingest_lock held.
+    """
+    global _writer, _writer_path
+    if _writer is not None and _writer_path == common.DB_PATH:
+        return _writer
+    if _writer is not None:
+        _writer.close()
+    conn = sqlite3.connect(common.DB_PATH, timeout=SQLITE_BUSY_TIMEOUT_SECONDS, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA wal_autocheckpoint = {WAL_AUTOCHECKPOINT_PAGES}")
+    conn.execute(f"PRAGMA cache_size = -{WRITER_CACHE_KIB}")
+    ensure_training_state(conn)
+    _writer, _writer_path = conn, common.DB_PATH
+    return conn
+
+
+def close_writer() -> None:
+    """Close the shared write connection, checkpointing the WAL into the database file."""
+    global _writer, _writer_path
+    with _ingest_lock:
+        if _writer is not None:
+            _writer.close()
+        _writer, _writer_path = None, None
+
+
+def _fold_batch(events: List[TrainingEvent]) -> Dict[Tuple[str, int], List[Optional[str]]]:
+    """Earliest start and finish per (employee, video) within a batch, so each pair is upserted once."""
+    folded: Dict[Tuple[str, int], List[Optional[str]]] = defaultdict(lambda: [None, None])
+    for event in events:
+        slot = 0 if event.event_type == EVENT_STARTED else 1
+        current = folded[(event.employee_id, event.video_id)]
+        if current[slot] is None or event.event_time < current[slot]:
+            current[slot] = event.event_time
+    return folded
+
+
+def _apply_batch(conn: sqlite3.Connection, events: List[TrainingEvent]) -> None:
+    conn.executemany(
+        "INSERT INTO training_events (EMPLOYEE_ID, VIDEO_ID, EVENT_TYPE, EVENT_TIME) VALUES (?, ?, ?, ?)", events
+    )
+    folded = _fold_batch(events)
+    conn.executemany(_UPSERT_VIDEO_STATE, [(employee_id, video_id, started, finished) for (employee_id, video_id), (started, finished) in folded.items()])
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS touched_employees (EMPLOYEE_ID TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM temp.touched_employees")
+    conn.executemany("INSERT OR IGNORE INTO temp.touched_employees VALUES (?)", [(employee_id,) for employee_id, _ in folded])
+    conn.execute(_REFRESH_TRAINING_STATE.format(where="WHERE EMPLOYEE_ID IN (SELECT EMPLOYEE_ID FROM temp.touched_employees)"))
+
+
+def _validate(events: List[TrainingEvent], video_ids: set) -> None:
+    for event in events:
+        if event.event_type not in (EVENT_STARTED, EVENT_FINISHED):
+            raise ValueError(f"Unknown event type '{event.event_type}'")
+        if event.video_id not in video_ids:
+            raise ValueError(f"Unknown video {event.video_id}; register it first")
+
+
+def ingest_events(events: Iterable[TrainingEvent], batch_size: int = INGEST_BATCH_SIZE) -> int:
+    """
+    Append events and update the state of the employees they touch, one transaction per batch.
+    Events may arrive in any order; a whole batch is rejected if it names an unknown video or event type.
+    Returns the number of events ingested.
+    """
+    events = [TrainingEvent(*event) for event in events]
+    if not events:
+        return 0
+    with _ingest_lock:
+        conn = _connect()
+        _validate(events, {row[0] for row in conn.execute("SELECT VIDEO_ID FROM training_videos")})
+        for offset in range(0, len(events), batch_size):
+            with conn:
+                _apply_batch(conn, events[offset:offset + batch_size])
+    return len(events)
+
+
+def state_generation(conn: sqlite3.Connection) -> int:
+    """
+    Number of catalog changes and rebuilds of the database so far, kept in its user_version header field so
+    every process sees it. Appending events leaves it unchanged; caches derived from the state compare it
+    to know whether they can be extended or must start over.
+    """
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _bump_state_generation(conn: sqlite3.Connection) -> None:
+    conn.execute(f"PRAGMA user_version = {state_generation(conn) + 1}")
+
+
+def register_video(video_name: str) -> int:
+    """Add a video to the catalog and return its ID; every employee now needs it to finish the training."""
+    with _ingest_lock:
+        conn = _connect()
+        with conn:
+            video_id = conn.execute("INSERT INTO training_videos (VIDEO_NAME) VALUES (?)", (video_name,)).lastrowid
+            conn.execute(_REFRESH_TRAINING_STATE.format(where=""))
+            _bump_state_generation(conn)
+    logger.info(f"Registered training video {video_id}: {video_name}")
+    return video_id
+
+
+def rebuild_training_state() -> None:
+    """Recompute all state tables from the event log, e.g. after editing events by hand."""
+    with _ingest_lock:
+        conn = _connect()
+        with conn:
+            conn.execute("DELETE FROM employee_video_state")
+            conn.execute("DELETE FROM employee_training_state")
+            conn.execute(
+                "INSERT INTO employee_video_state (EMPLOYEE_ID, VIDEO_ID, STARTED_AT, FINISHED_AT) "
+                f"SELECT EMPLOYEE_ID, VIDEO_ID, min(CASE WHEN EVENT_TYPE = '{EVENT_STARTED}' THEN EVENT_TIME END), "
+                f"min(CASE WHEN EVENT_TYPE = '{EVENT_FINISHED}' THEN EVENT_TIME END) "
+                "FROM training_events GROUP BY EMPLOYEE_ID, VIDEO_ID"
+            )
+            conn.execute(_REFRESH_TRAINING_STATE.format(where=""))
+            _bump_state_generation(conn)
@@ -1,6 +1,8 @@
 """Verification functions for checking employee existence and validity."""
+from typing import Dict
 from app.db.common import _execute_query
 from app.db.common import _get_employee_by_id_and_name, DIVISION_CISO
+from app.services.cache.db_cache import cache_analytics
 
 
 def employee_exists_in_database(employee_id: str, employee_name: str) -> bool:
@@ -12,6 +14,7 @@ def employee_exists_in_database(employee_id: str, employee_name: str) -> bool:
     )
     return result is not None
 
+
 def is_ciso(employee_id: str, employee_name: str) -> bool:
     """Check if an employee is a CISO."""
     result = _get_employee_by_id_and_name(
@@ -22,3 +25,9 @@ def is_ciso(employee_id: str, employee_name: str) -> bool:
     )
     return result is not None
 
+
+@cache_analytics
+def fetch_employee_first_names() -> Dict[str, str]:
+    """Fetch the employee first-name index, mapping lower-cased names to their stored spelling."""
+    rows = _execute_query("SELECT DISTINCT EMPLOYEE_NAME FROM employees", fetch_one=False) or []
+    return {row[0].lower(): row[0] for row in rows if row[0]}
@@ -1,9 +1,16 @@
 """
 Main application file.
 """
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.endpoints import api_router
+from app.api.analytics import analytics_router
+from app.api.debug import debug_router
+from app.services.llm.llm_client_setup import close_client, warm_up
+from app.services.serialization import FastJSONResponse
+from app.services.tracing import TracingMiddleware
 import logging
 # Ensure app logs appear in terminal (including BackgroundTasks)
 logging.basicConfig(
@@ -15,7 +22,18 @@ logging.getLogger("uvicorn").setLevel(logging.INFO)
 logging.getLogger("uvicorn.error").setLevel(logging.INFO)
 logging.getLogger("uvicorn.access").setLevel(logging.INFO)
 
-app = FastAPI(title="Chat API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The OpenAI client is built lazily on the first LLM call; its SDK is imported in the background meanwhile,
+    # so the app accepts requests without waiting for it. The client's connection pool is closed on shutdown.
+    warm_up_task = asyncio.create_task(asyncio.to_thread(warm_up))
+    yield
+    await warm_up_task
+    await close_client()
+
+
+app = FastAPI(title="Chat API", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # Configure CORS
 app.add_middleware(
@@ -24,9 +42,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allow all methods
     allow_headers=["*"],  # Allow all headers
+    expose_headers=["X-Trace-Id"],
 )
+# Added last so it is outermost and the trace covers the whole request
+app.add_middleware(TracingMiddleware)
 
 app.include_router(api_router)
+app.include_router(analytics_router)
+app.include_router(debug_router)
 
 
 @app.get("/")
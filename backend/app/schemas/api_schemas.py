@@ -1,17 +1,39 @@
 """
 Schemas for the API.
 """
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
+from app.services.llm.llm_config import BATCH_MAX_MESSAGES
 
 class ChatRequest(BaseModel):
     message: str
-    history: list[dict]
+    history: Optional[list[dict]] = None  # Not needed when a session_token is sent
     employee_id: Optional[str] = None
     employee_name: Optional[str] = None
+    session_id: Optional[str] = None
+    session_token: Optional[str] = None
 
 
 class ChatResponse(BaseModel):
     message: str
     employee_id: Optional[str] = None
     employee_name: Optional[str] = None
+    session_token: Optional[str] = None
+
+
+class ChatBatchRequest(BaseModel):
+    messages: list[str] = Field(min_length=1, max_length=BATCH_MAX_MESSAGES)
+    employee_id: Optional[str] = None
+    employee_name: Optional[str] = None
+    session_token: Optional[str] = None
+
+
+class ChatBatchItem(BaseModel):
+    message: Optional[str] = None
+    error: Optional[str] = None
+
+
+class ChatBatchResponse(BaseModel):
+    results: list[ChatBatchItem]
+    employee_id: str
+    employee_name: str
@@ -5,7 +5,7 @@ OpenAI tool definitions for the LLM to use.
 CHECK_IF_EMPLOYEE_EXISTS_BY_ID_AND_NAME = {
     "type": "function",
     "name": "check_if_employee_exists_by_id_and_first_name",
-    "description": "Check if an employee exists in the database by their employee ID and employee first name. Use this tool to verify employee credentials before allowing access.",
+    "description": "Check if an employee exists in the database by their employee ID and employee first name. Use this tool to verify employee credentials before allowing access. The first name must match exactly (casing aside).",
     "parameters": {
         "type": "object",
         "properties": {
@@ -66,7 +66,7 @@ GET_ALL_EMPLOYEES_WITH_THIS_TRAINING_STATUS = {
 FETCH_DIFFERENT_EMPLOYEE_DATA = {
     "type": "function",
     "name": "fetch_different_employee_data_using_id_and_first_name",
-    "description": "Fetch any employee's data including personal information and training video completion status. Use this tool when the CISO asks about a specific employee's information or training progress.",
+    "description": "Fetch any employee's data including personal information and training video completion status. Use this tool when the CISO asks about a specific employee's information or training progress. A first name with a small typo is corrected; if no employee matches, the output lists did_you_mean candidates to confirm with the CISO.",
     "parameters": {
         "type": "object",
         "properties": {
@@ -82,3 +82,60 @@ FETCH_DIFFERENT_EMPLOYEE_DATA = {
         "required": ["employee_id", "employee_first_name"]
     }
 }
+
+GET_TRAINING_COMPLETION_TIMESERIES = {
+    "type": "function",
+    "name": "get_training_completion_timeseries",
+    "description": "Get training completion velocity over time: employees who finished the training per day or week with the cumulative count and percentage of all employees finished, and the starts and finishes of each video per day or week. Use this tool when the CISO asks about trends, pace or progress over time.",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "granularity": {
+                "type": "string",
+                "description": "Bucket size: day or week (weeks start on Monday)",
+                "enum": ["day", "week"]
+            },
+            "last_buckets": {
+                "type": "integer",
+                "description": "Number of most recent buckets to return, 1 to 90 (default 12)"
+            }
+        },
+        "required": ["granularity"]
+    }
+}
+
+GET_TRAINING_VIDEO_FUNNEL = {
+    "type": "function",
+    "name": "get_training_video_funnel",
+    "description": "Get the training funnel per video, in catalog order: how many employees started and finished each video, how many started it but never finished it, how many finished it but never started the next video, and the median, 90th percentile and mean time spent watching each video and waiting before starting the next one. Use this tool when the CISO asks where employees stall or drop off in the training.",
+}
+
+GET_TRAINING_TIME_LEADERBOARD = {
+    "type": "function",
+    "name": "get_training_time_leaderboard",
+    "description": "Get the top K fastest or slowest employees by days from their first video start to their last video finish (the time to finish the training for FINISHED employees, the time spent so far for IN_PROGRESS ones), optionally within one division. Use this tool when the CISO asks for the fastest or slowest few employees, e.g. the 10 slowest finishers or the 5 fastest in Engineering.",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "order": {
+                "type": "string",
+                "description": "fastest or slowest first",
+                "enum": ["fastest", "slowest"]
+            },
+            "k": {
+                "type": "integer",
+                "description": "Number of employees to return, 1 to 50 (default 10)"
+            },
+            "division": {
+                "type": "string",
+                "description": "Only rank employees of this division, e.g. Engineering"
+            },
+            "status": {
+                "type": "string",
+                "description": "Training status of the ranked employees (default FINISHED)",
+                "enum": ["FINISHED", "IN_PROGRESS"]
+            }
+        },
+        "required": ["order"]
+    }
+}
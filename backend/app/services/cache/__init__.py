@@ -9,11 +9,13 @@ from app.services.cache.llm_cache import (
     cache_llm,
     clear_llm_cache
 )
+from app.db.ciso_timeseries import clear_timeseries_cache
 
 
 def clear_all_caches():
-    """Clear all caches (both DB and LLM)."""
+    """Clear all caches (DB analytics, time series and LLM)."""
     clear_analytics_cache()
+    clear_timeseries_cache()
     clear_llm_cache()
 
 
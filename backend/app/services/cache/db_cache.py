@@ -4,9 +4,11 @@ Database/analytics query caching utilities.
 from functools import wraps
 from typing import Any, Callable
 from cachetools import TTLCache
-import hashlib
-import json
 import logging
+import threading
+from app.db.common import get_db_version
+from app.services.serialization import structural_key
+from app.services.tracing import span
 
 logger = logging.getLogger("cache.db")
 
@@ -14,19 +16,16 @@ logger = logging.getLogger("cache.db")
 ANALYTICS_CACHE_TTL = 300  # 5 minutes
 ANALYTICS_CACHE_MAXSIZE = 128
 
-# Create cache instance
+# Create cache instance; tool handlers run in worker threads, so access is guarded by a lock
 analytics_cache = TTLCache(maxsize=ANALYTICS_CACHE_MAXSIZE, ttl=ANALYTICS_CACHE_TTL)
+analytics_cache_lock = threading.Lock()
+# Database version the cached results were computed from; a write to the database invalidates them
+_cached_db_version = None
 
 
-def _generate_cache_key(*args, **kwargs) -> str:
-    """Generate a cache key from function arguments."""
-    # Convert args and kwargs to a stable string representation
-    key_data = {
-        "args": args,
-        "kwargs": sorted(kwargs.items()) if kwargs else {}
-    }
-    key_str = json.dumps(key_data, sort_keys=True, default=str)
-    return hashlib.md5(key_str.encode()).hexdigest()
+def _generate_cache_key(*args, **kwargs) -> Any:
+    """Generate a hashable cache key from function arguments."""
+    return structural_key(args), structural_key(kwargs)
 
 
 def cache_analytics(func: Callable) -> Callable:
@@ -36,24 +35,42 @@ def cache_analytics(func: Callable) -> Callable:
     """
     @wraps(func)
     def wrapper(*args, **kwargs):
-        cache_key = f"{func.__name__}:{_generate_cache_key(*args, **kwargs)}"
+        cache_key = (func.__name__, _generate_cache_key(*args, **kwargs))
         
-        # Check cache
-        if cache_key in analytics_cache:
-            logger.debug(f"Cache HIT for analytics: {func.__name__}")
-            return analytics_cache[cache_key]
-        
-        # Cache miss - execute function
-        logger.debug(f"Cache MISS for analytics: {func.__name__}")
-        result = func(*args, **kwargs)
-        analytics_cache[cache_key] = result
-        return result
+        with span("cache_analytics", function=func.__name__) as cache_span:
+            # Check cache
+            with analytics_cache_lock:
+                _invalidate_if_db_changed()
+                if cache_key in analytics_cache:
+                    logger.debug(f"Cache HIT for analytics: {func.__name__}")
+                    cache_span.set(hit=True)
+                    return analytics_cache[cache_key]
+            
+            # Cache miss - execute function
+            logger.debug(f"Cache MISS for analytics: {func.__name__}")
+            cache_span.set(hit=False)
+            result = func(*args, **kwargs)
+            with analytics_cache_lock:
+                analytics_cache[cache_key] = result
+            return result
     
     return wrapper
 
 
+def _invalidate_if_db_changed() -> None:
+    """Drop all analytics results when the database has changed since they were cached. Call with the lock held."""
+    global _cached_db_version
+    version = get_db_version()
+    if version != _cached_db_version:
+        if _cached_db_version is not None and analytics_cache:
+            logger.info("Database changed, analytics cache invalidated")
+        analytics_cache.clear()
+        _cached_db_version = version
+
+
 def clear_analytics_cache():
     """Clear all analytics cache entries."""
-    analytics_cache.clear()
+    with analytics_cache_lock:
+        analytics_cache.clear()
     logger.info("Analytics cache cleared")
 
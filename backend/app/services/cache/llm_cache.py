@@ -4,9 +4,12 @@ LLM response caching utilities.
 from functools import wraps
 from typing import Any, Callable, Optional
 from cachetools import TTLCache
-import hashlib
-import json
 import logging
+from app.services.llm.llm_config import ERROR_MESSAGE_PREFIX, DEGRADED_RESPONSE_MESSAGE
+from app.services.llm.llm_metrics import record_cache_result
+from app.services.llm.llm_conversation_state import conversation_key, get_turn_response_id, remember_response_id
+from app.services.serialization import structural_key
+from app.services.tracing import span
 
 logger = logging.getLogger("cache.llm")
 
@@ -14,8 +17,12 @@ logger = logging.getLogger("cache.llm")
 LLM_CACHE_TTL = 3600  # 1 hour
 LLM_CACHE_MAXSIZE = 512
 
-# Create cache instance
+# History summary cache: keyed by the digest of the summarized history prefix
+SUMMARY_CACHE_MAXSIZE = 256
+
+# Create cache instances
 llm_cache = TTLCache(maxsize=LLM_CACHE_MAXSIZE, ttl=LLM_CACHE_TTL)
+summary_cache = TTLCache(maxsize=SUMMARY_CACHE_MAXSIZE, ttl=LLM_CACHE_TTL)
 
 
 def _generate_llm_cache_key(
@@ -24,8 +31,8 @@ def _generate_llm_cache_key(
     employee_name: Optional[str] = None,
     history: Optional[list] = None,
     query_type: Optional[str] = None
-) -> str:
-    """Generate a cache key for LLM queries based on user, message, and context."""
+) -> Any:
+    """Generate a hashable cache key for LLM queries based on user, message, and context."""
     # Create a stable representation of the query
     cache_data = {
         "message": user_message,
@@ -36,8 +43,15 @@ def _generate_llm_cache_key(
         "history_length": len(history) if history else 0,
         "history_tail": history[-3:] if history and len(history) > 0 else []
     }
-    key_str = json.dumps(cache_data, sort_keys=True, default=str)
-    return hashlib.md5(key_str.encode()).hexdigest()
+    return structural_key(cache_data)
+
+
+def _is_cacheable(result: Any) -> bool:
+    """Errors and degraded answers are transient and must not be served from cache."""
+    message = result.get("message") if isinstance(result, dict) else None
+    if not isinstance(message, str):
+        return True
+    return not (message.startswith(ERROR_MESSAGE_PREFIX) or message == DEGRADED_RESPONSE_MESSAGE)
 
 
 def cache_llm(func: Callable) -> Callable:
@@ -50,8 +64,8 @@ def cache_llm(func: Callable) -> Callable:
         # Extract parameters from function call
         # Function signatures vary:
         # - authenticate_employee(user_message, history=None)
-        # - regular_employee_query(user_message, history=None, employee_id=None, employee_name=None)
-        # - ciso_query(user_message, history=None, employee_id=None, employee_name=None)
+        # - regular_employee_query(user_message, history=None, employee_id=None, employee_name=None, session_id=None, turn=None)
+        # - ciso_query(user_message, history=None, employee_id=None, employee_name=None, session_id=None, turn=None)
         
         # Get user_message (first positional arg or from kwargs)
         msg = kwargs.get('user_message', args[0] if args else None)
@@ -62,21 +76,32 @@ def cache_llm(func: Callable) -> Callable:
         # Get employee_id and employee_name (from kwargs or later positional args)
         emp_id = kwargs.get('employee_id', args[2] if len(args) > 2 else None)
         emp_name = kwargs.get('employee_name', args[3] if len(args) > 3 else None)
+        chain_key = conversation_key(emp_id, kwargs.get('session_id', args[4] if len(args) > 4 else None))
+        turn = kwargs.get('turn', args[5] if len(args) > 5 else None)
         
         qtype = func.__name__
         
-        cache_key = f"llm:{qtype}:{_generate_llm_cache_key(msg, emp_id, emp_name, hist, qtype)}"
-        
-        # Check cache
-        if cache_key in llm_cache:
-            logger.info(f"Cache HIT for LLM: {qtype} (user: {emp_id})")
-            return llm_cache[cache_key]
+        cache_key = ("llm", qtype, _generate_llm_cache_key(msg, emp_id, emp_name, hist, qtype))
         
-        # Cache miss - execute function
-        logger.info(f"Cache MISS for LLM: {qtype} (user: {emp_id})")
-        result = await func(*args, **kwargs)
-        llm_cache[cache_key] = result
-        return result
+        with span("cache_llm", query_type=qtype) as cache_span:
+            # Check cache
+            if cache_key in llm_cache:
+                logger.info(f"Cache HIT for LLM: {qtype} (user: {emp_id})")
+                record_cache_result(True)
+                cache_span.set(hit=True)
+                result, response_id = llm_cache[cache_key]
+                # Keep the session's chain in step, as if the cached turn had been answered again
+                remember_response_id(chain_key, hist, response_id, turn)
+                return result
+            
+            # Cache miss - execute function
+            logger.info(f"Cache MISS for LLM: {qtype} (user: {emp_id})")
+            record_cache_result(False)
+            cache_span.set(hit=False)
+            result = await func(*args, **kwargs)
+            if _is_cacheable(result):
+                llm_cache[cache_key] = (result, get_turn_response_id(chain_key, hist, turn))
+            return result
     
     return async_wrapper
 
@@ -84,5 +109,6 @@ def cache_llm(func: Callable) -> Callable:
 def clear_llm_cache():
     """Clear all LLM cache entries."""
     llm_cache.clear()
+    summary_cache.clear()
     logger.info("LLM cache cleared")
 
@@ -0,0 +1,55 @@
+"""
+Deterministic authentication fast path that runs before the LLM.
+"""
+import re
+from typing import Optional, Tuple
+from app.db.verifiers import employee_exists_in_database, fetch_employee_first_names
+from app.services.llm.llm_config import (
+    EMPLOYEE_ID_PATTERN,
+    NAME_TOKEN_PATTERN,
+    AUTH_SUCCESS_MESSAGE,
+    AUTH_FAILURE_MESSAGE
+)
+from app.services.llm.llm_responses import create_response, QueryResponse
+from app.services.llm.llm_client_setup import logger
+
+_EMPLOYEE_ID_RE = re.compile(EMPLOYEE_ID_PATTERN)
+_NAME_TOKEN_RE = re.compile(NAME_TOKEN_PATTERN)
+
+
+def extract_credentials(user_message: str) -> Optional[Tuple[str, str]]:
+    """
+    Extract an (employee_id, employee_first_name) pair from a message.
+    Returns None unless exactly one 9-digit ID and exactly one known first name are present.
+    """
+    employee_ids = set(_EMPLOYEE_ID_RE.findall(user_message or ""))
+    if len(employee_ids) != 1:
+        return None
+
+    name_index = fetch_employee_first_names() or {}
+    names = {
+        name_index[token.lower()]
+        for token in _NAME_TOKEN_RE.findall(user_message)
+        if token.lower() in name_index
+    }
+    if len(names) != 1:
+        return None
+
+    return employee_ids.pop(), names.pop()
+
+
+def try_fast_authentication(user_message: str) -> Optional[QueryResponse]:
+    """Authenticate without the LLM when credentials can be extracted confidently, otherwise return None."""
+    credentials = extract_credentials(user_message)
+    if credentials is None:
+        return None
+
+    employee_id, employee_name = credentials
+    logger.info(f"Fast-path authentication for employee: {employee_id}")
+    if not employee_exists_in_database(employee_id, employee_name):
+        return create_response(AUTH_FAILURE_MESSAGE)
+    return create_response(
+        AUTH_SUCCESS_MESSAGE.format(employee_name=employee_name),
+        employee_id,
+        employee_name
+    )
@@ -4,11 +4,18 @@ LLM client module - main entry point for LLM functionality.
 This module maintains backward compatibility by re-exporting the main query functions.
 The implementation has been split into logical modules:
 - llm_config.py: Configuration constants
-- llm_client_setup.py: OpenAI client initialization
+- llm_client_setup.py: Lazy OpenAI client factory and shared HTTP connection pool
 - llm_responses.py: Response utilities
 - llm_formatters.py: Data formatting functions
 - llm_tool_handlers.py: Tool handler functions
 - llm_queries.py: Main query execution functions
+- llm_auth_fast_path.py: Local credential extraction that skips the LLM
+- llm_conversation_state.py: Server-side chaining of turns with previous_response_id
+- llm_history.py: Token-budgeted history window with a rolling summary
+- llm_resilience.py: Deadlines, retries, hedging and circuit breaker around OpenAI calls
+- llm_transport.py: Record/replay transport for offline runs and the load-test stub
+- llm_metrics.py: Per-turn token and phase-latency accounting
+- llm_scheduler.py: Admission control and priority scheduling of OpenAI calls
 """
 
 # Re-export main query functions for backward compatibility
@@ -1,20 +1,160 @@
 """
 OpenAI client initialization and setup.
+
+The client is built on first use by get_client() and closed by close_client() in the FastAPI lifespan,
+so importing the LLM modules needs neither an API key nor the openai package to be loaded.
 """
+import importlib.util
 import os
-from openai import AsyncOpenAI
 import logging
+import time
+from typing import Any, Dict, Optional
+from app.services.llm.llm_config import (
+    LLM_TRANSPORT,
+    LLM_TRANSPORT_RECORD,
+    LLM_TRANSPORT_REPLAY,
+    LLM_TRANSPORT_STUB,
+    LLM_CASSETTE_PATH,
+    LLM_REPLAY_LATENCY,
+    LLM_REPLAY_SEED,
+    LLM_STUB_LATENCY,
+    LLM_WARMUP_ENABLED,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_KEEPALIVE_EXPIRY_SECONDS,
+    HTTP2_ENABLED
+)
+from app.services.llm.llm_transport import RecordingClient, ReplayClient, StubClient, LatencyModel
+
+# Configure logger to output to stdout (appears in Docker logs)
+logger = logging.getLogger("llm_client")
+
+_client: Optional[Any] = None
+_http_client: Optional[Any] = None
+
+
+class ConnectionStats:
+    """Counts requests against new TCP connections and TLS handshakes, from the HTTP transport's trace events."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.requests = 0
+        self.new_connections = 0
+        self.tls_handshakes = 0
+
+    async def on_request(self, request: Any) -> None:
+        self.requests += 1
+        request.extensions["trace"] = self.trace
+
+    async def trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self.new_connections += 1
+        elif event_name == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        reused = max(0, self.requests - self.new_connections)
+        return {
+            "requests": self.requests,
+            "new_connections": self.new_connections,
+            "reused_connections": reused,
+            "reuse_rate": reused / self.requests if self.requests else None,
+            "tls_handshakes": self.tls_handshakes,
+            "tls_handshakes_avoided": max(0, self.requests - self.tls_handshakes) if self.tls_handshakes else 0,
+            "http2": http2_available(),
+        }
+
+
+connection_stats = ConnectionStats()
+
+
+def http2_available() -> bool:
+    """HTTP/2 is used when enabled and the h2 package is installed."""
+    return HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+
 
-# Initialize OpenAI client
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise ValueError(
-        "OPENAI_API_KEY not found in environment variables. "
-        "Please set it in a .env file in the project root or as an environment variable. and rebuild the docker container."
+def build_http_client() -> Any:
+    """The async HTTP client with the tuned connection pool shared by all OpenAI calls."""
+    try:
+        import httpx
+    except ImportError:  # newer openai releases ship the httpx2 fork instead
+        import httpx2 as httpx
+    from openai import DefaultAsyncHttpxClient
+
+    return DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        http2=http2_available(),
+        event_hooks={"request": [connection_stats.on_request]},
     )
 
-client = AsyncOpenAI(api_key=api_key)
 
-# Configure logger to output to stdout (appears in Docker logs)
-logger = logging.getLogger("llm_client")
+def _build_client() -> Any:
+    global _http_client
+    if LLM_TRANSPORT == LLM_TRANSPORT_REPLAY:
+        # Offline replay from a cassette: no API key or network access needed
+        return ReplayClient(LLM_CASSETTE_PATH, LatencyModel(LLM_REPLAY_LATENCY, LLM_REPLAY_SEED))
+    if LLM_TRANSPORT == LLM_TRANSPORT_STUB:
+        return StubClient(LatencyModel(LLM_STUB_LATENCY, LLM_REPLAY_SEED))
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError(
+            "OPENAI_API_KEY not found in environment variables. "
+            "Please set it in a .env file in the project root or as an environment variable. and rebuild the docker container."
+        )
+
+    from openai import AsyncOpenAI
+
+    _http_client = build_http_client()
+    # Retries are handled by llm_resilience within the request deadline
+    client = AsyncOpenAI(api_key=api_key, max_retries=0, http_client=_http_client)
+    if LLM_TRANSPORT == LLM_TRANSPORT_RECORD:
+        client = RecordingClient(client, LLM_CASSETTE_PATH)
+        logger.info(f"Recording LLM exchanges to {LLM_CASSETTE_PATH}")
+    return client
+
+
+def get_client() -> Any:
+    """The shared OpenAI client, built on first use."""
+    global _client
+    if _client is None:
+        _client = _build_client()
+    return _client
+
+
+async def close_client() -> None:
+    """Close the shared HTTP connection pool; the next get_client() builds a new client."""
+    global _client, _http_client
+    http_client, _client, _http_client = _http_client, None, None
+    if http_client is not None:
+        await http_client.aclose()
+
+
+def warm_up() -> None:
+    """Import the OpenAI SDK ahead of the first LLM call; blocking, so run it in a thread."""
+    if not LLM_WARMUP_ENABLED or LLM_TRANSPORT == LLM_TRANSPORT_STUB:
+        return
+    started = time.perf_counter()
+    try:
+        # Loads the whole SDK package, client included; replay needs the response types
+        import openai.types.responses  # noqa: F401
+    except ImportError as e:
+        logger.warning(f"OpenAI SDK warm-up failed: {e}")
+        return
+    logger.info(f"OpenAI SDK imported in the background in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+class _LazyClient:
+    """Stand-in for the client object that resolves get_client() on each attribute access."""
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_client(), name)
+
 
+client = _LazyClient()
@@ -1,6 +1,7 @@
 """
 Configuration constants for LLM client.
 """
+import os
 
 # Model configuration
 MODEL_NAME = "gpt-4o-mini"
@@ -8,6 +9,9 @@ FUNCTION_CALL_TYPE = "function_call"
 FUNCTION_CALL_OUTPUT_TYPE = "function_call_output"
 EMPTY_RESPONSE_MESSAGE = "[Empty response from model]"
 ERROR_MESSAGE_PREFIX = "Error querying OpenAI API:"
+DEGRADED_RESPONSE_MESSAGE = (
+    "The training assistant is temporarily unavailable. Please try again in a minute."
+)
 
 # Tool name constants
 TOOL_CHECK_EMPLOYEE_EXISTS = "check_if_employee_exists_by_id_and_first_name"
@@ -17,6 +21,133 @@ TOOL_GET_STATISTICS = "get_summary_and_statistics_on_all_employees_training"
 TOOL_FETCH_CISO_DATA = "fetch_current_ciso_employee_data"
 TOOL_GET_EMPLOYEES_BY_STATUS = "get_all_employees_with_this_training_status"
 TOOL_FETCH_DIFFERENT_EMPLOYEE = "fetch_different_employee_data_using_id_and_first_name"
+TOOL_GET_COMPLETION_TIMESERIES = "get_training_completion_timeseries"
+TOOL_GET_VIDEO_FUNNEL = "get_training_video_funnel"
+TOOL_GET_TIME_LEADERBOARD = "get_training_time_leaderboard"
+
+# Transport: "live" calls OpenAI, "record" also saves exchanges to a cassette, "replay" serves the cassette offline,
+# "stub" answers every request with canned tool calls (load tests)
+LLM_TRANSPORT_LIVE = "live"
+LLM_TRANSPORT_RECORD = "record"
+LLM_TRANSPORT_REPLAY = "replay"
+LLM_TRANSPORT_STUB = "stub"
+LLM_TRANSPORT = os.getenv("LLM_TRANSPORT", LLM_TRANSPORT_LIVE)
+LLM_CASSETTE_PATH = os.getenv(
+    "LLM_CASSETTE_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "..", "..", "data", "cassettes", "responses.jsonl")
+)
+# Replay latency: "none", "recorded", "fixed:<seconds>", "normal:<mean>,<std>" or "lognormal:<mu>,<sigma>"
+LLM_REPLAY_LATENCY = os.getenv("LLM_REPLAY_LATENCY", "recorded")
+LLM_REPLAY_SEED = int(os.getenv("LLM_REPLAY_SEED", "0"))
+# Stub latency per request, in the same format as the replay latency
+LLM_STUB_LATENCY = os.getenv("LLM_STUB_LATENCY", "fixed:0.3")
+# Import the OpenAI SDK in the background after startup, so neither startup nor the first LLM call waits for it
+LLM_WARMUP_ENABLED = os.getenv("LLM_WARMUP", "1") == "1"
+
+# Batch chat: questions of one /chat/batch request answered concurrently
+BATCH_MAX_MESSAGES = int(os.getenv("CHAT_BATCH_MAX_MESSAGES", "200"))
+BATCH_CONCURRENCY = int(os.getenv("CHAT_BATCH_CONCURRENCY", "8"))
+
+# HTTP connection pool shared by all OpenAI calls
+HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY_SECONDS", "60"))
+HTTP2_ENABLED = os.getenv("LLM_HTTP2", "1") == "1"  # Only used when the h2 package is installed
+
+# Resilience: per-request deadline shared by all LLM calls and tools of a chat turn
+REQUEST_DEADLINE_SECONDS = float(os.getenv("LLM_REQUEST_DEADLINE_SECONDS", "30"))
+ATTEMPT_TIMEOUT_SECONDS = float(os.getenv("LLM_ATTEMPT_TIMEOUT_SECONDS", "20"))
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+RETRY_BASE_DELAY_SECONDS = 0.25
+RETRY_MAX_DELAY_SECONDS = 2.0
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 429, 500, 502, 503, 504})
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("LLM_CIRCUIT_RESET_SECONDS", "30"))
+HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "0") == "1"
+HEDGE_PERCENTILE = 95
+HEDGE_MIN_SAMPLES = 20
+LATENCY_SAMPLE_SIZE = 200
+
+# Scheduler: admission control in front of the OpenAI client
+SCHEDULER_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+SCHEDULER_MIN_CONCURRENCY = 1
+SCHEDULER_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "200000"))
+SCHEDULER_DEFAULT_OUTPUT_TOKENS = 500  # Reserved per call on top of the estimated input tokens
+SCHEDULER_BACKOFF_BASE_SECONDS = 1.0
+SCHEDULER_BACKOFF_MAX_SECONDS = 30.0
+SCHEDULER_RECOVERY_SUCCESSES = 10  # Successful calls needed to raise the concurrency limit by one after a 429
+SCHEDULER_WAIT_SAMPLE_SIZE = 500
+
+# Conversation state: chain turns server-side with previous_response_id
+CONVERSATION_STATE_ENABLED = os.getenv("LLM_CONVERSATION_STATE", "1") == "1"
+CONVERSATION_STATE_TTL = 3600  # 1 hour
+CONVERSATION_STATE_MAXSIZE = 1024
+
+# History window: bound prompt size with a token budget and a rolling summary of older turns
+HISTORY_TOKEN_BUDGET = int(os.getenv("LLM_HISTORY_TOKEN_BUDGET", "2000"))
+HISTORY_KEEP_LAST_MESSAGES = int(os.getenv("LLM_HISTORY_KEEP_LAST_MESSAGES", "6"))
+HISTORY_SUMMARY_MAX_TOKENS = 300
+# Older messages are folded into the summary this many at a time, so it is rebuilt once per chunk, not every turn
+HISTORY_SUMMARY_CHUNK_MESSAGES = max(1, int(os.getenv("LLM_HISTORY_SUMMARY_CHUNK_MESSAGES", "8")))
+HISTORY_SUMMARY_ROLE = "developer"
+HISTORY_SUMMARY_PREFIX = "Summary of the earlier conversation: "
+CHARS_PER_TOKEN = 4
+TOKENS_PER_MESSAGE = 4
+
+# Tool execution: tool calls of one model turn run concurrently, each with its own timeout
+TOOL_CALL_TIMEOUT_SECONDS = float(os.getenv("LLM_TOOL_CALL_TIMEOUT_SECONDS", "10"))
+TOOL_CALL_TIMEOUTS = {
+    TOOL_GET_STATISTICS: 20.0,
+    TOOL_GET_EMPLOYEES_BY_STATUS: 20.0,
+    TOOL_GET_COMPLETION_TIMESERIES: 20.0,
+    TOOL_GET_VIDEO_FUNNEL: 30.0,
+}
+# Buckets of a completion time series returned to the model: the most recent ones, at most the maximum
+TIMESERIES_DEFAULT_BUCKETS = 12
+TIMESERIES_MAX_BUCKETS = 90
+# Employees ranked by a time-to-finish leaderboard returned to the model
+LEADERBOARD_DEFAULT_K = 10
+LEADERBOARD_MAX_K = 50
+
+# Tool output encoding: "compact" uses columnar rows, short keys and rounded durations; "verbose" is plain JSON
+OUTPUT_FORMAT_VERBOSE = "verbose"
+OUTPUT_FORMAT_COMPACT = "compact"
+TOOL_OUTPUT_FORMAT_DEFAULT = os.getenv("LLM_TOOL_OUTPUT_FORMAT", OUTPUT_FORMAT_COMPACT)
+# Per-tool overrides of the default format, e.g. {TOOL_GET_STATISTICS: OUTPUT_FORMAT_VERBOSE}
+TOOL_OUTPUT_FORMATS = {}
+COMPACT_DURATION_DECIMALS = 2
+COMPACT_TIMESTAMP_LENGTH = 16  # "YYYY-MM-DD HH:MM"
+
+# Roles
+ROLE_EMPLOYEE = "employee"
+ROLE_CISO = "ciso"
+ROLE_ANONYMOUS = "anonymous"
+
+# Scheduler priority classes, lower is served first, and the bound of each class's queue
+PRIORITY_AUTHENTICATION = 0
+PRIORITY_CISO = 1
+PRIORITY_EMPLOYEE = 2
+ROLE_PRIORITIES = {
+    ROLE_ANONYMOUS: PRIORITY_AUTHENTICATION,
+    ROLE_CISO: PRIORITY_CISO,
+    ROLE_EMPLOYEE: PRIORITY_EMPLOYEE,
+}
+PRIORITY_NAMES = {
+    PRIORITY_AUTHENTICATION: "authentication",
+    PRIORITY_CISO: "ciso",
+    PRIORITY_EMPLOYEE: "employee",
+}
+SCHEDULER_QUEUE_LIMITS = {
+    PRIORITY_AUTHENTICATION: int(os.getenv("LLM_AUTH_QUEUE_LIMIT", "50")),
+    PRIORITY_CISO: int(os.getenv("LLM_CISO_QUEUE_LIMIT", "20")),
+    PRIORITY_EMPLOYEE: int(os.getenv("LLM_EMPLOYEE_QUEUE_LIMIT", "100")),
+}
+
+# Context pre-injection: roles whose own profile is fetched up front and sent with the prompt
+PREINJECT_CONTEXT_ROLES = frozenset(
+    role.strip() for role in os.getenv("LLM_PREINJECT_ROLES", ROLE_EMPLOYEE).split(",") if role.strip()
+)
+PREINJECTED_CONTEXT_ROLE = "developer"
 
 # Response keys
 KEY_MESSAGE = "message"
@@ -27,11 +158,29 @@ KEY_EXISTS = "exists"
 KEY_CALL_ID = "call_id"
 KEY_TYPE = "type"
 
+# Authentication messages
+AUTH_SUCCESS_MESSAGE = "Hi {employee_name}, how can I help you?"
+AUTH_FAILURE_MESSAGE = "You gave me the wrong name or id, or the user does not exist in the database. Please try again."
+
+# Authentication fast path
+EMPLOYEE_ID_PATTERN = r"(?<!\d)\d{9}(?!\d)"
+NAME_TOKEN_PATTERN = r"[^\W\d_]+"
+
 # Instructions
 INSTRUCTION_AUTHENTICATE = (
     "user must give you his name and his id. if user gives you these 2, use the tool to check if the employee exists in the database. "
     "if the employee exists, ask user what can you do for him. if the employee does not exist, return an error message. tone: keep insisting"
 )
+INSTRUCTION_PREINJECTED_CONTEXT = (
+    "the current user's personal data, video completion data and training status are given below as json. "
+    "answer from this data directly and only call a tool if the answer is not in it.\n"
+    "current user data: {context}"
+)
+INSTRUCTION_SUMMARIZE_HISTORY = (
+    "summarize the conversation between a user and a cybersecurity training assistant. "
+    "if a previous summary is given, extend it with the new messages. keep names, employee ids, training statuses and open questions. "
+    "answer with the summary only, in a few short sentences"
+)
 INSTRUCTION_TRAINING_ASSISTANT = (
     "you are a helpful training cybersecurity training assistant. you are given a message from {user_type} and you need to answer the question. "
     "if the question is not related to the training, you need to say that you are not sure about the answer and you will ask the employee to contact the training team. "
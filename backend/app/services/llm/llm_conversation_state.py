@@ -0,0 +1,91 @@
+"""
+Server-side conversation state for chaining turns with previous_response_id.
+
+A chain is in sync when the conversation has exactly the messages the server has already seen. Clients
+that send their full history are measured by its length; server-side sessions keep only a bounded log,
+so they pass their turn count instead, which keeps growing once the log is full.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from cachetools import TTLCache
+from app.services.llm.llm_config import CONVERSATION_STATE_TTL, CONVERSATION_STATE_MAXSIZE
+from app.services.llm.llm_client_setup import logger
+
+# session_id -> (last response id, conversation length in messages on the next turn)
+conversation_state: TTLCache = TTLCache(maxsize=CONVERSATION_STATE_MAXSIZE, ttl=CONVERSATION_STATE_TTL)
+
+
+def conversation_key(employee_id: Optional[str], session_id: Optional[str]) -> Optional[str]:
+    """Bind a chain to the employee so a session ID alone cannot resume someone else's conversation."""
+    return f"{employee_id}:{session_id}" if session_id else None
+
+
+def _conversation_length(history: Optional[List[Dict[str, Any]]], turn: Optional[int]) -> int:
+    """Messages before the current one: two per earlier turn if the turn count is known, else the history length."""
+    return 2 * turn if turn is not None else len(history or [])
+
+
+def get_previous_response_id(
+    session_id: Optional[str],
+    history: Optional[List[Dict[str, Any]]],
+    turn: Optional[int] = None
+) -> Optional[str]:
+    """
+    Return the response ID to chain from, or None if the chain is unknown or out of sync.
+    The chain is in sync when the client history is exactly what the server has already seen.
+    """
+    if not session_id:
+        return None
+    state: Optional[Tuple[str, int]] = conversation_state.get(session_id)
+    if state is None:
+        return None
+    response_id, expected_length = state
+    if _conversation_length(history, turn) != expected_length:
+        logger.info(f"Conversation chain out of sync for session {session_id}, sending full history")
+        forget_conversation(session_id)
+        return None
+    return response_id
+
+
+def remember_response(
+    session_id: Optional[str],
+    history: Optional[List[Dict[str, Any]]],
+    response: Any,
+    turn: Optional[int] = None
+) -> None:
+    """Store the last response ID of a turn; the next turn's history adds the user message and the reply."""
+    remember_response_id(session_id, history, getattr(response, "id", None), turn)
+
+
+def remember_response_id(
+    session_id: Optional[str],
+    history: Optional[List[Dict[str, Any]]],
+    response_id: Optional[str],
+    turn: Optional[int] = None
+) -> None:
+    """Store the response ID a turn on top of this history ended with."""
+    if not session_id or not response_id:
+        return
+    conversation_state[session_id] = (response_id, _conversation_length(history, turn) + 2)
+
+
+def get_turn_response_id(
+    session_id: Optional[str],
+    history: Optional[List[Dict[str, Any]]],
+    turn: Optional[int] = None
+) -> Optional[str]:
+    """Return the response ID remembered for the turn on top of this history, or None if none was."""
+    state: Optional[Tuple[str, int]] = conversation_state.get(session_id) if session_id else None
+    if state is None or state[1] != _conversation_length(history, turn) + 2:
+        return None
+    return state[0]
+
+
+def forget_conversation(session_id: Optional[str]) -> None:
+    """Drop the stored chain for a session."""
+    if session_id:
+        conversation_state.pop(session_id, None)
+
+
+def clear_conversation_state() -> None:
+    """Clear all stored conversation chains."""
+    conversation_state.clear()
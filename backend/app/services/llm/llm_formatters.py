@@ -1,27 +1,152 @@
 """
 Data formatting utilities for LLM client.
 """
-import json
 from typing import Any, Dict, List, Optional
+from app.services.serialization import dumps
+from app.services.llm.llm_config import (
+    OUTPUT_FORMAT_COMPACT,
+    TOOL_OUTPUT_FORMAT_DEFAULT,
+    TOOL_OUTPUT_FORMATS,
+    COMPACT_DURATION_DECIMALS,
+    COMPACT_TIMESTAMP_LENGTH,
+    TOOL_FETCH_CURRENT_USER_DATA,
+    TOOL_FETCH_CISO_DATA,
+    TOOL_FETCH_DIFFERENT_EMPLOYEE,
+    TOOL_GET_EMPLOYEES_BY_STATUS,
+    TOOL_GET_STATISTICS,
+    TOOL_GET_COMPLETION_TIMESERIES,
+    TOOL_GET_VIDEO_FUNNEL,
+    TOOL_GET_TIME_LEADERBOARD
+)
 
+# Schema legends for compact outputs, appended to the tool descriptions so the model can read them
+COMPACT_EMPLOYEE_DATA_LEGEND = (
+    "Output is compact JSON: id, name, last, div = employee id, first name, last name, division; "
+    "status = training status; videos = table with cols video, start, finish, days "
+    "(start/finish as YYYY-MM-DD HH:MM, days = days taken to finish the video, null = not started or not finished)."
+)
+COMPACT_EMPLOYEE_LIST_LEGEND = (
+    "Output is compact JSON: cols names the fields of each row "
+    "(id = employee id, name = first name, last = last name, div = division); count = number of employees."
+)
+COMPACT_STATISTICS_LEGEND = "Times are in days, rounded to 2 decimals."
+COMPACT_TIMESERIES_LEGEND = (
+    "Output is compact JSON: completions and video_activity are tables whose cols name the fields of each row "
+    "(bucket = the day, or the Monday of the week; done = employees who finished the training in the bucket; "
+    "total = finished by the end of the bucket; pct = total as a percentage of all employees)."
+)
+COMPACT_FUNNEL_LEGEND = (
+    "Output is compact JSON: stages is a table whose cols name the fields of each video "
+    "(started, finished = employees; stalled = started but not finished; watch_* = days spent watching; "
+    "dropped = finished but never started the next video; gap_* = days before starting the next video; "
+    "med, p90 = median and 90th percentile; null = not applicable)."
+)
+COMPACT_LEADERBOARD_LEGEND = (
+    "Output is compact JSON: employees is a table whose cols name the fields of each row "
+    "(id, name, last, div = employee id, first name, last name, division; days = days from first start to last finish)."
+)
 
-def format_json_output(data: Any, error_message: str) -> str:
+TOOL_OUTPUT_LEGENDS = {
+    TOOL_FETCH_CURRENT_USER_DATA: COMPACT_EMPLOYEE_DATA_LEGEND,
+    TOOL_FETCH_CISO_DATA: COMPACT_EMPLOYEE_DATA_LEGEND,
+    TOOL_FETCH_DIFFERENT_EMPLOYEE: COMPACT_EMPLOYEE_DATA_LEGEND,
+    TOOL_GET_EMPLOYEES_BY_STATUS: COMPACT_EMPLOYEE_LIST_LEGEND,
+    TOOL_GET_STATISTICS: COMPACT_STATISTICS_LEGEND,
+    TOOL_GET_COMPLETION_TIMESERIES: COMPACT_TIMESERIES_LEGEND,
+    TOOL_GET_VIDEO_FUNNEL: COMPACT_FUNNEL_LEGEND,
+    TOOL_GET_TIME_LEADERBOARD: COMPACT_LEADERBOARD_LEGEND,
+}
+
+
+def is_compact_output(tool_name: str) -> bool:
+    """Check whether a tool's output is encoded in the compact format."""
+    return TOOL_OUTPUT_FORMATS.get(tool_name, TOOL_OUTPUT_FORMAT_DEFAULT) == OUTPUT_FORMAT_COMPACT
+
+
+def with_output_legend(tool: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the tool definition with the compact schema legend appended to its description, if it applies."""
+    legend = TOOL_OUTPUT_LEGENDS.get(tool.get("name"))
+    if not legend or not is_compact_output(tool["name"]):
+        return tool
+    return {**tool, "description": f"{tool['description']} {legend}"}
+
+
+def format_json_output(data: Any, error_message: str, compact: bool = False) -> str:
     """Format data as JSON string with error handling."""
     if data:
-        return json.dumps(data)
-    return json.dumps({"error": error_message})
+        return dumps(_round_floats(data) if compact else data)
+    return dumps({"error": error_message})
+
 
+def _round_floats(data: Any) -> Any:
+    """Round every float in a nested structure to the compact duration precision."""
+    if isinstance(data, float):
+        return round(data, COMPACT_DURATION_DECIMALS)
+    if isinstance(data, dict):
+        return {key: _round_floats(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_round_floats(value) for value in data]
+    return data
 
-def format_employee_data_output(employee_data: Optional[Dict[str, Any]], error_message: str = "Employee data not found") -> str:
+
+def _short_timestamp(timestamp: Optional[str]) -> Optional[str]:
+    """Drop the seconds from a timestamp."""
+    return timestamp[:COMPACT_TIMESTAMP_LENGTH] if timestamp else None
+
+
+def encode_columnar(columns: List[str], rows: List[List[Any]]) -> Dict[str, Any]:
+    """Encode a list of records as a column header plus value rows."""
+    return {"cols": columns, "rows": rows}
+
+
+def compact_employee_data(employee_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Encode fetch_employee_data output with short keys, a video table and rounded durations."""
+    personal = employee_data.get("personal data", {})
+    video_names = [
+        key[len("started_"):-len("_video_time")]
+        for key in employee_data
+        if key.startswith("started_") and key.endswith("_video_time")
+    ]
+    rows = []
+    for name in video_names:
+        finished = employee_data.get(f"finished_{name}_video_time")
+        days = employee_data.get(f"time_to_finish_{name}_video")
+        rows.append([
+            name,
+            _short_timestamp(employee_data.get(f"started_{name}_video_time")),
+            _short_timestamp(finished),
+            round(days, COMPACT_DURATION_DECIMALS) if finished and days is not None else None,
+        ])
+    return {
+        "id": personal.get("employee_id"),
+        "name": personal.get("employee_name"),
+        "last": personal.get("employee_last_name"),
+        "div": personal.get("employee_division"),
+        "status": employee_data.get("training_status"),
+        "videos": encode_columnar(["video", "start", "finish", "days"], rows),
+    }
+
+
+def format_employee_data_output(
+    employee_data: Optional[Dict[str, Any]],
+    error_message: str = "Employee data not found",
+    compact: bool = False
+) -> str:
     """Format employee data as JSON string with error handling."""
+    if compact and employee_data:
+        return format_json_output(compact_employee_data(employee_data), error_message, compact=True)
     return format_json_output(employee_data, error_message)
 
 
-def format_employees_by_status(employees: List[Any]) -> Dict[str, Any]:
+def format_employees_by_status(employees: List[Any], compact: bool = False) -> Dict[str, Any]:
     """Format employee list with status into structured format."""
     if not employees:
         return {"error": "No employees found with this status", "employees": [], "count": 0}
-    
+
+    if compact:
+        rows = [[emp[0], emp[1], emp[2], emp[3] if len(emp) > 3 else None] for emp in employees]
+        return {"employees": encode_columnar(["id", "name", "last", "div"], rows), "count": len(rows)}
+
     formatted_employees = [
         {
             "employee_id": emp[0],
@@ -33,3 +158,72 @@ def format_employees_by_status(employees: List[Any]) -> Dict[str, Any]:
     ]
     return {"employees": formatted_employees, "count": len(formatted_employees)}
 
+
+def format_completion_timeseries(series: Dict[str, Any], last_buckets: int, compact: bool = False) -> Dict[str, Any]:
+    """Keep the most recent buckets of a completion time series, encoded as tables when compact."""
+    buckets = sorted({row["bucket"] for row in series["completions"]} | {row["bucket"] for row in series["video_activity"]})
+    kept = set(buckets[-last_buckets:]) if last_buckets > 0 else set()
+    completions = [row for row in series["completions"] if row["bucket"] in kept]
+    video_activity = [row for row in series["video_activity"] if row["bucket"] in kept]
+    trimmed = {
+        "granularity": series["granularity"],
+        "total_employees": series["total_employees"],
+        "buckets_omitted": len(buckets) - len(kept),
+    }
+    if not compact:
+        return {**trimmed, "completions": completions, "video_activity": video_activity}
+    return {
+        **trimmed,
+        "completions": encode_columnar(
+            ["bucket", "done", "total", "pct"],
+            [[row["bucket"], row["completed"], row["cumulative_completed"], row["cumulative_finished_percentage"]] for row in completions]
+        ),
+        "video_activity": encode_columnar(
+            ["bucket", "video", "started", "finished"],
+            [[row["bucket"], row["video"], row["started"], row["finished"]] for row in video_activity]
+        ),
+    }
+
+
+def _compact_days(days: Optional[float]) -> Optional[float]:
+    return round(days, COMPACT_DURATION_DECIMALS) if days is not None else None
+
+
+def format_video_funnel(funnel: Dict[str, Any], compact: bool = False) -> Dict[str, Any]:
+    """Format the per-video funnel, as one table row per video when compact."""
+    if not compact:
+        return funnel
+    rows = []
+    for stage in funnel["stages"]:
+        watch = stage["watch_time"]
+        gap = stage.get("gap_to_next_video", {})
+        rows.append([
+            stage["video"], stage["started"], stage["finished"], stage["started_not_finished"],
+            _compact_days(watch["median_days"]), _compact_days(watch["p90_days"]),
+            stage.get("finished_not_started_next"),
+            _compact_days(gap.get("median_days")), _compact_days(gap.get("p90_days")),
+        ])
+    return {
+        "total_employees": funnel["total_employees"],
+        "stages": encode_columnar(
+            ["video", "started", "finished", "stalled", "watch_med", "watch_p90", "dropped", "gap_med", "gap_p90"], rows
+        ),
+    }
+
+
+def format_time_leaderboard(
+    ranked: List[Dict[str, Any]],
+    order: str,
+    status: str,
+    division: Optional[str],
+    compact: bool = False
+) -> Dict[str, Any]:
+    """Format a time-to-finish leaderboard, as a table in rank order when compact."""
+    header = {"order": order, "status": status, "division": division, "count": len(ranked)}
+    if not compact:
+        return {**header, "employees": ranked}
+    rows = [
+        [emp["employee_id"], emp["employee_name"], emp["employee_last_name"], emp["employee_division"], _compact_days(emp["days"])]
+        for emp in ranked
+    ]
+    return {**header, "employees": encode_columnar(["id", "name", "last", "div", "days"], rows)}
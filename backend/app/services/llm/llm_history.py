@@ -0,0 +1,132 @@
+"""
+Token-budgeted conversation history with a rolling summary of older turns.
+
+Older turns are folded into the summary in chunks of HISTORY_SUMMARY_CHUNK_MESSAGES: while a chunk fills
+up its messages stay verbatim (as long as they fit the budget) and the cached summary is reused, so
+the extra summarization call happens once per chunk instead of on every turn of a long session.
+"""
+import hashlib
+import time
+from typing import Optional, List, Dict, Any, Tuple
+from app.services.llm.llm_client_setup import client, logger
+from app.services.llm.llm_config import (
+    MODEL_NAME,
+    HISTORY_TOKEN_BUDGET,
+    HISTORY_KEEP_LAST_MESSAGES,
+    HISTORY_SUMMARY_MAX_TOKENS,
+    HISTORY_SUMMARY_CHUNK_MESSAGES,
+    HISTORY_SUMMARY_ROLE,
+    HISTORY_SUMMARY_PREFIX,
+    INSTRUCTION_SUMMARIZE_HISTORY,
+    CHARS_PER_TOKEN,
+    TOKENS_PER_MESSAGE
+)
+from app.services.llm.llm_responses import build_prompt
+from app.services.llm.llm_resilience import resilient_create
+from app.services.llm.llm_metrics import record_llm_call, PHASE_HISTORY_SUMMARY
+from app.services.cache.llm_cache import summary_cache
+from app.services.serialization import dumps_bytes
+
+
+def estimate_tokens(text: Any) -> int:
+    """Estimate the token count of a text locally, without calling a tokenizer service."""
+    if not text:
+        return 0
+    return -(-len(str(text)) // CHARS_PER_TOKEN)
+
+
+def estimate_message_tokens(messages: List[Dict[str, Any]]) -> int:
+    """Estimate the token count of a list of chat messages, including per-message overhead."""
+    return sum(estimate_tokens(msg.get("content", "")) + TOKENS_PER_MESSAGE for msg in messages)
+
+
+def split_history(
+    history: List[Dict[str, Any]],
+    token_budget: int = HISTORY_TOKEN_BUDGET,
+    keep_last: int = HISTORY_KEEP_LAST_MESSAGES,
+    reserved_tokens: int = 0
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Split history into (messages to fold into the summary, messages to keep verbatim).
+    At most keep_last messages are kept, fewer if they do not fit the budget next to the summary.
+    """
+    available = token_budget - reserved_tokens
+    split = max(0, len(history) - max(keep_last, 0))
+    while split < len(history):
+        summary_tokens = HISTORY_SUMMARY_MAX_TOKENS if split > 0 else 0
+        if estimate_message_tokens(history[split:]) + summary_tokens <= available:
+            break
+        split += 1
+    return history[:split], history[split:]
+
+
+def _prefix_digests(messages: List[Dict[str, Any]]) -> List[str]:
+    """Return a digest for every prefix of messages, so a longer prefix can extend a cached shorter one."""
+    hasher = hashlib.md5()
+    digests = [hasher.hexdigest()]
+    for msg in messages:
+        hasher.update(dumps_bytes(msg, sort_keys=True))
+        digests.append(hasher.hexdigest())
+    return digests
+
+
+async def _summarize(previous_summary: Optional[str], messages: List[Dict[str, Any]]) -> str:
+    """Ask the model to extend the previous summary with new messages."""
+    transcript = "\n".join(f"{msg.get('role', 'user')}: {msg.get('content', '')}" for msg in messages)
+    prompt = f"Previous summary: {previous_summary or 'none'}\n\nNew messages:\n{transcript}"
+    started = time.perf_counter()
+    response = await resilient_create(
+        client,
+        model=MODEL_NAME,
+        input=[{"role": "user", "content": prompt}],
+        instructions=INSTRUCTION_SUMMARIZE_HISTORY,
+        max_output_tokens=HISTORY_SUMMARY_MAX_TOKENS
+    )
+    record_llm_call(PHASE_HISTORY_SUMMARY, response, (time.perf_counter() - started) * 1000)
+    return (getattr(response, "output_text", None) or "").strip()
+
+
+async def summarize_history(messages: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    Return a summary of messages, reusing cached summaries.
+    Only the messages after the longest already-summarized prefix are sent to the model.
+    """
+    if not messages:
+        return None
+    digests = _prefix_digests(messages)
+    if digests[-1] in summary_cache:
+        return summary_cache[digests[-1]]
+
+    start, previous_summary = 0, None
+    for prefix_length in range(len(messages) - 1, 0, -1):
+        if digests[prefix_length] in summary_cache:
+            start, previous_summary = prefix_length, summary_cache[digests[prefix_length]]
+            break
+
+    try:
+        summary = await _summarize(previous_summary, messages[start:])
+    except Exception as e:
+        logger.warning(f"History summarization failed, using previous summary: {e}")
+        return previous_summary
+    if summary:
+        summary_cache[digests[-1]] = summary
+    return summary or previous_summary
+
+
+async def build_budgeted_prompt(user_message: str, history: Optional[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Build the prompt like build_prompt, keeping recent turns verbatim and older turns as a summary."""
+    history = history or []
+    reserved_tokens = estimate_message_tokens([{"content": user_message}])
+    folded, recent = split_history(history, reserved_tokens=reserved_tokens)
+    # Only whole chunks go into the summary; the rest of the folded messages stay verbatim if they fit
+    chunked = len(folded) - len(folded) % HISTORY_SUMMARY_CHUNK_MESSAGES
+    available = HISTORY_TOKEN_BUDGET - reserved_tokens - HISTORY_SUMMARY_MAX_TOKENS
+    if estimate_message_tokens(folded[chunked:] + recent) <= available:
+        folded, recent = folded[:chunked], folded[chunked:] + recent
+    window = list(recent)
+    if folded:
+        summary = await summarize_history(folded)
+        if summary:
+            window.insert(0, {"role": HISTORY_SUMMARY_ROLE, "content": HISTORY_SUMMARY_PREFIX + summary})
+        logger.info(f"History window: {len(recent)} recent messages kept, {len(folded)} folded into summary")
+    return build_prompt(user_message, window)
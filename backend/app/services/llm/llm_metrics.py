@@ -0,0 +1,184 @@
+"""
+Per-turn LLM token and phase-latency accounting, aggregated into rolling per-role statistics.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, asdict
+from functools import wraps
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+from app.services.serialization import dumps
+
+logger = logging.getLogger("llm_metrics")
+
+# Number of recent turns kept per (role, query type) for the rolling statistics
+TURN_STATS_WINDOW = 500
+
+PHASE_INITIAL_REQUEST = "initial_request"
+PHASE_TOOLS = "tools"
+PHASE_FOLLOW_UP_REQUEST = "follow_up_request"
+PHASE_HISTORY_SUMMARY = "history_summary"
+
+
+@dataclass
+class LLMCallUsage:
+    phase: str
+    duration_ms: float
+    input_tokens: int = 0
+    cached_tokens: int = 0
+    output_tokens: int = 0
+
+
+@dataclass
+class TurnAccounting:
+    role: str
+    query_type: str
+    calls: List[LLMCallUsage] = field(default_factory=list)
+    phases_ms: Dict[str, float] = field(default_factory=dict)
+    tools_invoked: int = 0
+    cache_hit: Optional[bool] = None
+    total_ms: float = 0.0
+
+    def totals(self) -> Dict[str, int]:
+        return {
+            "input_tokens": sum(call.input_tokens for call in self.calls),
+            "cached_tokens": sum(call.cached_tokens for call in self.calls),
+            "output_tokens": sum(call.output_tokens for call in self.calls),
+        }
+
+
+_current_turn: ContextVar[Optional[TurnAccounting]] = ContextVar("llm_current_turn", default=None)
+
+
+def current_turn() -> Optional[TurnAccounting]:
+    """The accounting record of the chat turn being processed, if any."""
+    return _current_turn.get()
+
+
+def record_cache_result(hit: bool) -> None:
+    """Record whether the current turn was served from the LLM cache."""
+    turn = _current_turn.get()
+    if turn is not None and turn.cache_hit is None:
+        turn.cache_hit = hit
+
+
+def record_tools_invoked(count: int) -> None:
+    """Add to the number of tools invoked in the current turn."""
+    turn = _current_turn.get()
+    if turn is not None:
+        turn.tools_invoked += count
+
+
+def record_llm_call(phase: str, response: Any, duration_ms: float) -> None:
+    """Record one Responses API call with the token usage reported by the API."""
+    turn = _current_turn.get()
+    if turn is None:
+        return
+    usage = getattr(response, "usage", None)
+    input_details = getattr(usage, "input_tokens_details", None)
+    turn.calls.append(LLMCallUsage(
+        phase=phase,
+        duration_ms=duration_ms,
+        input_tokens=getattr(usage, "input_tokens", 0) or 0,
+        cached_tokens=getattr(input_details, "cached_tokens", 0) or 0,
+        output_tokens=getattr(usage, "output_tokens", 0) or 0,
+    ))
+    turn.phases_ms[phase] = turn.phases_ms.get(phase, 0.0) + duration_ms
+
+
+@contextmanager
+def track_phase(phase: str) -> Iterator[None]:
+    """Add the wall time of the block to a phase of the current turn."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        turn = _current_turn.get()
+        if turn is not None:
+            turn.phases_ms[phase] = turn.phases_ms.get(phase, 0.0) + (time.perf_counter() - started) * 1000
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+
+def _mean(values: List[float]) -> float:
+    return sum(values) / len(values) if values else 0.0
+
+
+class TurnStatsAggregator:
+    """Rolling window of recent turns per (role, query type)."""
+
+    def __init__(self, window: int = TURN_STATS_WINDOW):
+        self.window = window
+        self.lock = threading.Lock()
+        self.turns: Dict[Tuple[str, str], Deque[TurnAccounting]] = defaultdict(lambda: deque(maxlen=self.window))
+
+    def add(self, turn: TurnAccounting) -> None:
+        with self.lock:
+            self.turns[(turn.role, turn.query_type)].append(turn)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.turns.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Rolling statistics keyed by "role/query_type"."""
+        with self.lock:
+            groups = {key: list(turns) for key, turns in self.turns.items()}
+        stats: Dict[str, Any] = {}
+        for (role, query_type), turns in groups.items():
+            totals = [turn.totals() for turn in turns]
+            lookups = [turn.cache_hit for turn in turns if turn.cache_hit is not None]
+            phase_names = sorted({phase for turn in turns for phase in turn.phases_ms})
+            latencies = [turn.total_ms for turn in turns]
+            stats[f"{role}/{query_type}"] = {
+                "turns": len(turns),
+                "cache_hit_rate": sum(lookups) / len(lookups) if lookups else None,
+                "latency_ms": {
+                    "mean": _mean(latencies),
+                    "p50": _percentile(latencies, 50),
+                    "p95": _percentile(latencies, 95),
+                    "max": max(latencies),
+                },
+                "mean_phase_ms": {
+                    phase: _mean([turn.phases_ms.get(phase, 0.0) for turn in turns]) for phase in phase_names
+                },
+                "mean_llm_calls": _mean([len(turn.calls) for turn in turns]),
+                "mean_tools_invoked": _mean([turn.tools_invoked for turn in turns]),
+                "mean_input_tokens": _mean([total["input_tokens"] for total in totals]),
+                "mean_cached_tokens": _mean([total["cached_tokens"] for total in totals]),
+                "mean_output_tokens": _mean([total["output_tokens"] for total in totals]),
+            }
+        return stats
+
+
+turn_stats = TurnStatsAggregator()
+
+
+def account_turn(role: str) -> Callable:
+    """
+    Decorator for the async query functions: accounts one chat turn and adds it to the rolling stats.
+    Must wrap cache_llm so cache hits are accounted too.
+    """
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            turn = TurnAccounting(role=role, query_type=func.__name__)
+            token = _current_turn.set(turn)
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                turn.total_ms = (time.perf_counter() - started) * 1000
+                _current_turn.reset(token)
+                turn_stats.add(turn)
+                logger.info(dumps({"llm_turn": asdict(turn), "totals": turn.totals()}))
+        return wrapper
+    return decorator
@@ -1,12 +1,27 @@
 """
 Main query execution functions for LLM client.
 """
-from typing import Optional, List, Dict, Any, Tuple
+import asyncio
+import time
+from functools import partial
+from typing import Optional, List, Dict, Any, Tuple, Callable, Awaitable
+from app.db.regular_employee import fetch_employee_data
 from app.services.llm.llm_client_setup import client, logger
 from app.services.llm.llm_config import (
     MODEL_NAME,
     INSTRUCTION_AUTHENTICATE,
     INSTRUCTION_TRAINING_ASSISTANT,
+    CONVERSATION_STATE_ENABLED,
+    INSTRUCTION_PREINJECTED_CONTEXT,
+    PREINJECT_CONTEXT_ROLES,
+    PREINJECTED_CONTEXT_ROLE,
+    ROLE_EMPLOYEE,
+    ROLE_CISO,
+    ROLE_ANONYMOUS,
+    TOOL_FETCH_CURRENT_USER_DATA,
+    DEGRADED_RESPONSE_MESSAGE,
+    AUTH_SUCCESS_MESSAGE,
+    AUTH_FAILURE_MESSAGE,
     KEY_EXISTS, KEY_OUTPUT
 )
 from app.services.llm.llm_responses import (
@@ -17,6 +32,22 @@ from app.services.llm.llm_responses import (
     build_prompt
 )
 from app.services.llm.llm_tool_handlers import get_function_call_outputs
+from app.services.llm.llm_resilience import resilient_create, CircuitOpenError, DeadlineExceededError
+from app.services.llm.llm_scheduler import SchedulerRejectedError
+from app.services.llm.llm_formatters import (
+    format_employee_data_output,
+    is_compact_output,
+    with_output_legend,
+    COMPACT_EMPLOYEE_DATA_LEGEND
+)
+from app.services.llm.llm_history import build_budgeted_prompt
+from app.services.llm.llm_auth_fast_path import try_fast_authentication
+from app.services.llm.llm_conversation_state import (
+    conversation_key,
+    get_previous_response_id,
+    remember_response,
+    forget_conversation
+)
 from app.services.agent_tools.tools import (
     CHECK_IF_EMPLOYEE_EXISTS_BY_ID_AND_NAME,
     FETCH_CURRENT_EMPLOYEE_DATA,
@@ -24,9 +55,100 @@ from app.services.agent_tools.tools import (
     GET_STATISTIC_SUMMARY_ON_TRAINING,
     FETCH_CURRENT_CISO_EMPLOYEE_DATA,
     GET_ALL_EMPLOYEES_WITH_THIS_TRAINING_STATUS,
-    FETCH_DIFFERENT_EMPLOYEE_DATA
+    FETCH_DIFFERENT_EMPLOYEE_DATA,
+    GET_TRAINING_COMPLETION_TIMESERIES,
+    GET_TRAINING_VIDEO_FUNNEL,
+    GET_TRAINING_TIME_LEADERBOARD
+)
+from app.services.llm.llm_metrics import (
+    account_turn,
+    record_llm_call,
+    record_tools_invoked,
+    track_phase,
+    PHASE_INITIAL_REQUEST,
+    PHASE_TOOLS,
+    PHASE_FOLLOW_UP_REQUEST
 )
 from app.services.cache.llm_cache import cache_llm
+from app.services.tracing import span, traced
+
+# Tool lists and instructions per role, built once at import with the output legends of the selected formats
+AUTHENTICATION_TOOLS = [CHECK_IF_EMPLOYEE_EXISTS_BY_ID_AND_NAME]
+CISO_TOOLS = [
+    with_output_legend(tool) for tool in (
+        GET_STATISTIC_SUMMARY_ON_TRAINING,
+        FETCH_CURRENT_CISO_EMPLOYEE_DATA,
+        GET_ALL_EMPLOYEES_WITH_THIS_TRAINING_STATUS,
+        FETCH_DIFFERENT_EMPLOYEE_DATA,
+        GET_TRAINING_COMPLETION_TIMESERIES,
+        GET_TRAINING_VIDEO_FUNNEL,
+        GET_TRAINING_TIME_LEADERBOARD
+    )
+]
+EMPLOYEE_TOOLS = [
+    with_output_legend(tool) for tool in (FETCH_CURRENT_EMPLOYEE_DATA, FETCH_CURRENT_EMPLOYEE_TRAINING_STATUS)
+]
+CISO_INSTRUCTIONS = INSTRUCTION_TRAINING_ASSISTANT.format(user_type="the ciso")
+EMPLOYEE_INSTRUCTIONS = INSTRUCTION_TRAINING_ASSISTANT.format(user_type="an employee")
+
+# Smoothed duration of follow-up requests, used to report the latency saved by pre-injected context
+FOLLOW_UP_LATENCY_SMOOTHING = 0.2
+_follow_up_latency_ms: Optional[float] = None
+
+
+def _record_follow_up_latency(duration_ms: float) -> None:
+    """Update the smoothed follow-up request duration."""
+    global _follow_up_latency_ms
+    if _follow_up_latency_ms is None:
+        _follow_up_latency_ms = duration_ms
+    else:
+        _follow_up_latency_ms += FOLLOW_UP_LATENCY_SMOOTHING * (duration_ms - _follow_up_latency_ms)
+
+
+async def _load_current_employee_context(employee_id: Optional[str], employee_name: Optional[str]) -> Optional[str]:
+    """Fetch the current employee's profile and training status for pre-injection."""
+    started = time.perf_counter()
+    employee_data = await asyncio.to_thread(fetch_employee_data, employee_id, employee_name)
+    logger.info(f"Pre-injected context loaded in {(time.perf_counter() - started) * 1000:.1f} ms")
+    if not employee_data:
+        return None
+    if is_compact_output(TOOL_FETCH_CURRENT_USER_DATA):
+        return f"{COMPACT_EMPLOYEE_DATA_LEGEND} {format_employee_data_output(employee_data, compact=True)}"
+    return format_employee_data_output(employee_data)
+
+
+def _get_context_loader(role: str, employee_id: Optional[str], employee_name: Optional[str]) -> Optional[Callable[[], Awaitable[Optional[str]]]]:
+    """Return the context loader for a role if pre-injection is enabled for it."""
+    if role not in PREINJECT_CONTEXT_ROLES or not employee_id or not employee_name:
+        return None
+    return partial(_load_current_employee_context, employee_id, employee_name)
+
+
+async def _with_preinjected_context(messages: List[Dict[str, Any]], context_task: Optional["asyncio.Task"]) -> List[Dict[str, Any]]:
+    """Insert the pre-fetched user context right before the current user message."""
+    if context_task is None:
+        return messages
+    context = await context_task
+    if not context:
+        return messages
+    context_message = {"role": PREINJECTED_CONTEXT_ROLE, "content": INSTRUCTION_PREINJECTED_CONTEXT.format(context=context)}
+    return messages[:-1] + [context_message] + messages[-1:]
+
+
+async def _create_model_response(phase: str, **kwargs: Any) -> Any:
+    """Call the Responses API through the resilience layer and account the call to the current turn."""
+    started = time.perf_counter()
+    with span("llm.responses.create", phase=phase) as call_span:
+        response = await resilient_create(client, **kwargs)
+        usage = getattr(response, "usage", None)
+        call_span.set(input_tokens=getattr(usage, "input_tokens", None), output_tokens=getattr(usage, "output_tokens", None))
+    record_llm_call(phase, response, (time.perf_counter() - started) * 1000)
+    return response
+
+
+def _is_lost_chain_error(error: Exception) -> bool:
+    """Check whether an API error means the previous response can no longer be chained from."""
+    return getattr(error, "status_code", None) in (400, 404)
 
 
 async def _make_initial_request(
@@ -36,27 +158,82 @@ async def _make_initial_request(
     instructions: str,
     max_tool_calls: int,
     employee_id: Optional[str] = None,
-    employee_name: Optional[str] = None
+    employee_name: Optional[str] = None,
+    session_id: Optional[str] = None,
+    context_task: Optional["asyncio.Task"] = None,
+    turn: Optional[int] = None
 ) -> Tuple[Any, List[Dict[str, Any]], List[Dict[str, Any]], Optional[str], Optional[str]]:
     """Make initial API request and process function calls."""
-    messages = build_prompt(user_message, history)
-    response = await client.responses.create(
-        model=MODEL_NAME,
-        input=messages,
-        instructions=instructions,
-        tools=tools,
-        max_tool_calls=max_tool_calls
-    )
-    function_call_outputs, extracted_employee_id, extracted_employee_name = await get_function_call_outputs(
-        response.output,
-        current_employee_id=employee_id,
-        current_employee_name=employee_name
-    )
+    previous_response_id = get_previous_response_id(session_id, history, turn) if CONVERSATION_STATE_ENABLED else None
+    response = None
+    if previous_response_id:
+        # The first turn of the chain already carried the pre-injected context, which the model still sees
+        messages = build_prompt(user_message, None)
+        try:
+            response = await _create_model_response(
+                PHASE_INITIAL_REQUEST,
+                model=MODEL_NAME,
+                input=messages,
+                instructions=instructions,
+                tools=tools,
+                max_tool_calls=max_tool_calls,
+                previous_response_id=previous_response_id,
+                store=True
+            )
+        except Exception as e:
+            if not _is_lost_chain_error(e):
+                raise
+            logger.info(f"Conversation chain lost for session {session_id}, falling back to full history: {e}")
+            forget_conversation(session_id)
+    if response is None:
+        messages = await _with_preinjected_context(await build_budgeted_prompt(user_message, history), context_task)
+        response = await _create_model_response(
+            PHASE_INITIAL_REQUEST,
+            model=MODEL_NAME,
+            input=messages,
+            instructions=instructions,
+            tools=tools,
+            max_tool_calls=max_tool_calls
+        )
+    with track_phase(PHASE_TOOLS), span("get_function_call_outputs"):
+        function_call_outputs, extracted_employee_id, extracted_employee_name = await get_function_call_outputs(
+            response.output,
+            current_employee_id=employee_id,
+            current_employee_name=employee_name
+        )
+    record_tools_invoked(len(function_call_outputs))
     logger.info(f"Function call outputs: {function_call_outputs}")
 
     return response, messages, function_call_outputs, extracted_employee_id, extracted_employee_name
 
 
+async def _make_follow_up_request(
+    response: Any,
+    messages: List[Dict[str, Any]],
+    function_call_outputs: List[Dict[str, Any]],
+    instructions: str
+) -> Any:
+    """Send tool outputs back to the model, chaining from the previous response when possible."""
+    response_id = getattr(response, "id", None)
+    if CONVERSATION_STATE_ENABLED and response_id:
+        return await _create_model_response(
+            PHASE_FOLLOW_UP_REQUEST,
+            model=MODEL_NAME,
+            input=function_call_outputs,
+            instructions=instructions,
+            previous_response_id=response_id,
+            store=True
+        )
+    messages_with_outputs = build_messages_with_function_calls(messages, response.output, function_call_outputs)
+    logger.info(f"Messages with outputs: {function_call_outputs}")
+    return await _create_model_response(
+        PHASE_FOLLOW_UP_REQUEST,
+        model=MODEL_NAME,
+        input=messages_with_outputs,
+        instructions=instructions,
+    )
+
+
 async def execute_query_with_tools(
     user_message: str,
     history: Optional[List[Dict[str, Any]]],
@@ -64,42 +241,69 @@ async def execute_query_with_tools(
     instructions: str,
     max_tool_calls: int,
     employee_id: Optional[str] = None,
-    employee_name: Optional[str] = None
+    employee_name: Optional[str] = None,
+    session_id: Optional[str] = None,
+    context_loader: Optional[Callable[[], Awaitable[Optional[str]]]] = None,
+    turn: Optional[int] = None
 ) -> Dict[str, Any]:
     """
     Generic function to execute a query with tools.
     Handles the common pattern of: make request -> process function calls -> make final request.
+    When a session_id is given, turns are chained server-side so only the new message is sent; a bounded
+    server-side log also passes its turn count, since its length stops growing.
+    When a context_loader is given, its context is fetched while the prompt is built and sent with the
+    first turn of a chain, so most questions are answered without a tool round trip.
     """
+    chain_key = conversation_key(employee_id, session_id)
+    context_task = asyncio.create_task(context_loader()) if context_loader else None
     try:
+        started = time.perf_counter()
         response, messages, function_call_outputs, _, _ = await _make_initial_request(
-            user_message, history, tools, instructions, max_tool_calls, employee_id, employee_name
+            user_message, history, tools, instructions, max_tool_calls, employee_id, employee_name, chain_key,
+            context_task=context_task, turn=turn
         )
         if function_call_outputs:
-            messages_with_outputs = build_messages_with_function_calls(messages, response.output, function_call_outputs)
-            logger.info(f"Messages with outputs: {function_call_outputs}")
-            response = await client.responses.create(
-                model=MODEL_NAME,
-                input=messages_with_outputs,
-                instructions=instructions,
+            follow_up_started = time.perf_counter()
+            response = await _make_follow_up_request(response, messages, function_call_outputs, instructions)
+            _record_follow_up_latency((time.perf_counter() - follow_up_started) * 1000)
+        elif context_task is not None:
+            saved = f"~{_follow_up_latency_ms:.0f} ms" if _follow_up_latency_ms is not None else "one model round trip"
+            logger.info(
+                f"Answered from pre-injected context in {(time.perf_counter() - started) * 1000:.0f} ms, "
+                f"saved {saved} of tool round trip"
             )
+        if CONVERSATION_STATE_ENABLED:
+            remember_response(chain_key, history, response, turn)
         return create_response(extract_output_text(response), employee_id, employee_name)
+    except (CircuitOpenError, DeadlineExceededError, SchedulerRejectedError) as e:
+        logger.warning(f"Returning degraded response: {e}")
+        return create_response(DEGRADED_RESPONSE_MESSAGE, employee_id, employee_name)
     except Exception as e:
         return create_error_response(e, employee_id, employee_name)
+    finally:
+        if context_task is not None and not context_task.done():
+            context_task.cancel()
 
 
+@account_turn(ROLE_ANONYMOUS)
 @cache_llm
+@traced("llm.authenticate_employee")
 async def authenticate_employee(
     user_message: str,
     history: Optional[List[Dict[str, Any]]] = None,
 ) -> Dict[str, Any]:
     """
     Query OpenAI Responses API with authentication tools.
+    Messages with unambiguous credentials are authenticated locally without calling the model.
     """
     try:
+        fast_response = try_fast_authentication(user_message)
+        if fast_response is not None:
+            return fast_response
         response, _, function_call_outputs, extracted_employee_id, extracted_employee_name = await _make_initial_request(
             user_message=user_message,
             history=history,
-            tools=[CHECK_IF_EMPLOYEE_EXISTS_BY_ID_AND_NAME],
+            tools=AUTHENTICATION_TOOLS,
             instructions=INSTRUCTION_AUTHENTICATE,
             max_tool_calls=1
         )
@@ -107,58 +311,71 @@ async def authenticate_employee(
             return create_response(extract_output_text(response))
         exists = function_call_outputs[0].get(KEY_OUTPUT, {}).get(KEY_EXISTS, False)
         if not exists:
-            return create_response(
-                "You gave me the wrong name or id, or the user does not exist in the database. Please try again."
-            )
+            return create_response(AUTH_FAILURE_MESSAGE)
         return create_response(
-            f"Hi {extracted_employee_name}, how can I help you?",
+            AUTH_SUCCESS_MESSAGE.format(employee_name=extracted_employee_name),
             extracted_employee_id,
             extracted_employee_name
         )
+    except (CircuitOpenError, DeadlineExceededError, SchedulerRejectedError) as e:
+        logger.warning(f"Returning degraded response: {e}")
+        return create_response(DEGRADED_RESPONSE_MESSAGE)
     except Exception as e:
         return create_error_response(e)
 
 
+@account_turn(ROLE_CISO)
 @cache_llm
+@traced("llm.ciso_query")
 async def ciso_query(
     user_message: str,
     history: Optional[List[Dict[str, Any]]] = None,
     employee_id: Optional[str] = None,
-    employee_name: Optional[str] = None
+    employee_name: Optional[str] = None,
+    session_id: Optional[str] = None,
+    turn: Optional[int] = None
 ) -> Dict[str, Any]:
     """
     Query OpenAI Responses API with ciso tools.
     """
-    instructions = INSTRUCTION_TRAINING_ASSISTANT.format(user_type="the ciso")
     return await execute_query_with_tools(
         user_message=user_message,
         history=history,
-        tools=[GET_STATISTIC_SUMMARY_ON_TRAINING, FETCH_CURRENT_CISO_EMPLOYEE_DATA, GET_ALL_EMPLOYEES_WITH_THIS_TRAINING_STATUS, FETCH_DIFFERENT_EMPLOYEE_DATA],
-        instructions=instructions,
+        tools=CISO_TOOLS,
+        instructions=CISO_INSTRUCTIONS,
         max_tool_calls=3,
         employee_id=employee_id,
-        employee_name=employee_name
+        employee_name=employee_name,
+        session_id=session_id,
+        context_loader=_get_context_loader(ROLE_CISO, employee_id, employee_name),
+        turn=turn
     )
 
 
+@account_turn(ROLE_EMPLOYEE)
 @cache_llm
+@traced("llm.regular_employee_query")
 async def regular_employee_query(
     user_message: str,
     history: Optional[List[Dict[str, Any]]] = None,
     employee_id: Optional[str] = None,
-    employee_name: Optional[str] = None
+    employee_name: Optional[str] = None,
+    session_id: Optional[str] = None,
+    turn: Optional[int] = None
 ) -> Dict[str, Any]:
     """
     Query OpenAI Responses API with regular employee tools.
     """
-    instructions = INSTRUCTION_TRAINING_ASSISTANT.format(user_type="an employee")
     return await execute_query_with_tools(
         user_message=user_message,
         history=history,
-        tools=[FETCH_CURRENT_EMPLOYEE_DATA, FETCH_CURRENT_EMPLOYEE_TRAINING_STATUS],
-        instructions=instructions,
+        tools=EMPLOYEE_TOOLS,
+        instructions=EMPLOYEE_INSTRUCTIONS,
         max_tool_calls=1,
         employee_id=employee_id,
-        employee_name=employee_name
+        employee_name=employee_name,
+        session_id=session_id,
+        context_loader=_get_context_loader(ROLE_EMPLOYEE, employee_id, employee_name),
+        turn=turn
     )
 
@@ -0,0 +1,266 @@
+"""
+Resilience layer for OpenAI calls: request deadlines, jittered retries, hedged requests and a circuit breaker.
+Every attempt, hedged duplicates included, is admitted by the LLM scheduler first.
+"""
+import asyncio
+import random
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Optional, Iterator
+from app.services.llm.llm_client_setup import logger
+from app.services.llm.llm_config import (
+    ATTEMPT_TIMEOUT_SECONDS,
+    MAX_RETRIES,
+    RETRY_BASE_DELAY_SECONDS,
+    RETRY_MAX_DELAY_SECONDS,
+    RETRYABLE_STATUS_CODES,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_SECONDS,
+    HEDGE_ENABLED,
+    HEDGE_PERCENTILE,
+    HEDGE_MIN_SAMPLES,
+    LATENCY_SAMPLE_SIZE
+)
+from app.services.llm.llm_scheduler import (
+    scheduler,
+    estimate_request_tokens,
+    SchedulerRejectedError,
+    _rate_limit_delay
+)
+
+# Absolute monotonic deadline of the current request, shared by every LLM call and tool of a chat turn
+_request_deadline: ContextVar[Optional[float]] = ContextVar("llm_request_deadline", default=None)
+
+
+class DeadlineExceededError(Exception):
+    """Raised when the request deadline leaves no time for another LLM call."""
+
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker rejects a call because upstream is unhealthy."""
+
+
+@contextmanager
+def request_deadline(seconds: float) -> Iterator[None]:
+    """Start a deadline budget for everything awaited inside the block."""
+    token = _request_deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _request_deadline.reset(token)
+
+
+def remaining_budget() -> Optional[float]:
+    """Seconds left until the current request deadline, or None when no deadline is set."""
+    deadline = _request_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+    Opens after failure_threshold failures, then lets a single trial call through after reset_seconds.
+    """
+
+    def __init__(self, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD, reset_seconds: float = CIRCUIT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.reset()
+
+    def reset(self) -> None:
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.reset()
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self.trial_in_flight = False
+        if self.opened_at is not None or self.consecutive_failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"Circuit breaker opened after {self.consecutive_failures} consecutive failures")
+            self.opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies, used to pick the hedging delay."""
+
+    def __init__(self, sample_size: int = LATENCY_SAMPLE_SIZE):
+        self.samples: deque = deque(maxlen=sample_size)
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        if len(self.samples) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+        return ordered[index]
+
+
+circuit_breaker = CircuitBreaker()
+latency_tracker = LatencyTracker()
+
+
+def reset_resilience_state() -> None:
+    """Reset the circuit breaker, latency samples and scheduler."""
+    circuit_breaker.reset()
+    latency_tracker.samples.clear()
+    scheduler.reset()
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Check whether an error is transient: timeouts, connection errors and retryable HTTP statuses."""
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    # Only the SDK raises its connection errors, so there is nothing to check before it is imported
+    openai = sys.modules.get("openai")
+    if openai is not None and isinstance(error, openai.APIConnectionError):
+        return True
+    return getattr(error, "status_code", None) in RETRYABLE_STATUS_CODES
+
+
+def _retry_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(RETRY_MAX_DELAY_SECONDS, RETRY_BASE_DELAY_SECONDS * 2 ** attempt))
+
+
+def _attempt_timeout() -> float:
+    """Timeout for the next attempt, bounded by the remaining request budget."""
+    remaining = remaining_budget()
+    if remaining is None:
+        return ATTEMPT_TIMEOUT_SECONDS
+    if remaining <= 0:
+        raise DeadlineExceededError("Request deadline exceeded before calling the model")
+    return min(ATTEMPT_TIMEOUT_SECONDS, remaining)
+
+
+async def _timed_call(client: Any, kwargs: dict) -> Any:
+    """Call the Responses API and record the latency of successful calls."""
+    started = time.monotonic()
+    response = await client.responses.create(**kwargs)
+    latency_tracker.record(time.monotonic() - started)
+    return response
+
+
+async def _hedge_call(client: Any, kwargs: dict, tokens: int) -> Any:
+    """A hedged duplicate call, holding the scheduler slot taken for it until it finishes."""
+    response = None
+    try:
+        response = await _timed_call(client, kwargs)
+        return response
+    finally:
+        usage = getattr(response, "usage", None)
+        scheduler.release(tokens, getattr(usage, "total_tokens", None))
+
+
+async def _hedged_call(client: Any, kwargs: dict, timeout: float) -> Any:
+    """
+    Run one call, and if hedging is enabled and it is slower than the recent p95 latency,
+    fire a duplicate and return whichever finishes first successfully.
+    The duplicate needs a scheduler slot and tokens of its own; when none are free right away it is skipped,
+    so hedging never takes the upstream past the concurrency and rate limits.
+    """
+    hedge_delay = latency_tracker.percentile(HEDGE_PERCENTILE) if HEDGE_ENABLED else None
+    if hedge_delay is None or hedge_delay >= timeout:
+        return await asyncio.wait_for(_timed_call(client, kwargs), timeout)
+
+    started = time.monotonic()
+    pending = {asyncio.create_task(_timed_call(client, kwargs))}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=hedge_delay)
+        if done:
+            return done.pop().result()
+        tokens = estimate_request_tokens(kwargs)
+        if not scheduler.try_acquire(tokens):
+            logger.info("Not hedging LLM request: no free scheduler slot or tokens")
+            return await asyncio.wait_for(pending.pop(), timeout - (time.monotonic() - started))
+        logger.info(f"Hedging LLM request after {hedge_delay * 1000:.0f} ms")
+        pending.add(asyncio.create_task(_hedge_call(client, kwargs, tokens)))
+        last_error: Optional[BaseException] = None
+        while pending:
+            remaining = timeout - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                last_error = task.exception()
+        if last_error is not None and not pending:
+            raise last_error
+        raise asyncio.TimeoutError()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def resilient_create(client: Any, **kwargs: Any) -> Any:
+    """
+    Call client.responses.create within the request deadline.
+    Transient failures are retried with jittered backoff while budget remains;
+    while the circuit is open, calls fail fast with CircuitOpenError.
+    Each attempt waits for a scheduler slot; a hedged duplicate takes its own slot, or is skipped if none is free.
+    """
+    attempt = 0
+    while True:
+        if not circuit_breaker.allow_request():
+            raise CircuitOpenError("LLM upstream is unhealthy, failing fast")
+        call = None
+        try:
+            async with scheduler.slot(kwargs, remaining_budget()) as call:
+                call["response"] = await _hedged_call(client, kwargs, _attempt_timeout())
+            response = call["response"]
+        except (SchedulerRejectedError, DeadlineExceededError):
+            circuit_breaker.trial_in_flight = False
+            raise
+        except Exception as e:
+            if getattr(e, "status_code", None) == 429:
+                scheduler.record_rate_limited(_rate_limit_delay(e))
+            if call is None:
+                # Timed out waiting for a scheduler slot, the upstream was never called
+                circuit_breaker.trial_in_flight = False
+                raise DeadlineExceededError("Request deadline exceeded while queued for the model") from e
+            if not _is_retryable(e):
+                # The upstream answered; a bad request says nothing about its health
+                circuit_breaker.trial_in_flight = False
+                raise
+            circuit_breaker.record_failure()
+            attempt += 1
+            remaining = remaining_budget()
+            if remaining is not None and remaining <= 0:
+                raise DeadlineExceededError("Request deadline exceeded while waiting for the model") from e
+            delay = _retry_delay(attempt)
+            if attempt > MAX_RETRIES or (remaining is not None and delay >= remaining):
+                raise
+            logger.warning(f"LLM call failed ({e!r}), retry {attempt}/{MAX_RETRIES} in {delay * 1000:.0f} ms")
+            await asyncio.sleep(delay)
+            continue
+        circuit_breaker.record_success()
+        scheduler.record_success()
+        return response
@@ -0,0 +1,270 @@
+"""
+Admission control for upstream LLM calls: a global concurrency cap, a tokens-per-minute budget,
+priority classes with bounded queues, and adaptive backoff on 429 responses.
+"""
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+from app.services.llm.llm_client_setup import logger
+from app.services.llm.llm_config import (
+    CHARS_PER_TOKEN,
+    ROLE_PRIORITIES,
+    PRIORITY_EMPLOYEE,
+    PRIORITY_NAMES,
+    SCHEDULER_MAX_CONCURRENCY,
+    SCHEDULER_MIN_CONCURRENCY,
+    SCHEDULER_TOKENS_PER_MINUTE,
+    SCHEDULER_DEFAULT_OUTPUT_TOKENS,
+    SCHEDULER_QUEUE_LIMITS,
+    SCHEDULER_BACKOFF_BASE_SECONDS,
+    SCHEDULER_BACKOFF_MAX_SECONDS,
+    SCHEDULER_RECOVERY_SUCCESSES,
+    SCHEDULER_WAIT_SAMPLE_SIZE
+)
+from app.services.llm.llm_metrics import current_turn
+from app.services.serialization import dumps
+
+
+class SchedulerRejectedError(Exception):
+    """Raised when a priority class's queue is full and the call is rejected without waiting."""
+
+
+@dataclass
+class _Waiter:
+    priority: int
+    tokens: int
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+def current_priority() -> int:
+    """Priority class of the chat turn being processed; calls outside a turn get the lowest priority."""
+    turn = current_turn()
+    if turn is None:
+        return PRIORITY_EMPLOYEE
+    return ROLE_PRIORITIES.get(turn.role, PRIORITY_EMPLOYEE)
+
+
+def estimate_request_tokens(kwargs: Dict[str, Any]) -> int:
+    """Tokens to reserve for a Responses API call: the estimated prompt plus the expected output."""
+    prompt = dumps([kwargs.get("instructions"), kwargs.get("input"), kwargs.get("tools")])
+    output_tokens = kwargs.get("max_output_tokens") or SCHEDULER_DEFAULT_OUTPUT_TOKENS
+    return len(prompt) // CHARS_PER_TOKEN + output_tokens
+
+
+def _rate_limit_delay(error: Exception) -> Optional[float]:
+    """The Retry-After of a 429 response in seconds, if the upstream sent one."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMScheduler:
+    """
+    Admits LLM calls in priority order while the number of calls in flight is under the concurrency
+    limit and the token bucket covers the call. Runs on the application's event loop.
+
+    A 429 halves the concurrency limit and pauses admission with exponential backoff;
+    every recovery_successes successful calls raise the limit by one again, up to max_concurrency.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = SCHEDULER_MAX_CONCURRENCY,
+        tokens_per_minute: int = SCHEDULER_TOKENS_PER_MINUTE,
+        queue_limits: Optional[Dict[int, int]] = None,
+        recovery_successes: int = SCHEDULER_RECOVERY_SUCCESSES
+    ):
+        self.max_concurrency = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.queue_limits = dict(queue_limits or SCHEDULER_QUEUE_LIMITS)
+        self.recovery_successes = recovery_successes
+        self.reset()
+
+    def reset(self) -> None:
+        self.concurrency_limit = self.max_concurrency
+        self.in_flight = 0
+        self.tokens_available = float(self.tokens_per_minute)
+        self.refilled_at = time.monotonic()
+        self.paused_until = 0.0
+        self.backoff_seconds = SCHEDULER_BACKOFF_BASE_SECONDS
+        self.successes_since_backoff = 0
+        self.queues: Dict[int, Deque[_Waiter]] = {priority: deque() for priority in self.queue_limits}
+        self.wait_samples: Dict[int, Deque[float]] = {
+            priority: deque(maxlen=SCHEDULER_WAIT_SAMPLE_SIZE) for priority in self.queue_limits
+        }
+        self.counters = {"admitted": 0, "rejected": 0, "rate_limited": 0}
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens_available = min(
+            float(self.tokens_per_minute),
+            self.tokens_available + (now - self.refilled_at) * self.tokens_per_minute / 60
+        )
+        self.refilled_at = now
+
+    def _can_admit(self, tokens: int) -> bool:
+        # A call larger than the whole bucket is admitted once the bucket is full, so it cannot starve
+        return (
+            self.in_flight < self.concurrency_limit
+            and (self.tokens_available >= tokens or self.tokens_available >= self.tokens_per_minute)
+        )
+
+    def _admit(self, tokens: int) -> None:
+        self.in_flight += 1
+        self.tokens_available -= tokens
+        self.counters["admitted"] += 1
+
+    def _next_waiter(self) -> Optional[_Waiter]:
+        for priority in sorted(self.queues):
+            queue = self.queues[priority]
+            while queue and queue[0].future.done():
+                queue.popleft()
+            if queue:
+                return queue[0]
+        return None
+
+    def _dispatch(self) -> None:
+        """Wake waiters in priority order while capacity allows; schedule a retry when only time can help."""
+        self._wakeup = None
+        now = time.monotonic()
+        if now < self.paused_until:
+            self._schedule_wakeup(self.paused_until - now)
+            return
+        self._refill()
+        while (waiter := self._next_waiter()) is not None:
+            if not self._can_admit(waiter.tokens):
+                if self.in_flight < self.concurrency_limit:
+                    # Blocked on the token bucket: wake up when it holds enough for the head waiter
+                    missing = min(waiter.tokens, self.tokens_per_minute) - self.tokens_available
+                    self._schedule_wakeup(missing * 60 / self.tokens_per_minute)
+                return
+            self.queues[waiter.priority].popleft()
+            self._admit(waiter.tokens)
+            self.wait_samples[waiter.priority].append(now - waiter.enqueued_at)
+            waiter.future.set_result(None)
+
+    def _schedule_wakeup(self, delay: float) -> None:
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+        self._wakeup = asyncio.get_running_loop().call_later(max(delay, 0.0), self._dispatch)
+
+    async def acquire(self, priority: int, tokens: int, timeout: Optional[float] = None) -> None:
+        """
+        Wait for a slot. Raises SchedulerRejectedError at once when the priority's queue is full,
+        and asyncio.TimeoutError when no slot frees up within timeout.
+        """
+        self._refill()
+        queue = self.queues.setdefault(priority, deque())
+        self.wait_samples.setdefault(priority, deque(maxlen=SCHEDULER_WAIT_SAMPLE_SIZE))
+        if not any(self.queues.values()) and time.monotonic() >= self.paused_until and self._can_admit(tokens):
+            self._admit(tokens)
+            self.wait_samples[priority].append(0.0)
+            return
+        waiting = sum(1 for queued in queue if not queued.future.done())
+        if waiting >= self.queue_limits.get(priority, 0):
+            self.counters["rejected"] += 1
+            raise SchedulerRejectedError(
+                f"LLM queue for {PRIORITY_NAMES.get(priority, priority)} calls is full ({waiting} waiting)"
+            )
+
+        waiter = _Waiter(priority, tokens, asyncio.get_running_loop().create_future())
+        queue.append(waiter)
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout)
+        except BaseException:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted while being cancelled: hand the slot back
+                self.release(tokens, None)
+            else:
+                waiter.future.cancel()
+            raise
+
+    def try_acquire(self, tokens: int) -> bool:
+        """
+        Take a slot only if one is free right now, without queueing; for optional calls such as hedges.
+        Never admits ahead of queued waiters, during a rate-limit pause, or past the token bucket.
+        """
+        self._refill()
+        queued = any(not waiter.future.done() for queue in self.queues.values() for waiter in queue)
+        if queued or time.monotonic() < self.paused_until or not self._can_admit(tokens):
+            return False
+        self._admit(tokens)
+        return True
+
+    def release(self, reserved_tokens: int, used_tokens: Optional[int]) -> None:
+        """Free the slot and settle the token reservation against the usage the API reported."""
+        self.in_flight -= 1
+        if used_tokens is not None:
+            self.tokens_available += reserved_tokens - used_tokens
+        self._dispatch()
+
+    def record_success(self) -> None:
+        if self.concurrency_limit >= self.max_concurrency:
+            return
+        self.successes_since_backoff += 1
+        if self.successes_since_backoff >= self.recovery_successes:
+            self.successes_since_backoff = 0
+            self.concurrency_limit += 1
+            self.backoff_seconds = SCHEDULER_BACKOFF_BASE_SECONDS
+
+    def record_rate_limited(self, retry_after: Optional[float] = None) -> None:
+        """Shrink the concurrency limit and pause admission after a 429."""
+        self.counters["rate_limited"] += 1
+        self.concurrency_limit = max(SCHEDULER_MIN_CONCURRENCY, self.concurrency_limit // 2)
+        self.successes_since_backoff = 0
+        pause = retry_after if retry_after is not None else self.backoff_seconds
+        self.paused_until = max(self.paused_until, time.monotonic() + pause)
+        self.backoff_seconds = min(SCHEDULER_BACKOFF_MAX_SECONDS, self.backoff_seconds * 2)
+        logger.warning(
+            f"LLM rate limited: concurrency limit now {self.concurrency_limit}, admission paused for {pause:.1f}s"
+        )
+
+    @asynccontextmanager
+    async def slot(self, kwargs: Dict[str, Any], timeout: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Hold a slot for one Responses API call made with kwargs.
+        Put the response under "response" in the yielded dict to settle the token reservation.
+        """
+        tokens = estimate_request_tokens(kwargs)
+        await self.acquire(current_priority(), tokens, timeout)
+        call: Dict[str, Any] = {}
+        try:
+            yield call
+        finally:
+            usage = getattr(call.get("response"), "usage", None)
+            self.release(tokens, getattr(usage, "total_tokens", None))
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and admission wait times per priority class, for tuning."""
+        self._refill()
+        queues = {}
+        for priority in sorted(self.queues):
+            samples = sorted(self.wait_samples.get(priority, ()))
+            queues[PRIORITY_NAMES.get(priority, str(priority))] = {
+                "depth": sum(1 for waiter in self.queues[priority] if not waiter.future.done()),
+                "limit": self.queue_limits.get(priority, 0),
+                "mean_wait_ms": sum(samples) / len(samples) * 1000 if samples else 0.0,
+                "p95_wait_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000 if samples else 0.0,
+            }
+        return {
+            "in_flight": self.in_flight,
+            "concurrency_limit": self.concurrency_limit,
+            "max_concurrency": self.max_concurrency,
+            "tokens_available": int(self.tokens_available),
+            "tokens_per_minute": self.tokens_per_minute,
+            "paused_for_seconds": max(0.0, self.paused_until - time.monotonic()),
+            "queues": queues,
+            **self.counters,
+        }
+
+
+scheduler = LLMScheduler()
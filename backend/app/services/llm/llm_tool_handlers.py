@@ -1,22 +1,44 @@
 """
 Tool handler functions for processing LLM tool calls.
 """
-import json
+import asyncio
+import inspect
 from typing import Optional, List, Dict, Any, Tuple, Callable
 from app.db.verifiers import employee_exists_in_database
+from app.db.name_index import exact_first_name, resolve_employee_name, suggest_employees
 from app.db.regular_employee import fetch_employee_data, fetch_employee_training_status
-from app.db.ciso import get_statistic_summary, fetch_all_employees_with_this_training_status
+from app.db.ciso import (
+    get_statistic_summary,
+    fetch_all_employees_with_this_training_status,
+    get_video_funnel,
+    get_time_to_finish_leaderboard,
+    LEADERBOARD_ORDER_FASTEST
+)
+from app.db.common import STATUS_FINISHED
+from app.db.ciso_timeseries import get_completion_timeseries, GRANULARITY_WEEK
 from app.services.llm.llm_config import (
     KEY_EMPLOYEE_ID, KEY_EMPLOYEE_NAME, KEY_EXISTS, KEY_OUTPUT,
-    FUNCTION_CALL_TYPE, KEY_TYPE
+    FUNCTION_CALL_TYPE, KEY_TYPE,
+    TOOL_CALL_TIMEOUT_SECONDS, TOOL_CALL_TIMEOUTS,
+    TOOL_FETCH_CURRENT_USER_DATA, TOOL_FETCH_CISO_DATA, TOOL_FETCH_DIFFERENT_EMPLOYEE,
+    TOOL_GET_STATISTICS, TOOL_GET_EMPLOYEES_BY_STATUS, TOOL_GET_COMPLETION_TIMESERIES, TOOL_GET_VIDEO_FUNNEL,
+    TOOL_GET_TIME_LEADERBOARD,
+    TIMESERIES_DEFAULT_BUCKETS, TIMESERIES_MAX_BUCKETS, LEADERBOARD_DEFAULT_K, LEADERBOARD_MAX_K
 )
 from app.services.llm.llm_formatters import (
     format_employee_data_output,
     format_employees_by_status,
-    format_json_output
+    format_completion_timeseries,
+    format_video_funnel,
+    format_time_leaderboard,
+    format_json_output,
+    is_compact_output
 )
+from app.services.serialization import dumps, loads
+from app.services.tracing import span
 from app.services.llm.llm_responses import create_function_call_output
 from app.services.llm.llm_client_setup import logger
+from app.services.llm.llm_resilience import remaining_budget
 
 
 # Tool handler functions
@@ -25,19 +47,24 @@ def _handle_check_employee_exists(arguments: Dict[str, Any], current_employee_id
     employee_id = arguments.get(KEY_EMPLOYEE_ID)
     employee_name = arguments.get(KEY_EMPLOYEE_NAME)
     exists = employee_exists_in_database(employee_id, employee_name)
+    if not exists:
+        # Only the stored first name in another casing logs in; a near miss is rejected without hinting at the name
+        stored_name = exact_first_name(employee_id, employee_name)
+        if stored_name is not None:
+            return {KEY_EXISTS: True, KEY_EMPLOYEE_NAME: stored_name}, employee_id, stored_name
     return {KEY_EXISTS: exists}, employee_id, employee_name
 
 
 def _handle_fetch_current_user_data(arguments: Dict[str, Any], current_employee_id: Optional[str], current_employee_name: Optional[str]) -> Tuple[Any, Optional[str], Optional[str]]:
     """Handle fetch_current_user_personal_data_and_watched_videos_data tool."""
     employee_data = fetch_employee_data(current_employee_id, current_employee_name)
-    return format_employee_data_output(employee_data), None, None
+    return format_employee_data_output(employee_data, compact=is_compact_output(TOOL_FETCH_CURRENT_USER_DATA)), None, None
 
 
 def _handle_fetch_ciso_data(arguments: Dict[str, Any], current_employee_id: Optional[str], current_employee_name: Optional[str]) -> Tuple[Any, Optional[str], Optional[str]]:
     """Handle fetch_current_ciso_employee_data tool."""
     employee_data = fetch_employee_data(current_employee_id, current_employee_name)
-    return format_employee_data_output(employee_data), None, None
+    return format_employee_data_output(employee_data, compact=is_compact_output(TOOL_FETCH_CISO_DATA)), None, None
 
 
 def _handle_fetch_training_status(arguments: Dict[str, Any], current_employee_id: Optional[str], current_employee_name: Optional[str]) -> Tuple[Any, Optional[str], Optional[str]]:
@@ -49,14 +76,14 @@ def _handle_fetch_training_status(arguments: Dict[str, Any], current_employee_id
 def _handle_get_statistics(arguments: Dict[str, Any], current_employee_id: Optional[str], current_employee_name: Optional[str]) -> Tuple[Any, Optional[str], Optional[str]]:
     """Handle get_summary_and_statistics_on_all_employees_training tool."""
     statistics = get_statistic_summary()
-    return format_json_output(statistics, "Statistics not available"), None, None
+    return format_json_output(statistics, "Statistics not available", compact=is_compact_output(TOOL_GET_STATISTICS)), None, None
 
 
 def _handle_get_employees_by_status(arguments: Dict[str, Any], current_employee_id: Optional[str], current_employee_name: Optional[str]) -> Tuple[Any, Optional[str], Optional[str]]:
     """Handle get_all_employees_with_this_training_status tool."""
     status = arguments.get("status")
     employees = fetch_all_employees_with_this_training_status(status)
-    return json.dumps(format_employees_by_status(employees)), None, None
+    return dumps(format_employees_by_status(employees, compact=is_compact_output(TOOL_GET_EMPLOYEES_BY_STATUS))), None, None
 
 
 def _handle_fetch_different_employee(arguments: Dict[str, Any], current_employee_id: Optional[str], current_employee_name: Optional[str]) -> Tuple[Any, Optional[str], Optional[str]]:
@@ -64,7 +91,56 @@ def _handle_fetch_different_employee(arguments: Dict[str, Any], current_employee
     requested_employee_id = arguments.get(KEY_EMPLOYEE_ID)
     requested_employee_name = arguments.get(KEY_EMPLOYEE_NAME)
     employee_data = fetch_employee_data(requested_employee_id, requested_employee_name)
-    return format_employee_data_output(employee_data), None, None
+    if employee_data is None:
+        corrected_name = resolve_employee_name(requested_employee_id, requested_employee_name)
+        if corrected_name is not None:
+            employee_data = fetch_employee_data(requested_employee_id, corrected_name)
+    if employee_data is None:
+        # Ranked candidates let the model ask the CISO which employee was meant instead of guessing again
+        candidates = suggest_employees(requested_employee_id, requested_employee_name)
+        if candidates:
+            return dumps({
+                "error": "Employee data not found",
+                "did_you_mean": [
+                    {"employee_id": match.employee_id, "employee_name": match.employee_name, "employee_last_name": match.employee_last_name}
+                    for match in candidates
+                ],
+            }), None, None
+    return format_employee_data_output(employee_data, compact=is_compact_output(TOOL_FETCH_DIFFERENT_EMPLOYEE)), None, None
+
+
+def _handle_get_completion_timeseries(arguments: Dict[str, Any], current_employee_id: Optional[str], current_employee_name: Optional[str]) -> Tuple[Any, Optional[str], Optional[str]]:
+    """Handle get_training_completion_timeseries tool."""
+    granularity = arguments.get("granularity") or GRANULARITY_WEEK
+    try:
+        last_buckets = int(arguments.get("last_buckets") or TIMESERIES_DEFAULT_BUCKETS)
+    except (TypeError, ValueError):
+        last_buckets = TIMESERIES_DEFAULT_BUCKETS
+    last_buckets = max(1, min(last_buckets, TIMESERIES_MAX_BUCKETS))
+    series = get_completion_timeseries(granularity)
+    compact = is_compact_output(TOOL_GET_COMPLETION_TIMESERIES)
+    return dumps(format_completion_timeseries(series, last_buckets, compact=compact)), None, None
+
+
+def _handle_get_video_funnel(arguments: Dict[str, Any], current_employee_id: Optional[str], current_employee_name: Optional[str]) -> Tuple[Any, Optional[str], Optional[str]]:
+    """Handle get_training_video_funnel tool."""
+    funnel = get_video_funnel()
+    return dumps(format_video_funnel(funnel, compact=is_compact_output(TOOL_GET_VIDEO_FUNNEL))), None, None
+
+
+def _handle_get_time_leaderboard(arguments: Dict[str, Any], current_employee_id: Optional[str], current_employee_name: Optional[str]) -> Tuple[Any, Optional[str], Optional[str]]:
+    """Handle get_training_time_leaderboard tool."""
+    order = arguments.get("order") or LEADERBOARD_ORDER_FASTEST
+    status = arguments.get("status") or STATUS_FINISHED
+    division = (arguments.get("division") or "").strip() or None
+    try:
+        k = int(arguments.get("k") or LEADERBOARD_DEFAULT_K)
+    except (TypeError, ValueError):
+        k = LEADERBOARD_DEFAULT_K
+    k = max(1, min(k, LEADERBOARD_MAX_K))
+    ranked = get_time_to_finish_leaderboard(k, order, division, status)
+    compact = is_compact_output(TOOL_GET_TIME_LEADERBOARD)
+    return dumps(format_time_leaderboard(ranked, order, status, division, compact=compact)), None, None
 
 
 # Tool handler registry
@@ -76,29 +152,56 @@ TOOL_HANDLERS: Dict[str, Callable[[Dict[str, Any], Optional[str], Optional[str]]
     "get_summary_and_statistics_on_all_employees_training": _handle_get_statistics,
     "get_all_employees_with_this_training_status": _handle_get_employees_by_status,
     "fetch_different_employee_data_using_id_and_first_name": _handle_fetch_different_employee,
+    "get_training_completion_timeseries": _handle_get_completion_timeseries,
+    "get_training_video_funnel": _handle_get_video_funnel,
+    "get_training_time_leaderboard": _handle_get_time_leaderboard,
 }
 
 
-def process_tool_call(
-    item: Any,
-    current_employee_id: Optional[str],
-    current_employee_name: Optional[str]
-) -> Tuple[Optional[Dict[str, Any]], Optional[str], Optional[str]]:
-    """Process a single tool call item and return output, employee_id, and employee_name."""
+def _parse_tool_call(item: Any) -> Tuple[Optional[str], Optional[str], Dict[str, Any]]:
+    """Extract tool name, call ID and parsed arguments from a tool call item."""
     tool_name = getattr(item, "name", None)
     call_id = getattr(item, "call_id", None)
     raw_args = getattr(item, "arguments", None) or "{}"
     try:
-        arguments = json.loads(raw_args)
+        arguments = loads(raw_args)
     except Exception:
         arguments = {}
+    return tool_name, call_id, arguments
+
+
+async def process_tool_call_async(
+    item: Any,
+    current_employee_id: Optional[str],
+    current_employee_name: Optional[str]
+) -> Tuple[Optional[Dict[str, Any]], Optional[str], Optional[str]]:
+    """
+    Process a single tool call without blocking the event loop.
+    Async handlers are awaited, sync handlers run in the default thread pool.
+    The call is bounded by the tool's timeout and the request deadline; failures become error outputs for that call only.
+    """
+    tool_name, call_id, arguments = _parse_tool_call(item)
+    timeout = TOOL_CALL_TIMEOUTS.get(tool_name, TOOL_CALL_TIMEOUT_SECONDS)
+    remaining = remaining_budget()
+    if remaining is not None:
+        timeout = max(0.0, min(timeout, remaining))
     handler = TOOL_HANDLERS.get(tool_name)
-    if not handler:
-        raise ValueError(f"Unknown tool '{tool_name}'")
-    output_data, extracted_employee_id, extracted_employee_name = handler(
-        arguments, current_employee_id, current_employee_name)
-    function_call_output = create_function_call_output(call_id, output_data)
-    return function_call_output, extracted_employee_id, extracted_employee_name
+    try:
+        if not handler:
+            raise ValueError(f"Unknown tool '{tool_name}'")
+        with span(f"tool {tool_name}"):
+            if inspect.iscoroutinefunction(handler):
+                pending = handler(arguments, current_employee_id, current_employee_name)
+            else:
+                pending = asyncio.to_thread(handler, arguments, current_employee_id, current_employee_name)
+            output_data, extracted_employee_id, extracted_employee_name = await asyncio.wait_for(pending, timeout)
+    except asyncio.TimeoutError:
+        logger.error(f"Tool '{tool_name}' timed out after {timeout:.1f}s")
+        return create_function_call_output(call_id, format_json_output(None, f"Tool timed out after {timeout:.1f} seconds")), None, None
+    except Exception as e:
+        logger.error(f"Tool '{tool_name}' failed: {e}")
+        return create_function_call_output(call_id, format_json_output(None, f"Tool failed: {e}")), None, None
+    return create_function_call_output(call_id, output_data), extracted_employee_id, extracted_employee_name
 
 
 async def get_function_call_outputs(
@@ -106,18 +209,22 @@ async def get_function_call_outputs(
     current_employee_id: Optional[str] = None,
     current_employee_name: Optional[str] = None
 ) -> Tuple[List[Dict[str, Any]], Optional[str], Optional[str]]:
-    """Process function calls from LLM output and return outputs, employee_id, and employee_name."""
+    """
+    Process function calls from LLM output concurrently and return outputs, employee_id, and employee_name.
+    Outputs keep the order of the function calls in the model output.
+    """
     function_call_outputs: List[Dict[str, Any]] = []
     employee_id: Optional[str] = None
     employee_name: Optional[str] = None
     logger.info(f"Output: {output}")
-    
-    for item in output or []:
-        if getattr(item, KEY_TYPE, None) != FUNCTION_CALL_TYPE:
-            continue
 
-        function_call_output, extracted_employee_id, extracted_employee_name = process_tool_call(
-            item, current_employee_id, current_employee_name)
+    tool_calls = [item for item in output or [] if getattr(item, KEY_TYPE, None) == FUNCTION_CALL_TYPE]
+    results = await asyncio.gather(*(
+        process_tool_call_async(item, current_employee_id, current_employee_name)
+        for item in tool_calls
+    ))
+
+    for function_call_output, extracted_employee_id, extracted_employee_name in results:
         if function_call_output:
             function_call_outputs.append(function_call_output)
         # Update employee_id and employee_name if extracted (only for check_employee_exists tool)
@@ -127,4 +234,3 @@ async def get_function_call_outputs(
             employee_name = extracted_employee_name
 
     return function_call_outputs, employee_id, employee_name
-
@@ -0,0 +1,250 @@
+"""
+Record/replay transport for the OpenAI Responses API.
+
+Record mode wraps a live client and appends every exchange to a JSONL cassette.
+Replay mode serves the cassette deterministically, without network access, with a configurable latency model.
+Stub mode answers any request with canned tool calls and texts, for load tests that must not depend on recordings.
+"""
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+from app.services.llm.llm_config import (
+    CHARS_PER_TOKEN,
+    EMPLOYEE_ID_PATTERN,
+    FUNCTION_CALL_OUTPUT_TYPE,
+    FUNCTION_CALL_TYPE,
+    KEY_TYPE,
+    TOOL_GET_COMPLETION_TIMESERIES,
+    TOOL_GET_EMPLOYEES_BY_STATUS,
+    TOOL_GET_STATISTICS,
+    TOOL_GET_TIME_LEADERBOARD,
+    TOOL_GET_VIDEO_FUNNEL
+)
+
+logger = logging.getLogger("llm_client")
+
+# Request fields that identify an exchange; transport options such as timeouts are ignored
+REQUEST_KEY_FIELDS = (
+    "model", "input", "instructions", "tools", "max_tool_calls",
+    "previous_response_id", "max_output_tokens"
+)
+
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode when a request was never recorded."""
+
+
+def _normalize(value: Any) -> Any:
+    """Convert SDK objects (such as function call items) into plain JSON-compatible data."""
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True)
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if hasattr(value, "__dict__"):
+        return _normalize(vars(value))
+    return value
+
+
+def request_key(kwargs: Dict[str, Any]) -> str:
+    """Stable key of a Responses API request."""
+    request = {field: _normalize(kwargs[field]) for field in REQUEST_KEY_FIELDS if field in kwargs}
+    return hashlib.md5(json.dumps(request, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class LatencyModel:
+    """Replay latency distribution, seeded for reproducible runs."""
+
+    def __init__(self, spec: str = "recorded", seed: int = 0):
+        self.kind, _, params = spec.partition(":")
+        self.params = [float(param) for param in params.split(",") if param]
+        self.random = random.Random(seed)
+        if self.kind not in ("none", "recorded", "fixed", "normal", "lognormal"):
+            raise ValueError(f"Unknown replay latency model '{spec}'")
+
+    def sample(self, recorded_seconds: float) -> float:
+        if self.kind == "recorded":
+            return recorded_seconds
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "normal":
+            return max(0.0, self.random.gauss(self.params[0], self.params[1]))
+        if self.kind == "lognormal":
+            return self.random.lognormvariate(self.params[0], self.params[1])
+        return 0.0
+
+
+def load_cassette(path: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Load cassette entries grouped by request key, in recording order."""
+    entries: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    if not os.path.exists(path):
+        return entries
+    with open(path, encoding="utf-8") as cassette:
+        for line in cassette:
+            if line.strip():
+                entry = json.loads(line)
+                entries[entry["key"]].append(entry)
+    return entries
+
+
+class _RecordingResponses:
+    def __init__(self, inner: Any, path: str):
+        self.inner = inner
+        self.path = path
+        self.lock = threading.Lock()
+
+    async def create(self, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        response = await self.inner.create(**kwargs)
+        entry = {
+            "key": request_key(kwargs),
+            "request": _normalize({field: kwargs[field] for field in REQUEST_KEY_FIELDS if field in kwargs}),
+            "response": _normalize(response),
+            "latency_ms": (time.perf_counter() - started) * 1000,
+        }
+        with self.lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as cassette:
+                cassette.write(json.dumps(entry) + "\n")
+        return response
+
+
+class _ReplayResponses:
+    def __init__(self, path: str, latency_model: LatencyModel):
+        self.entries = load_cassette(path)
+        self.latency_model = latency_model
+        self.positions: Dict[str, int] = defaultdict(int)
+        logger.info(f"Replaying {sum(len(e) for e in self.entries.values())} recorded LLM exchanges from {path}")
+
+    async def create(self, **kwargs: Any) -> Any:
+        from openai.types.responses import Response
+        key = request_key(kwargs)
+        recorded = self.entries.get(key)
+        if not recorded:
+            raise CassetteMissError(f"No recorded response for request {key}")
+        # Repeated identical requests replay their recordings in order, then keep the last one
+        entry = recorded[min(self.positions[key], len(recorded) - 1)]
+        self.positions[key] += 1
+        delay = self.latency_model.sample(entry.get("latency_ms", 0.0) / 1000)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return Response.model_validate(entry["response"])
+
+
+class RecordingClient:
+    """Live client wrapper that records every Responses API exchange to a cassette."""
+
+    def __init__(self, inner: Any, path: str):
+        self.inner = inner
+        self.responses = _RecordingResponses(inner.responses, path)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.inner, name)
+
+
+class ReplayClient:
+    """Offline client that serves Responses API exchanges from a cassette."""
+
+    def __init__(self, path: str, latency_model: Optional[LatencyModel] = None):
+        self.responses = _ReplayResponses(path, latency_model or LatencyModel("none"))
+
+
+# Stub tool choice: the first tool whose keywords appear in the user message, else the first tool offered
+STUB_TOOL_KEYWORDS = {
+    TOOL_GET_COMPLETION_TIMESERIES: ("per day", "per week", "over time", "trend", "velocity"),
+    TOOL_GET_TIME_LEADERBOARD: ("top ", "leaderboard", "ranking"),
+    TOOL_GET_VIDEO_FUNNEL: ("funnel", "stall", "drop off", "drop-off", "never finished"),
+    TOOL_GET_EMPLOYEES_BY_STATUS: ("not started", "in progress", "finished", "who "),
+    TOOL_GET_STATISTICS: ("statistic", "summary", "average", "fastest", "slowest", "how many"),
+}
+STUB_STATUS_KEYWORDS = {"not started": "NOT_STARTED", "in progress": "IN_PROGRESS", "finished": "FINISHED"}
+STUB_ANSWER = "Here is what I found in the training records."
+_STUB_NAME_RE = re.compile(r"\b[A-Z][a-z]+\b")
+
+
+def _last_user_text(items: Any) -> str:
+    for item in reversed(items if isinstance(items, list) else [items]):
+        if isinstance(item, str):
+            return item
+        if isinstance(item, dict) and item.get("role") == "user":
+            return str(item.get("content", ""))
+    return ""
+
+
+def _stub_arguments(tool: Dict[str, Any], message: str) -> Dict[str, Any]:
+    """Fill the tool's parameters from the message: a 9-digit ID, the last capitalized name and a status."""
+    arguments: Dict[str, Any] = {}
+    lowered = message.lower()
+    for parameter in tool.get("parameters", {}).get("properties", {}):
+        if parameter == "employee_id":
+            employee_id = re.search(EMPLOYEE_ID_PATTERN, message)
+            arguments[parameter] = employee_id.group() if employee_id else ""
+        elif parameter == "employee_first_name":
+            names = _STUB_NAME_RE.findall(message)
+            arguments[parameter] = names[-1] if names else ""
+        elif parameter == "status":
+            arguments[parameter] = next(
+                (status for keyword, status in STUB_STATUS_KEYWORDS.items() if keyword in lowered), "IN_PROGRESS"
+            )
+    return arguments
+
+
+class _StubResponses:
+    def __init__(self, latency_model: LatencyModel):
+        self.latency_model = latency_model
+        self.ids = itertools.count(1)
+
+    async def create(self, **kwargs: Any) -> Any:
+        delay = self.latency_model.sample(0.0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        items = kwargs.get("input") or []
+        tools = kwargs.get("tools") or []
+        answers_tools = any(isinstance(item, dict) and item.get(KEY_TYPE) == FUNCTION_CALL_OUTPUT_TYPE for item in items)
+        response_id = f"resp_stub_{next(self.ids)}"
+        output: List[Any] = []
+        output_text = STUB_ANSWER
+        if tools and not answers_tools:
+            message = _last_user_text(items)
+            lowered = message.lower()
+            offered = {tool["name"]: tool for tool in tools}
+            name = next(
+                (name for name, keywords in STUB_TOOL_KEYWORDS.items() if name in offered and any(k in lowered for k in keywords)),
+                tools[0]["name"]
+            )
+            output = [SimpleNamespace(
+                type=FUNCTION_CALL_TYPE, name=name, call_id=f"call_{response_id}",
+                arguments=json.dumps(_stub_arguments(offered[name], message))
+            )]
+            output_text = ""
+        input_tokens = len(json.dumps(_normalize(items), default=str)) // CHARS_PER_TOKEN
+        output_tokens = len(output_text) // CHARS_PER_TOKEN + 20
+        return SimpleNamespace(
+            id=response_id,
+            output=output,
+            output_text=output_text,
+            usage=SimpleNamespace(
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                total_tokens=input_tokens + output_tokens,
+                input_tokens_details=SimpleNamespace(cached_tokens=0),
+            ),
+        )
+
+
+class StubClient:
+    """Offline client answering every request with a canned tool call, then a canned text, after a sampled latency."""
+
+    def __init__(self, latency_model: Optional[LatencyModel] = None):
+        self.responses = _StubResponses(latency_model or LatencyModel("none"))
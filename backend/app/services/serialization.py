@@ -0,0 +1,73 @@
+"""
+JSON serialization used on the hot paths: tool outputs, API responses and cache keys.
+
+orjson is used when it is installed and falls back to the standard library otherwise;
+JSON_SERIALIZER=json forces the fallback. Both produce compact JSON with the same content,
+so callers must not depend on the exact whitespace.
+"""
+import json
+import os
+from typing import Any, Callable, Optional
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+SERIALIZER_ORJSON = "orjson"
+SERIALIZER_STDLIB = "json"
+_requested = os.getenv("JSON_SERIALIZER", SERIALIZER_ORJSON)
+SERIALIZER = SERIALIZER_ORJSON if _requested == SERIALIZER_ORJSON and orjson is not None else SERIALIZER_STDLIB
+
+_STDLIB_SEPARATORS = (",", ":")
+
+
+def dumps_bytes(data: Any, sort_keys: bool = False, default: Optional[Callable[[Any], Any]] = str) -> bytes:
+    """Serialize data to compact UTF-8 JSON bytes."""
+    if SERIALIZER == SERIALIZER_ORJSON:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(data, default=default, option=option)
+    return json.dumps(
+        data, sort_keys=sort_keys, default=default, separators=_STDLIB_SEPARATORS, ensure_ascii=False
+    ).encode()
+
+
+def dumps(data: Any, sort_keys: bool = False, default: Optional[Callable[[Any], Any]] = str) -> str:
+    """Serialize data to a compact JSON string."""
+    if SERIALIZER == SERIALIZER_ORJSON:
+        return dumps_bytes(data, sort_keys, default).decode()
+    return json.dumps(data, sort_keys=sort_keys, default=default, separators=_STDLIB_SEPARATORS, ensure_ascii=False)
+
+
+def loads(data: Any) -> Any:
+    """Parse a JSON string or bytes."""
+    if SERIALIZER == SERIALIZER_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def structural_key(data: Any) -> Any:
+    """
+    Hashable, order-independent representation of nested data, for in-process cache keys.
+    Equal data gives equal keys, the same as comparing JSON with sorted keys, without encoding or hashing text.
+    """
+    if isinstance(data, dict):
+        return ("d",) + tuple(sorted(((str(key), structural_key(value)) for key, value in data.items()), key=lambda item: item[0]))
+    if isinstance(data, (list, tuple)):
+        return ("l",) + tuple(structural_key(value) for value in data)
+    if isinstance(data, (set, frozenset)):
+        return ("s", frozenset(structural_key(value) for value in data))
+    if isinstance(data, bool) or data is None:
+        # Keep True apart from 1 and None apart from "None", as JSON would
+        return ("b", data)
+    if isinstance(data, (str, int, float)):
+        return data
+    return ("o", str(data))
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class of the API, rendering through the fast serializer."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content, default=None)
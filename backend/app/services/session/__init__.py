@@ -0,0 +1,14 @@
+"""
+Server-side chat sessions package.
+"""
+from app.services.session.session_store import (
+    ChatSession,
+    SessionStore,
+    session_store
+)
+
+__all__ = [
+    "ChatSession",
+    "SessionStore",
+    "session_store",
+]
@@ -0,0 +1,207 @@
+"""
+Server-side chat sessions: an opaque token maps to the authenticated employee, their role and a bounded
+conversation log, so later turns send only the token and the new message.
+"""
+import hashlib
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+from cachetools import TTLCache
+
+logger = logging.getLogger("session")
+
+# Sessions expire after 1 hour without a turn
+SESSION_IDLE_TTL = int(os.getenv("SESSION_IDLE_TTL", "3600"))
+SESSION_MAXSIZE = int(os.getenv("SESSION_MAXSIZE", "1024"))
+SESSION_LOG_MAX_MESSAGES = int(os.getenv("SESSION_LOG_MAX_MESSAGES", "50"))
+# Directory that sessions evicted from memory are written to; unset keeps sessions in memory only
+SESSION_SPILL_DIR = os.getenv("SESSION_SPILL_DIR") or None
+# Spilled sessions idle for longer than the TTL are deleted at most this often, when another session spills
+SESSION_SPILL_SWEEP_INTERVAL = int(os.getenv("SESSION_SPILL_SWEEP_INTERVAL", "300"))
+SESSION_TOKEN_BYTES = 32
+# Spilled sessions are readable by the server's user only
+SPILL_DIR_MODE = 0o700
+SPILL_FILE_MODE = 0o600
+
+
+def session_id_for(token: str) -> str:
+    """Non-secret ID of the session with this token: its SHA-256, which does not give the token back."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+@dataclass
+class ChatSession:
+    token: str
+    employee_id: str
+    employee_name: str
+    role: str
+    log: Deque[Dict[str, str]] = field(default_factory=lambda: deque(maxlen=SESSION_LOG_MAX_MESSAGES))
+    last_seen: float = field(default_factory=time.time)
+    # Turns answered so far; unlike the log, it keeps counting once the log is full
+    turns: int = 0
+
+    @property
+    def session_id(self) -> str:
+        """ID to log and to key other state on; the token itself is a bearer credential and must not be."""
+        return session_id_for(self.token)
+
+    def history(self) -> List[Dict[str, str]]:
+        """The conversation log as the history list the query functions take."""
+        return list(self.log)
+
+    def record_turn(self, user_message: str, assistant_message: str) -> None:
+        self.log.append({"role": "user", "content": user_message})
+        self.log.append({"role": "assistant", "content": assistant_message})
+        self.turns += 1
+        self.last_seen = time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Everything but the token, which is a bearer credential and keys the session instead."""
+        return {
+            "employee_id": self.employee_id,
+            "employee_name": self.employee_name,
+            "role": self.role,
+            "log": list(self.log),
+            "last_seen": self.last_seen,
+            "turns": self.turns,
+        }
+
+    @classmethod
+    def from_dict(cls, token: str, data: Dict[str, Any]) -> "ChatSession":
+        session = cls(token, data["employee_id"], data["employee_name"], data["role"])
+        session.log.extend(data.get("log", []))
+        session.last_seen = data.get("last_seen", time.time())
+        session.turns = data.get("turns", len(session.log) // 2)
+        return session
+
+
+class _SpillingTTLCache(TTLCache):
+    """TTLCache that hands sessions evicted for size (not for expiry) to a spill callback."""
+
+    def __init__(self, maxsize: int, ttl: float, on_evict):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.on_evict = on_evict
+
+    def popitem(self):
+        key, value = super().popitem()
+        self.on_evict(value)
+        return key, value
+
+
+class SessionStore:
+    """
+    In-memory session store with an optional disk spill for sessions evicted by size.
+    Safe to use from several threads: the sync endpoints reach it from the threadpool.
+    """
+
+    def __init__(
+        self,
+        idle_ttl: float = SESSION_IDLE_TTL,
+        maxsize: int = SESSION_MAXSIZE,
+        spill_dir: Optional[str] = SESSION_SPILL_DIR
+    ):
+        self.idle_ttl = idle_ttl
+        self.spill_dir = spill_dir
+        self.sessions = _SpillingTTLCache(maxsize, idle_ttl, self._spill)
+        # Guards sessions; _spill and _load_spilled run with it held
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    def create(self, employee_id: str, employee_name: str, role: str) -> ChatSession:
+        """Open a session for an authenticated employee and return it with a fresh token."""
+        session = ChatSession(secrets.token_urlsafe(SESSION_TOKEN_BYTES), employee_id, employee_name, role)
+        with self._lock:
+            self.sessions[session.token] = session
+        logger.info(f"Session opened for employee {employee_id} ({role})")
+        return session
+
+    def get(self, token: Optional[str]) -> Optional[ChatSession]:
+        """Return the live session for a token, or None if it is unknown or expired."""
+        if not token:
+            return None
+        with self._lock:
+            session = self.sessions.get(token)
+            if session is None:
+                session = self._load_spilled(token)
+            return session
+
+    def touch(self, session: ChatSession) -> None:
+        """Restart the idle timer of a session after a turn."""
+        with self._lock:
+            self.sessions[session.token] = session
+
+    def close(self, token: Optional[str]) -> None:
+        if not token:
+            return
+        with self._lock:
+            self.sessions.pop(token, None)
+            path = self._spill_path(token)
+            if path and os.path.exists(path):
+                os.remove(path)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.sessions.clear()
+
+    def _spill_path(self, token: str) -> Optional[str]:
+        if not self.spill_dir:
+            return None
+        # Name the file by the hashed token so it never appears on disk: the content does not hold it either
+        return os.path.join(self.spill_dir, session_id_for(token) + ".json")
+
+    def _spill(self, session: ChatSession) -> None:
+        path = self._spill_path(session.token)
+        if path is None:
+            return
+        try:
+            os.makedirs(self.spill_dir, mode=SPILL_DIR_MODE, exist_ok=True)
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, SPILL_FILE_MODE)
+            # The mode only applies to new files; an older file keeps its own until narrowed here
+            os.fchmod(fd, SPILL_FILE_MODE)
+            with os.fdopen(fd, "w") as f:
+                json.dump(session.to_dict(), f)
+        except OSError as e:
+            logger.warning(f"Could not spill session to disk: {e}")
+        if time.time() - self._last_sweep >= SESSION_SPILL_SWEEP_INTERVAL:
+            self._sweep_spilled()
+
+    def _sweep_spilled(self) -> None:
+        """Delete spilled sessions that were not touched for the idle TTL; they could only be loaded to be dropped."""
+        self._last_sweep = now = time.time()
+        removed = 0
+        try:
+            with os.scandir(self.spill_dir) as entries:
+                for entry in entries:
+                    # A file is written when its session is evicted, so its mtime is never before the last turn
+                    if entry.name.endswith(".json") and now - entry.stat().st_mtime > self.idle_ttl:
+                        os.remove(entry.path)
+                        removed += 1
+        except OSError as e:
+            logger.warning(f"Could not sweep spilled sessions: {e}")
+        if removed:
+            logger.info(f"Removed {removed} expired spilled sessions")
+
+    def _load_spilled(self, token: str) -> Optional[ChatSession]:
+        path = self._spill_path(token)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            with open(path) as f:
+                session = ChatSession.from_dict(token, json.load(f))
+            os.remove(path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not load spilled session: {e}")
+            return None
+        if time.time() - session.last_seen > self.idle_ttl:
+            return None
+        self.sessions[token] = session
+        return session
+
+
+session_store = SessionStore()
@@ -0,0 +1,266 @@
+"""
+Lightweight request tracing: spans propagated with contextvars, exported per finished trace
+to an in-memory ring buffer (served at /debug/traces) and optionally to a JSONL file.
+
+A trace starts at the HTTP middleware and is sampled there; inside an unsampled request every
+span() is a no-op costing one contextvar lookup. Spans nest across awaits, tasks and asyncio.to_thread,
+since all of them copy the current context.
+"""
+import inspect
+import logging
+import os
+import random
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+from app.services.serialization import dumps
+
+logger = logging.getLogger("tracing")
+
+# Share of requests traced; raise it while investigating, tracing every request costs on the hot path
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "200"))
+# JSONL file that every finished trace is appended to; unset keeps traces in memory only
+TRACE_JSONL_PATH = os.getenv("TRACE_JSONL_PATH") or None
+TRACE_ID_HEADER = "x-trace-id"
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    start: float
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    duration_ms: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def end(self) -> float:
+        return self.start + self.duration_ms / 1000
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+
+@dataclass
+class Trace:
+    trace_id: str
+    spans: List[Span] = field(default_factory=list)
+
+    @property
+    def root(self) -> Span:
+        return self.spans[0]
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    """The innermost open span of the current sampled trace, if any."""
+    return _current_span.get()
+
+
+def current_trace_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.trace_id if trace is not None else None
+
+
+@contextmanager
+def _open_span(trace: Trace, name: str, attributes: Dict[str, Any]) -> Iterator[Span]:
+    parent = _current_span.get()
+    span = Span(
+        trace_id=trace.trace_id,
+        span_id=secrets.token_hex(8),
+        parent_id=parent.span_id if parent is not None else None,
+        name=name,
+        start=time.time(),
+        attributes=attributes,
+    )
+    trace.spans.append(span)
+    token = _current_span.set(span)
+    started = time.perf_counter()
+    try:
+        yield span
+    except BaseException as e:
+        span.error = repr(e)
+        raise
+    finally:
+        span.duration_ms = (time.perf_counter() - started) * 1000
+        _current_span.reset(token)
+
+
+class _NoopSpan:
+    """Stand-in yielded by span() outside a sampled trace."""
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str, **attributes: Any):
+    """Context manager recording a child span of the current trace; a no-op outside a sampled trace."""
+    trace = _current_trace.get()
+    if trace is None:
+        return nullcontext(_NOOP_SPAN)
+    return _open_span(trace, name, attributes)
+
+
+@contextmanager
+def start_trace(name: str, sample_rate: Optional[float] = None, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Start a trace with a root span, sampled with sample_rate; the finished trace is exported."""
+    rate = TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+    if _current_trace.get() is not None or random.random() >= rate:
+        yield None
+        return
+    trace = Trace(trace_id=secrets.token_hex(16))
+    trace_token = _current_trace.set(trace)
+    try:
+        with _open_span(trace, name, attributes) as root:
+            yield root
+    finally:
+        _current_trace.reset(trace_token)
+        trace_exporter.export(trace)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator recording a span around each call of a sync or async function."""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__name__
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def critical_path(trace: Trace) -> List[Span]:
+    """
+    Spans that determined the trace's duration: from each span, walk back from its end through
+    the child that finished last, then the child that finished last before that one started, and so on.
+    """
+    children: Dict[Optional[str], List[Span]] = {}
+    for item in trace.spans:
+        children.setdefault(item.parent_id, []).append(item)
+
+    path: List[Span] = []
+
+    def walk(node: Span) -> None:
+        path.append(node)
+        cursor = node.end
+        remaining = sorted(children.get(node.span_id, []), key=lambda child: child.end, reverse=True)
+        for child in remaining:
+            if child.end <= cursor + 1e-6:
+                walk(child)
+                cursor = child.start
+
+    walk(trace.root)
+    return path
+
+
+def trace_to_dict(trace: Trace) -> Dict[str, Any]:
+    """The trace as JSON-ready data; spans on the critical path are flagged, with their self time."""
+    critical = {item.span_id for item in critical_path(trace)}
+    child_ms: Dict[str, float] = {}
+    for item in trace.spans:
+        if item.parent_id is not None:
+            child_ms[item.parent_id] = child_ms.get(item.parent_id, 0.0) + item.duration_ms
+    root = trace.root
+    return {
+        "trace_id": trace.trace_id,
+        "name": root.name,
+        "start": root.start,
+        "duration_ms": root.duration_ms,
+        "error": root.error,
+        "critical_path": [item.name for item in trace.spans if item.span_id in critical],
+        "spans": [
+            {
+                "span_id": item.span_id,
+                "parent_id": item.parent_id,
+                "name": item.name,
+                "offset_ms": (item.start - root.start) * 1000,
+                "duration_ms": item.duration_ms,
+                # Time not covered by children; concurrent children can make it negative, so clamp
+                "self_ms": max(0.0, item.duration_ms - child_ms.get(item.span_id, 0.0)),
+                "critical": item.span_id in critical,
+                "attributes": item.attributes,
+                "error": item.error,
+            }
+            for item in trace.spans
+        ],
+    }
+
+
+class TraceExporter:
+    """Keeps the most recent finished traces in a ring buffer and appends them to a JSONL file if configured."""
+
+    def __init__(self, buffer_size: int = TRACE_BUFFER_SIZE, jsonl_path: Optional[str] = TRACE_JSONL_PATH):
+        self.traces: Deque[Trace] = deque(maxlen=buffer_size)
+        self.jsonl_path = jsonl_path
+        self.lock = threading.Lock()
+
+    def export(self, trace: Trace) -> None:
+        with self.lock:
+            self.traces.append(trace)
+        if self.jsonl_path:
+            try:
+                with open(self.jsonl_path, "a") as f:
+                    f.write(dumps(trace_to_dict(trace)) + "\n")
+            except OSError as e:
+                logger.warning(f"Could not write trace to {self.jsonl_path}: {e}")
+
+    def recent(self) -> List[Trace]:
+        with self.lock:
+            return list(reversed(self.traces))
+
+    def get(self, trace_id: str) -> Optional[Trace]:
+        return next((trace for trace in self.recent() if trace.trace_id == trace_id), None)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.traces.clear()
+
+
+trace_exporter = TraceExporter()
+
+
+class TracingMiddleware:
+    """ASGI middleware starting a trace per HTTP request and returning its ID in the X-Trace-Id header."""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http" or scope["path"].startswith("/debug/traces"):
+            await self.app(scope, receive, send)
+            return
+        with start_trace(f"{scope['method']} {scope['path']}") as root:
+            if root is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_with_trace_id(message: Dict[str, Any]) -> None:
+                if message["type"] == "http.response.start":
+                    root.set(status=message["status"])
+                    message["headers"] = list(message.get("headers", [])) + [(TRACE_ID_HEADER.encode(), root.trace_id.encode())]
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace_id)
@@ -0,0 +1,228 @@
+"""
+Latency, throughput and peak memory of the DB-layer functions on synthetic organizations, from 1k up to 5M employees,
+alone and under concurrent access from a thread pool (as tool handlers run in worker threads).
+
+Databases are built once per size and seed by benchmarks.synthetic_db and reused from --data-dir.
+The analytics cache is bypassed, so every call reaches SQLite. Each measurement keeps the best of
+--rounds runs to damp machine noise. Results are compared against a stored baseline; a metric worse
+than the baseline by more than --tolerance is reported as a regression and the run exits with status 1.
+Timings are machine-specific: record the baseline on the machine that runs the comparison.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_db [--sizes 1000 10000 100000] [--workers 1 4 16]
+    python -m benchmarks.bench_db --sizes 1000 10000 --save-baseline
+"""
+import argparse
+import json
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from app.db import common
+from app.db.ciso import (
+    get_statistic_summary,
+    fetch_all_employees_with_this_training_status,
+    get_time_to_finish_leaderboard,
+    get_video_funnel
+)
+from app.db.common import STATUS_FINISHED, STATUS_IN_PROGRESS, STATUS_NOT_STARTED
+from app.db.name_index import suggest_employees
+from app.db.regular_employee import fetch_employee_data
+from app.services.cache import db_cache
+from benchmarks.synthetic_db import DEFAULT_SEED, create_synthetic_db
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+DEFAULT_WORKERS = [1, 4, 16]
+DEFAULT_BASELINE = Path(__file__).parent / "baselines" / "bench_db.json"
+DEFAULT_DATA_DIR = Path(tempfile.gettempdir()) / "employees-bench"
+# Calls per measurement: scans repeat less on large databases, point lookups always repeat LOOKUP_CALLS times
+SCAN_ROWS_PER_MEASUREMENT = 200_000
+MIN_SCAN_CALLS, MAX_SCAN_CALLS = 3, 30
+LOOKUP_CALLS = 400
+LOOKUP_SAMPLE = 1_000
+DEFAULT_ROUNDS = 3
+DEFAULT_TOLERANCE = 0.25
+# Metric -> True when higher is better; p95 under thread contention is too noisy to gate on
+COMPARED_METRICS = {"p50_ms": False, "throughput_per_s": True, "peak_mib": False}
+
+
+class _NoCache(dict):
+    """Analytics cache stand-in that never stores, so each call runs its queries."""
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        pass
+
+
+@contextmanager
+def uncached_database(path: Path) -> Iterator[None]:
+    """Point the DB layer at path with the analytics cache disabled."""
+    original_path, original_cache = common.DB_PATH, db_cache.analytics_cache
+    common.DB_PATH, db_cache.analytics_cache = path, _NoCache()
+    try:
+        yield
+    finally:
+        common.DB_PATH, db_cache.analytics_cache = original_path, original_cache
+
+
+def synthetic_db(data_dir: Path, employees: int, seed: int) -> Path:
+    """The synthetic database of this size and seed, built on first use."""
+    path = data_dir / f"synthetic-{employees}-s{seed}.db"
+    if path.exists():
+        with sqlite3.connect(path) as conn:
+            if conn.execute("SELECT count(*) FROM employees").fetchone()[0] == employees:
+                return path
+    started = time.perf_counter()
+    create_synthetic_db(path, employees, seed)
+    print(f"built {path.name} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return path
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _peak_mib(call: Callable[[], Any]) -> float:
+    tracemalloc.start()
+    try:
+        call()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def measure(calls: List[Callable[[], Any]], workers: int = 1) -> Dict[str, float]:
+    """Run the calls on a pool of workers; latency percentiles per call, throughput over the whole run."""
+    def timed(call: Callable[[], Any]) -> float:
+        started = time.perf_counter()
+        call()
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    if workers == 1:
+        latencies = [timed(call) for call in calls]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            latencies = list(pool.map(timed, calls))
+    elapsed = time.perf_counter() - started
+    return {
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": _percentile(latencies, 0.95),
+        "throughput_per_s": len(calls) / elapsed,
+    }
+
+
+def best_of(rounds: int, run_round: Callable[[], Dict[str, float]]) -> Dict[str, float]:
+    """The round with the lowest median latency."""
+    return min((run_round() for _ in range(rounds)), key=lambda metrics: metrics["p50_ms"])
+
+
+def _workloads(employees: int, seed: int) -> Dict[str, Tuple[int, Callable[[int], Callable[[], Any]]]]:
+    """Workload name -> (calls per measurement, factory of the i-th call)."""
+    scan_calls = max(MIN_SCAN_CALLS, min(MAX_SCAN_CALLS, SCAN_ROWS_PER_MEASUREMENT // employees))
+    rng = random.Random(seed)
+    sample = common._execute_query(
+        "SELECT EMPLOYEE_ID, EMPLOYEE_NAME FROM employees LIMIT ?", (LOOKUP_SAMPLE,)
+    ) or []
+    rng.shuffle(sample)
+    workloads = {
+        "get_statistic_summary": (scan_calls, lambda i: get_statistic_summary),
+        "get_video_funnel": (scan_calls, lambda i: get_video_funnel),
+        "get_time_to_finish_leaderboard": (LOOKUP_CALLS, lambda i: lambda: get_time_to_finish_leaderboard(10, "slowest")),
+        "fetch_employee_data": (LOOKUP_CALLS, lambda i: lambda: fetch_employee_data(*sample[i % len(sample)])),
+        # Misspelled first name (last letter dropped) for a known ID
+        "suggest_employees": (LOOKUP_CALLS, lambda i: lambda: suggest_employees(sample[i % len(sample)][0], sample[i % len(sample)][1][:-1])),
+    }
+    for status in (STATUS_FINISHED, STATUS_IN_PROGRESS, STATUS_NOT_STARTED):
+        workloads[f"fetch_all_employees_with_this_training_status[{status}]"] = (
+            scan_calls, lambda i, status=status: lambda: fetch_all_employees_with_this_training_status(status)
+        )
+    return workloads
+
+
+def run(sizes: List[int], workers: List[int], seed: int, data_dir: Path, rounds: int = DEFAULT_ROUNDS) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """size -> workload -> metrics; concurrent runs are keyed "<workload> x<workers>"."""
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for employees in sizes:
+        path = synthetic_db(data_dir, employees, seed)
+        size_results = results[str(employees)] = {}
+        with uncached_database(path):
+            for name, (count, factory) in _workloads(employees, seed).items():
+                calls = [factory(i) for i in range(count)]
+                calls[0]()  # warm the page cache
+                size_results[name] = {**best_of(rounds, lambda: measure(calls)), "peak_mib": _peak_mib(calls[0])}
+                for pool_size in workers:
+                    if pool_size > 1:
+                        size_results[f"{name} x{pool_size}"] = best_of(rounds, lambda: measure(calls, pool_size))
+    return results
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions of results against the baseline, as printable lines."""
+    regressions = []
+    for size, workloads in results.items():
+        for name, metrics in workloads.items():
+            base = baseline.get(size, {}).get(name)
+            if base is None:
+                continue
+            for metric, higher_is_better in COMPARED_METRICS.items():
+                if metric not in metrics or not base.get(metric):
+                    continue
+                ratio = metrics[metric] / base[metric]
+                if (ratio < 1 - tolerance) if higher_is_better else (ratio > 1 + tolerance):
+                    regressions.append(f"{size:>8} {name} {metric}: {base[metric]:.3f} -> {metrics[metric]:.3f} ({ratio:.2f}x)")
+    return regressions
+
+
+def _print_results(results: Dict[str, Any]) -> None:
+    print(f"{'employees':>10}  {'workload':<62}{'p50 ms':>10}{'p95 ms':>10}{'calls/s':>10}{'peak MiB':>10}")
+    for size, workloads in results.items():
+        for name, metrics in workloads.items():
+            peak = f"{metrics['peak_mib']:>10.1f}" if "peak_mib" in metrics else f"{'':>10}"
+            print(f"{size:>10}  {name:<62}{metrics['p50_ms']:>10.3f}{metrics['p95_ms']:>10.3f}{metrics['throughput_per_s']:>10.1f}{peak}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Employees per database, up to 5000000")
+    parser.add_argument("--workers", type=int, nargs="+", default=DEFAULT_WORKERS, help="Thread pool sizes")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR)
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS, help="Runs per measurement; the best is kept")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.workers, args.seed, args.data_dir, args.rounds)
+    _print_results(results)
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps({"seed": args.seed, "results": results}, indent=2) + "\n")
+        print(f"baseline written to {args.baseline}")
+        return
+    if not args.baseline.exists():
+        print(f"no baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+    baseline = json.loads(args.baseline.read_text())
+    if baseline.get("seed") != args.seed:
+        print(f"baseline was recorded with seed {baseline.get('seed')}, not {args.seed}; not comparing")
+        return
+    regressions = compare(results, baseline["results"], args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    print(f"{len(regressions)} regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Sustained ingestion rate of training events into a synthetic organization, in events per second.
+
+A stream of started/finished events for random employees and videos is ingested through
+app.db.training_events.ingest_events in chunks of --chunk events, as an LMS feed would deliver them;
+each chunk is appended and folded into the maintained state in one transaction per batch.
+The database is a fresh copy of the synthetic one, in WAL mode. The run exits with status 1 when the
+rate is below --min-rate.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_ingest [--employees 100000] [--events 200000] [--chunk 5000] [--min-rate 20000]
+"""
+import argparse
+import random
+import shutil
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+from typing import Iterator, List
+
+from app.db import common
+from app.db.training_events import EVENT_FINISHED, EVENT_STARTED, TrainingEvent, close_writer, ingest_events
+from benchmarks.bench_db import DEFAULT_DATA_DIR, synthetic_db, uncached_database
+from benchmarks.synthetic_db import CAMPAIGN_START, DEFAULT_SEED
+
+DEFAULT_EMPLOYEES = 100_000
+DEFAULT_EVENTS = 200_000
+DEFAULT_CHUNK = 5_000
+MIN_EVENTS_PER_SECOND = 20_000.0
+
+
+def generate_events(employee_ids: List[str], video_ids: List[int], count: int, seed: int) -> Iterator[TrainingEvent]:
+    """Random events in roughly increasing time, finishes a few hours after their starts."""
+    rng = random.Random(seed)
+    for index in range(count):
+        moment = CAMPAIGN_START + timedelta(seconds=index * 7)
+        event_type = EVENT_STARTED if rng.random() < 0.5 else EVENT_FINISHED
+        if event_type == EVENT_FINISHED:
+            moment += timedelta(hours=rng.uniform(1, 5))
+        yield TrainingEvent(rng.choice(employee_ids), rng.choice(video_ids), event_type, moment.strftime(common.DATE_FORMAT))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, default=DEFAULT_EMPLOYEES)
+    parser.add_argument("--events", type=int, default=DEFAULT_EVENTS)
+    parser.add_argument("--chunk", type=int, default=DEFAULT_CHUNK, help="Events per ingest_events call")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR)
+    parser.add_argument("--min-rate", type=float, default=MIN_EVENTS_PER_SECOND, help="Events per second")
+    args = parser.parse_args()
+
+    source = synthetic_db(args.data_dir, args.employees, args.seed)
+    path = args.data_dir / f"ingest-{source.name}"
+    shutil.copy(source, path)
+    for suffix in ("-wal", "-shm"):
+        path.with_name(path.name + suffix).unlink(missing_ok=True)
+
+    with uncached_database(path):
+        with common.get_db_connection() as conn:
+            employee_ids = [row[0] for row in conn.execute("SELECT EMPLOYEE_ID FROM employees")]
+            video_ids = [row[0] for row in conn.execute("SELECT VIDEO_ID FROM training_videos")]
+        events = list(generate_events(employee_ids, video_ids, args.events, args.seed))
+
+        started = time.perf_counter()
+        for offset in range(0, len(events), args.chunk):
+            ingest_events(events[offset:offset + args.chunk])
+        elapsed = time.perf_counter() - started
+        close_writer()
+
+    rate = len(events) / elapsed
+    below = rate < args.min_rate
+    print(f"{len(events)} events into {args.employees} employees in {elapsed:.2f}s: {rate:,.0f} events/s "
+          f"(minimum {args.min_rate:,.0f}){'  BELOW MINIMUM' if below else ''}")
+    sys.exit(1 if below else 0)
+
+
+if __name__ == "__main__":
+    main()
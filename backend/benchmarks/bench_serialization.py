@@ -0,0 +1,70 @@
+"""
+CPU time per chat request spent on JSON: cache keys, tool outputs and the API response,
+with the previous stdlib encode-then-md5 path against the serialization layer.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_serialization [--iterations N]
+"""
+import argparse
+import hashlib
+import json
+import time
+from typing import Any, Callable, Dict
+
+from fastapi.responses import JSONResponse
+
+from app.db.ciso import fetch_all_employees_with_this_training_status
+from app.db.common import STATUS_IN_PROGRESS
+from app.db.regular_employee import fetch_employee_data
+from app.services import serialization
+from app.services.llm.llm_formatters import format_employee_data_output, format_employees_by_status
+
+
+def _legacy_key(data: Any) -> str:
+    return hashlib.md5(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _request_workload(encode_key: Callable[[Any], Any], encode: Callable[[Any], Any], response_class: type, fixtures: Dict[str, Any]) -> None:
+    """The JSON work of one chat turn with a tool call: two cache lookups, one tool output, one response."""
+    encode_key(fixtures["llm_key"])
+    encode_key(fixtures["db_key"])
+    encode(fixtures["tool_output"])
+    response_class(fixtures["chat_response"])
+
+
+def _time_per_request(workload: Callable[[], None], iterations: int) -> float:
+    started = time.process_time()
+    for _ in range(iterations):
+        workload()
+    return (time.process_time() - started) / iterations * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    history = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i} " * 20} for i in range(10)]
+    employees = fetch_all_employees_with_this_training_status(STATUS_IN_PROGRESS) or []
+    fixtures = {
+        "llm_key": {"message": "What is my status?", "employee_id": "873239713", "employee_name": "Charlie",
+                    "query_type": "regular_employee_query", "history_length": len(history), "history_tail": history[-3:]},
+        "db_key": {"args": (STATUS_IN_PROGRESS,), "kwargs": {}},
+        "tool_output": format_employees_by_status(employees),
+        "chat_response": {"message": format_employee_data_output(fetch_employee_data("873239713", "Charlie")),
+                          "employee_id": "873239713", "employee_name": "Charlie"},
+    }
+
+    legacy = _time_per_request(lambda: _request_workload(_legacy_key, json.dumps, JSONResponse, fixtures), args.iterations)
+    current = _time_per_request(
+        lambda: _request_workload(serialization.structural_key, serialization.dumps, serialization.FastJSONResponse, fixtures),
+        args.iterations
+    )
+    print(f"serializer: {serialization.SERIALIZER}")
+    print(f"stdlib json + md5 keys: {legacy:8.1f} us CPU per request")
+    print(f"serialization layer:    {current:8.1f} us CPU per request")
+    print(f"saved:                  {legacy - current:8.1f} us ({1 - current / legacy:.0%})")
+
+
+if __name__ == "__main__":
+    main()
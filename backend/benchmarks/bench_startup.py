@@ -0,0 +1,103 @@
+"""
+Cold start of the API against a startup-time budget: import time of app.main, then the latency of the
+first requests a fresh worker serves, each measured in a new interpreter.
+
+The first chat requests use the stub LLM transport without latency, so they measure this service's own
+first-call costs (lazy imports, first DB connection, cache misses) rather than the model.
+The run exits with status 1 when a median exceeds its budget.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_startup [--runs 5] [--import-budget-ms 1200] [--first-request-budget-ms 150]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_RUNS = 5
+IMPORT_BUDGET_MS = 1200.0
+FIRST_REQUEST_BUDGET_MS = 150.0
+
+# Runs in a fresh interpreter and prints one JSON line of timings
+_PROBE = """
+import asyncio, json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+from benchmarks.load_chat import asgi_sender
+from app.db.common import _execute_query
+
+async def requests():
+    send = asgi_sender(app.main.app)
+    employee_id, name = _execute_query(
+        "SELECT EMPLOYEE_ID, EMPLOYEE_NAME FROM employees WHERE EMPLOYEE_DIVISION != 'CISO' LIMIT 1", fetch_one=True
+    )
+    timings = {}
+    for label, method, path, body in (
+        ("first_health", "GET", "/health", None),
+        ("first_auth", "POST", "/chat", {"message": f"I am {name}, ID {employee_id}", "history": []}),
+    ):
+        t = time.perf_counter()
+        status, response = await send(method, path, body)
+        timings[label] = (time.perf_counter() - t) * 1000
+    token = response.get("session_token")
+    for label in ("first_question", "second_question"):
+        t = time.perf_counter()
+        await send("POST", "/chat", {"message": "What is my training status?", "session_token": token})
+        timings[label] = (time.perf_counter() - t) * 1000
+    return timings
+
+timings = asyncio.run(requests())
+print(json.dumps({"import_ms": (imported - started) * 1000, **timings}))
+"""
+
+
+def _probe_once() -> Dict[str, float]:
+    env = {**os.environ, "LLM_TRANSPORT": "stub", "LLM_STUB_LATENCY": "none", "LLM_WARMUP": "0"}
+    output = subprocess.run(
+        [sys.executable, "-c", _PROBE], cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _modules_loaded_by_import() -> List[str]:
+    """Third-party top-level packages that importing app.main loads."""
+    probe = (
+        "import sys; before = set(sys.modules); import app.main; "
+        "print(' '.join(sorted({m.split('.')[0] for m in set(sys.modules) - before} - set(sys.stdlib_module_names) - {'app'})))"
+    )
+    output = subprocess.run([sys.executable, "-c", probe], cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout
+    return output.split()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument("--import-budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--first-request-budget-ms", type=float, default=FIRST_REQUEST_BUDGET_MS)
+    args = parser.parse_args()
+
+    _probe_once()  # compile bytecode caches so every measured run starts alike
+    runs = [_probe_once() for _ in range(args.runs)]
+    budgets = {"import_ms": args.import_budget_ms, "first_question": args.first_request_budget_ms}
+    over_budget = 0
+    print(f"{'measure':<20}{'median ms':>12}{'max ms':>10}{'budget ms':>12}")
+    for measure in ("import_ms", "first_health", "first_auth", "first_question", "second_question"):
+        values = [run[measure] for run in runs]
+        median = statistics.median(values)
+        budget = budgets.get(measure)
+        over = budget is not None and median > budget
+        over_budget += over
+        budget_text = f"{budget:>12.0f}" if budget is not None else f"{'':>12}"
+        print(f"{measure:<20}{median:>12.1f}{max(values):>10.1f}{budget_text}{'  OVER BUDGET' if over else ''}")
+    print(f"packages loaded by importing app.main: {' '.join(_modules_loaded_by_import())}")
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Token count of tool outputs in the verbose and compact encodings, measured on the bundled database.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_tool_output_tokens
+    python -m benchmarks.bench_tool_output_tokens --eval
+
+--eval runs a fixed set of questions through the configured transport (live, or LLM_TRANSPORT=replay)
+and checks each answer for the facts the bundled database holds: exact counts, names, statuses and video
+dates. Run it once per LLM_TOOL_OUTPUT_FORMAT to compare.
+"""
+import argparse
+import asyncio
+import re
+import sys
+from typing import Callable, List, Sequence, Tuple
+
+from app.db.common import _execute_query
+from app.db.ciso import get_statistic_summary, fetch_all_employees_with_this_training_status
+from app.db.regular_employee import fetch_employee_data
+from app.services.llm.llm_formatters import (
+    format_employee_data_output,
+    format_employees_by_status,
+    format_json_output
+)
+from app.services.llm.llm_config import CHARS_PER_TOKEN
+from app.services.serialization import dumps
+
+EMPLOYEE = ("873239713", "Charlie")
+FINISHED_EMPLOYEE = ("120255628", "Bob")
+CISO = ("123456789", "CISO")
+MONTHS = ["january", "february", "march", "april", "may", "june", "july", "august", "september", "october",
+          "november", "december"]
+
+
+def _status_words(status: str) -> str:
+    return status.replace("_", " ").lower()
+
+
+def _date_forms(timestamp: str) -> Tuple[str, ...]:
+    """The ways an answer may write the date of a "YYYY-MM-DD hh:mm:ss" timestamp."""
+    year, month, day = timestamp[:10].split("-")
+    name = MONTHS[int(month) - 1]
+    return (f"{year}-{month}-{day}", f"{name} {int(day)}", f"{int(day)} {name}", f"{name[:3]} {int(day)}", f"{int(day)} {name[:3]}")
+
+
+def _eval_set() -> List[Tuple[str, str, str, str, List[Sequence[str]]]]:
+    """
+    (role, employee id, employee name, question, facts) with the facts read from the database. Every fact
+    must be in the answer, in any of its alternative forms; numbers only match as whole numbers.
+    """
+    employee = fetch_employee_data(*EMPLOYEE)
+    summary = get_statistic_summary()
+    not_started = fetch_all_employees_with_this_training_status("NOT_STARTED") or []
+    fastest = summary["fastest_employee_to_finish_training"]
+    return [
+        ("employee", *EMPLOYEE, "What is my training status?", [(_status_words(employee["training_status"]),)]),
+        ("employee", *EMPLOYEE, "When did I finish my first training video?", [_date_forms(employee["finished_first_video_time"])]),
+        ("employee", *FINISHED_EMPLOYEE, "Did I finish the training, and in how many days?", [
+            (_status_words("FINISHED"),),
+            (str(int(summary["minimum_time_to_finish_training"])),),
+        ]),
+        ("ciso", *CISO, "How many employees finished, are in progress and have not started the training?", [
+            (str(summary["amount_of_finished_employees"]),),
+            (str(summary["amount_of_in_progress_employees"]),),
+            (str(summary["amount_of_not_started_employees"]),),
+        ]),
+        ("ciso", *CISO, "Which employees have not started the training?", [(row[1].lower(),) for row in not_started]),
+        ("ciso", *CISO, "Who finished the training the fastest?", [
+            (fastest["employee_name"].lower(),),
+            (fastest["employee_last_name"].lower(),),
+        ]),
+    ]
+
+
+def _has_fact(answer: str, forms: Sequence[str]) -> bool:
+    """Whether the answer holds one of the forms of a fact as a whole word or number."""
+    text = _status_words(answer)
+    return any(re.search(rf"(?<![\w.]){re.escape(form)}(?!\w)", text) for form in forms)
+
+
+def _count_tokens() -> Callable[[str], int]:
+    """Use tiktoken when it is installed, otherwise the characters-per-token estimate used for history budgeting."""
+    try:
+        import tiktoken
+    except ImportError:
+        return lambda text: -(-len(text) // CHARS_PER_TOKEN)
+    encoding = tiktoken.get_encoding("o200k_base")
+    return lambda text: len(encoding.encode(text))
+
+
+def _tool_outputs() -> List[Tuple[str, str, str]]:
+    """(label, verbose output, compact output) for every employee record and every status list."""
+    outputs = []
+    for employee_id, name in _execute_query("SELECT employee_id, employee_name FROM employees"):
+        data = fetch_employee_data(str(employee_id), name)
+        outputs.append((
+            "employee_data",
+            format_employee_data_output(data),
+            format_employee_data_output(data, compact=True),
+        ))
+    for status in ("NOT_STARTED", "IN_PROGRESS", "FINISHED"):
+        employees = fetch_all_employees_with_this_training_status(status)
+        outputs.append((
+            "employees_by_status",
+            dumps(format_employees_by_status(employees)),
+            dumps(format_employees_by_status(employees, compact=True)),
+        ))
+    statistics = get_statistic_summary()
+    outputs.append((
+        "statistics",
+        format_json_output(statistics, ""),
+        format_json_output(statistics, "", compact=True),
+    ))
+    return outputs
+
+
+def run_token_benchmark() -> None:
+    count = _count_tokens()
+    totals = {}
+    for label, verbose, compact in _tool_outputs():
+        verbose_total, compact_total, calls = totals.get(label, (0, 0, 0))
+        totals[label] = (verbose_total + count(verbose), compact_total + count(compact), calls + 1)
+    print(f"{'tool':<22}{'calls':>7}{'verbose':>10}{'compact':>10}{'saved':>8}")
+    for label, (verbose_total, compact_total, calls) in totals.items():
+        saved = 1 - compact_total / verbose_total
+        print(f"{label:<22}{calls:>7}{verbose_total:>10}{compact_total:>10}{saved:>8.0%}")
+
+
+async def run_eval() -> int:
+    from app.services.llm.llm_queries import regular_employee_query, ciso_query
+    from app.services.llm.llm_config import KEY_MESSAGE, TOOL_OUTPUT_FORMAT_DEFAULT
+    from app.services.cache import clear_all_caches
+
+    eval_set = _eval_set()
+    failures = 0
+    for role, employee_id, name, question, facts in eval_set:
+        clear_all_caches()
+        query = ciso_query if role == "ciso" else regular_employee_query
+        result = await query(question, employee_id=employee_id, employee_name=name)
+        answer = result.get(KEY_MESSAGE, "")
+        missing = [forms[0] for forms in facts if not _has_fact(answer, forms)]
+        failures += bool(missing)
+        print(f"[{'ok' if not missing else 'FAIL'}] {role}: {question} -> {answer[:80]!r}")
+        if missing:
+            print(f"    missing: {', '.join(missing)}")
+    print(f"{len(eval_set) - failures}/{len(eval_set)} passed with {TOOL_OUTPUT_FORMAT_DEFAULT} tool outputs")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--eval", action="store_true", help="Run the answer-quality eval set")
+    args = parser.parse_args()
+    if args.eval:
+        sys.exit(1 if asyncio.run(run_eval()) else 0)
+    run_token_benchmark()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""
+End-to-end load test of /chat: how many concurrent conversations one worker sustains and where it saturates.
+
+Virtual users run scripted conversations drawn from a mix of roles: anonymous users who only
+authenticate (some with credentials the fast path cannot parse), employees asking about their
+own training, and the CISO asking for analytics. After authenticating, each user continues on its
+session token, as the frontend does. Each concurrency level runs for --duration seconds and
+reports throughput, p50/p95/p99 turn latency, event-loop lag and the LLM cache hit rate.
+
+The OpenAI client is replaced by the stub transport, which returns canned tool calls after a
+--llm-latency delay, so the numbers measure this service rather than the model.
+  --target asgi (default)  drives the app in this process through ASGI; the stub is installed here.
+  --target http://host:port  drives a local uvicorn started with LLM_TRANSPORT=stub; event-loop lag
+                             is then the load generator's own and caches are not reset between levels.
+
+Usage (from the backend directory):
+    python -m benchmarks.load_chat [--concurrency 1 8 32 128] [--duration 10] [--llm-latency fixed:0.3]
+    LLM_TRANSPORT=stub uvicorn app.main:app --port 8000 &
+    python -m benchmarks.load_chat --target http://127.0.0.1:8000
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from app.db.common import DIVISION_CISO, _execute_query
+from app.services.llm.llm_config import ERROR_MESSAGE_PREFIX
+from app.services.serialization import dumps, loads
+
+DEFAULT_CONCURRENCY = [1, 8, 32, 128]
+DEFAULT_DURATION_SECONDS = 10.0
+DEFAULT_MIX = "auth=0.2,employee=0.5,ciso=0.3"
+LAG_PROBE_INTERVAL_SECONDS = 0.01
+# Pause between a user's turns, as a person reading the answer would
+THINK_TIME_SECONDS = (0.0, 0.05)
+
+EMPLOYEE_QUESTIONS = [
+    "What is my training status?",
+    "Which videos have I finished?",
+    "How long did the first video take me?",
+    "Did I finish the training?",
+]
+CISO_QUESTIONS = [
+    "Show me the training statistics summary.",
+    "Who has not started the training?",
+    "Which employees are in progress?",
+    "How many employees finished the training?",
+    "Who was the fastest to finish?",
+]
+
+Send = Callable[[str, str, Optional[Dict[str, Any]]], Awaitable[Tuple[int, Dict[str, Any]]]]
+
+
+@dataclass
+class LevelResult:
+    concurrency: int
+    latencies_ms: List[float] = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+    loop_lag_ms: List[float] = field(default_factory=list)
+    cache_hit_rate: Optional[float] = None
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _parse_mix(spec: str) -> Dict[str, float]:
+    mix = {role: float(weight) for role, _, weight in (part.partition("=") for part in spec.split(","))}
+    unknown = set(mix) - {"auth", "employee", "ciso"}
+    if unknown:
+        raise ValueError(f"Unknown roles in mix: {', '.join(sorted(unknown))}")
+    return mix
+
+
+def _credentials() -> Tuple[List[Tuple[str, str]], Tuple[str, str]]:
+    """(employee ID, first name) of the regular employees and of the CISO, from the database."""
+    rows = _execute_query("SELECT EMPLOYEE_ID, EMPLOYEE_NAME, EMPLOYEE_DIVISION FROM employees") or []
+    employees = [(row[0], row[1]) for row in rows if row[2] != DIVISION_CISO]
+    ciso = next((row[0], row[1]) for row in rows if row[2] == DIVISION_CISO)
+    return employees, ciso
+
+
+def _conversation(rng: random.Random, role: str, employees: List[Tuple[str, str]], ciso: Tuple[str, str]) -> List[str]:
+    """Messages of one scripted conversation, the first one authenticating."""
+    if role == "auth":
+        employee_id, name = rng.choice(employees)
+        if rng.random() < 0.5:
+            # Two names: the fast path declines and the model (stub) extracts the credentials
+            return [f"Hi, my manager Dana sent me. I am {name}, ID {employee_id}"]
+        return [f"My ID is {rng.randrange(100_000_000, 999_999_999)} and my name is {name}"]
+    employee_id, name = ciso if role == "ciso" else rng.choice(employees)
+    questions = CISO_QUESTIONS if role == "ciso" else EMPLOYEE_QUESTIONS
+    return [f"Hi, I am {name}, my employee ID is {employee_id}"] + rng.sample(questions, k=rng.randint(1, 3))
+
+
+async def _user(send: Send, rng: random.Random, mix: Dict[str, float], deadline: float, result: LevelResult,
+                employees: List[Tuple[str, str]], ciso: Tuple[str, str]) -> None:
+    roles, weights = zip(*mix.items())
+    while time.perf_counter() < deadline:
+        session_token = None
+        for message in _conversation(rng, rng.choices(roles, weights)[0], employees, ciso):
+            if time.perf_counter() >= deadline:
+                return
+            body: Dict[str, Any] = {"message": message, "history": [], "session_token": session_token}
+            started = time.perf_counter()
+            try:
+                status, response = await send("POST", "/chat", body)
+            except (OSError, asyncio.IncompleteReadError):
+                status, response = 0, {}
+            result.latencies_ms.append((time.perf_counter() - started) * 1000)
+            if status != 200 or str(response.get("message", "")).startswith(ERROR_MESSAGE_PREFIX):
+                result.errors += 1
+                break
+            session_token = response.get("session_token") or session_token
+            await asyncio.sleep(rng.uniform(*THINK_TIME_SECONDS))
+
+
+async def _probe_loop_lag(samples: List[float], stop: asyncio.Event) -> None:
+    """How late the event loop wakes a sleeping task: time the loop spent on other work past the interval."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(LAG_PROBE_INTERVAL_SECONDS)
+        samples.append(max(0.0, (time.perf_counter() - started - LAG_PROBE_INTERVAL_SECONDS) * 1000))
+
+
+def _cache_hit_rate(metrics: Dict[str, Any]) -> Optional[float]:
+    """Turn-weighted LLM cache hit rate over all roles of the /metrics/llm snapshot."""
+    weighted = [(group["turns"], group["cache_hit_rate"]) for group in metrics.values() if group.get("cache_hit_rate") is not None]
+    turns = sum(count for count, _ in weighted)
+    return sum(count * rate for count, rate in weighted) / turns if turns else None
+
+
+def asgi_sender(app: Any) -> Send:
+    """Send requests straight through the ASGI app, in this process."""
+    async def send(method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Tuple[int, Dict[str, Any]]:
+        payload = dumps(body).encode() if body is not None else b""
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+            "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())],
+            "client": ("127.0.0.1", 1), "server": ("loadtest", 80), "root_path": "",
+        }
+        sent = False
+        messages: List[Dict[str, Any]] = []
+
+        async def receive() -> Dict[str, Any]:
+            nonlocal sent
+            if sent:
+                await asyncio.Event().wait()  # nothing more to receive until the request is done
+            sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+
+        async def reply(message: Dict[str, Any]) -> None:
+            messages.append(message)
+
+        await app(scope, receive, reply)
+        status = next(message["status"] for message in messages if message["type"] == "http.response.start")
+        data = b"".join(message.get("body", b"") for message in messages if message["type"] == "http.response.body")
+        return status, loads(data) if data else {}
+    return send
+
+
+class _HTTPConnection:
+    """One keep-alive HTTP/1.1 connection per virtual user, as a browser tab would keep."""
+
+    def __init__(self, host: str, port: int):
+        self.host, self.port = host, port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def send(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Tuple[int, Dict[str, Any]]:
+        if self.writer is None or self.writer.is_closing():
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        payload = dumps(body).encode() if body is not None else b""
+        head = (
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n\r\n"
+        )
+        self.writer.write(head.encode() + payload)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while (line := await self.reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode().partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        data = await self.reader.readexactly(length) if length else b""
+        return status, loads(data) if data else {}
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def run_level(make_send: Callable[[], Tuple[Send, Callable[[], None]]], concurrency: int, duration: float,
+                    mix: Dict[str, float], seed: int) -> LevelResult:
+    employees, ciso = _credentials()
+    result = LevelResult(concurrency)
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe_loop_lag(result.loop_lag_ms, stop))
+    senders = [make_send() for _ in range(concurrency)]
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(
+        _user(send, random.Random(seed * 100_003 + index), mix, deadline, result, employees, ciso)
+        for index, (send, _) in enumerate(senders)
+    ))
+    result.elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+    for _, close in senders:
+        close()
+    return result
+
+
+def _print_result(result: LevelResult) -> None:
+    turns = len(result.latencies_ms)
+    hit_rate = f"{result.cache_hit_rate:.0%}" if result.cache_hit_rate is not None else "-"
+    print(
+        f"{result.concurrency:>6}{turns:>8}{result.errors:>8}{turns / result.elapsed:>10.1f}"
+        f"{_percentile(result.latencies_ms, 0.50):>10.0f}{_percentile(result.latencies_ms, 0.95):>10.0f}"
+        f"{_percentile(result.latencies_ms, 0.99):>10.0f}"
+        f"{statistics.mean(result.loop_lag_ms or [0.0]):>10.1f}{_percentile(result.loop_lag_ms, 0.99):>10.1f}{hit_rate:>8}"
+    )
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    mix = _parse_mix(args.mix)
+    if args.target == "asgi":
+        from app.main import app
+        from app.services.cache import clear_all_caches
+        from app.services.llm import llm_client_setup
+        from app.services.llm.llm_metrics import turn_stats
+        from app.services.llm.llm_resilience import reset_resilience_state
+        from app.services.llm.llm_transport import LatencyModel, StubClient
+
+        # Same effect as LLM_TRANSPORT=stub: get_client() returns the stub instead of building an OpenAI client
+        llm_client_setup._client = StubClient(LatencyModel(args.llm_latency, args.seed))
+        send = asgi_sender(app)
+
+        def make_send() -> Tuple[Send, Callable[[], None]]:
+            return send, lambda: None
+
+        def reset() -> None:
+            clear_all_caches()
+            turn_stats.clear()
+            reset_resilience_state()
+    else:
+        url = urlsplit(args.target)
+        host, port = url.hostname or "127.0.0.1", url.port or 80
+
+        def make_send() -> Tuple[Send, Callable[[], None]]:
+            connection = _HTTPConnection(host, port)
+            return connection.send, connection.close
+
+        def reset() -> None:
+            pass
+
+    print(f"{'users':>6}{'turns':>8}{'errors':>8}{'turns/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'lag ms':>10}{'lag p99':>10}{'cache':>8}")
+    for concurrency in args.concurrency:
+        reset()
+        result = await run_level(make_send, concurrency, args.duration, mix, args.seed)
+        metrics_send, close = make_send()
+        status, metrics = await metrics_send("GET", "/metrics/llm", None)
+        close()
+        result.cache_hit_rate = _cache_hit_rate(metrics) if status == 200 else None
+        _print_result(result)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default="asgi", help='"asgi" for in-process, or the base URL of a local uvicorn')
+    parser.add_argument("--concurrency", type=int, nargs="+", default=DEFAULT_CONCURRENCY, help="Concurrent users per level")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION_SECONDS, help="Seconds per level")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Role weights of the conversations")
+    parser.add_argument("--llm-latency", default="fixed:0.3", help='Stub latency per LLM call, as LLM_STUB_LATENCY (asgi target only)')
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
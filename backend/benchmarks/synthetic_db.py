@@ -0,0 +1,164 @@
+"""
+Seeded generator of synthetic employee databases with the same schema as the bundled employees.db.
+
+The same seed and size always give the same database. Training statuses follow STATUS_WEIGHTS.
+Progress is generated in the legacy video columns and backfilled into the training event log and state tables.
+Start times are skewed towards the beginning of the campaign with a long tail of late starters.
+Video durations and the gaps between videos are long-tailed, and a small share of employees
+watch a later video before an earlier one, as in the bundled data.
+
+Usage (from the backend directory):
+    python -m benchmarks.synthetic_db data/synthetic-100k.db --employees 100000 [--seed 7]
+"""
+import argparse
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+from app.db.common import (
+    DATE_FORMAT,
+    DB_PATH,
+    DIVISION_CISO,
+    NUM_VIDEOS,
+    STATUS_FINISHED,
+    STATUS_IN_PROGRESS,
+    STATUS_NOT_STARTED
+)
+from app.db.training_events import ensure_training_state
+
+DEFAULT_SEED = 7
+CISO_ID = "123456789"
+CISO_NAME = "CISO"
+CAMPAIGN_START = datetime(2025, 11, 18, 9, 0, 0)
+INSERT_BATCH_SIZE = 50_000
+
+STATUS_WEIGHTS = {STATUS_FINISHED: 0.35, STATUS_IN_PROGRESS: 0.45, STATUS_NOT_STARTED: 0.20}
+DIVISION_WEIGHTS = {"Engineering": 0.30, "Support": 0.20, "Data": 0.15, "Marketing": 0.12, "HR": 0.08, "Finance": 0.15}
+FIRST_NAMES = [
+    "Alice", "Bob", "Charlie", "Dana", "Eitan", "Fiona", "George", "Hila", "Ido", "Julia", "Karen", "Liam",
+    "Maya", "Noam", "Omer", "Priya", "Roni", "Shira", "Tal", "Uri", "Vered", "Yossi", "Zohar", "Amit"
+]
+LAST_NAMES = [
+    "Levi", "Cohen", "Baron", "Neumann", "Mizrahi", "Friedman", "Katz", "Peretz", "Biton", "Shapiro",
+    "Avraham", "Dahan", "Goldberg", "Rosen", "Klein", "Weiss", "Ohana", "Azulay", "Segal", "Ben-David"
+]
+
+# Mean days before an employee starts; exponential, so most start early and a few very late
+START_DELAY_MEAN_DAYS = 6.0
+# Lognormal watching time per video in hours (median about 3 hours)
+VIDEO_HOURS_MU, VIDEO_HOURS_SIGMA = 1.1, 0.8
+# Mean days between finishing one video and starting the next
+VIDEO_GAP_MEAN_DAYS = 4.0
+OUT_OF_ORDER_SHARE = 0.05
+# Share of employees who opened their next video without finishing it yet
+IN_PROGRESS_WATCHING_SHARE = 0.5
+NOT_STARTED_OPENED_SHARE = 0.3
+
+
+def _schema_sql(template: Path = DB_PATH) -> str:
+    """CREATE TABLE statement of the bundled database, so the synthetic one is schema-identical."""
+    with sqlite3.connect(template) as conn:
+        row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'employees'").fetchone()
+    return row[0]
+
+
+def _timestamp(value: datetime) -> str:
+    return value.strftime(DATE_FORMAT)
+
+
+def _video_dates(rng: random.Random, status: str) -> List[Optional[str]]:
+    """Start and finish timestamps of the four videos, interleaved like the table columns."""
+    if status == STATUS_NOT_STARTED:
+        finished = 0
+    elif status == STATUS_FINISHED:
+        finished = NUM_VIDEOS
+    else:
+        finished = rng.randint(1, NUM_VIDEOS - 1)
+    order = list(range(NUM_VIDEOS))
+    if rng.random() < OUT_OF_ORDER_SHARE:
+        swap = rng.randrange(NUM_VIDEOS - 1)
+        order[swap], order[swap + 1] = order[swap + 1], order[swap]
+
+    # Videos with a start time: the finished ones, plus possibly the one being watched now
+    opened = finished
+    if status == STATUS_IN_PROGRESS and rng.random() < IN_PROGRESS_WATCHING_SHARE:
+        opened += 1
+    elif status == STATUS_NOT_STARTED and rng.random() < NOT_STARTED_OPENED_SHARE:
+        opened = 1
+
+    dates: List[Optional[str]] = [None] * (NUM_VIDEOS * 2)
+    cursor = CAMPAIGN_START + timedelta(days=rng.expovariate(1 / START_DELAY_MEAN_DAYS))
+    for position, video in enumerate(order[:opened]):
+        dates[video * 2] = _timestamp(cursor)
+        if position == finished:
+            break
+        cursor += timedelta(hours=rng.lognormvariate(VIDEO_HOURS_MU, VIDEO_HOURS_SIGMA))
+        dates[video * 2 + 1] = _timestamp(cursor)
+        cursor += timedelta(days=rng.expovariate(1 / VIDEO_GAP_MEAN_DAYS))
+    return dates
+
+
+def generate_rows(employees: int, seed: int = DEFAULT_SEED) -> Iterator[Tuple]:
+    """Rows of a synthetic organization of the given size, the CISO first."""
+    rng = random.Random(seed)
+    statuses, status_weights = zip(*STATUS_WEIGHTS.items())
+    divisions, division_weights = zip(*DIVISION_WEIGHTS.items())
+    yield (CISO_ID, CISO_NAME, CISO_NAME, DIVISION_CISO) + tuple(_video_dates(rng, STATUS_FINISHED))
+
+    # Unique 9-digit IDs; sampling a range does not materialize it
+    ids = rng.sample(range(100_000_000, 1_000_000_000), employees - 1)
+    for employee_id in ids:
+        if employee_id == int(CISO_ID):
+            employee_id = 999_999_999
+        status = rng.choices(statuses, status_weights)[0]
+        yield (
+            str(employee_id),
+            rng.choice(FIRST_NAMES),
+            rng.choice(LAST_NAMES),
+            rng.choices(divisions, division_weights)[0],
+        ) + tuple(_video_dates(rng, status))
+
+
+def create_synthetic_db(path: Path, employees: int, seed: int = DEFAULT_SEED) -> Path:
+    """Build a database of the given number of employees at path, replacing any existing file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    for stale in (path, path.with_name(path.name + "-wal"), path.with_name(path.name + "-shm")):
+        stale.unlink(missing_ok=True)
+    columns = NUM_VIDEOS * 2 + 4
+    insert = f"INSERT INTO employees VALUES ({', '.join('?' * columns)})"
+    conn = sqlite3.connect(path)
+    try:
+        # Bulk load only: nothing to recover if the build is interrupted
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute(_schema_sql())
+        rows = generate_rows(employees, seed)
+        while True:
+            batch = [row for _, row in zip(range(INSERT_BATCH_SIZE), rows)]
+            if not batch:
+                break
+            conn.executemany(insert, batch)
+        conn.commit()
+        ensure_training_state(conn)
+    finally:
+        conn.close()
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--employees", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    args = parser.parse_args()
+    started = time.perf_counter()
+    create_synthetic_db(args.path, args.employees, args.seed)
+    print(f"{args.employees} employees written to {args.path} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
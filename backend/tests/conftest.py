@@ -1,6 +1,6 @@
+import shutil
 import sys
 from pathlib import Path
-import os
 import pytest
 
 # Ensure the backend package is importable when running tests
@@ -8,9 +8,6 @@ PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.append(str(PROJECT_ROOT))
 
-# Provide a dummy OpenAI key for modules that require it at import time
-os.environ.setdefault("OPENAI_API_KEY", "test-key")
-
 
 def pytest_configure(config):
     config.addinivalue_line("markers", "asyncio: mark test as async")
@@ -19,3 +16,31 @@ def pytest_configure(config):
 @pytest.fixture
 def anyio_backend():
     return "asyncio"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def session_db(tmp_path_factory):
+    """Run the whole session against a copy of the bundled database, so migrations never rewrite the tracked file."""
+    from app.db import common
+
+    path = tmp_path_factory.mktemp("db") / "employees.db"
+    shutil.copy(common.DB_PATH, path)
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(common, "DB_PATH", path)
+        yield path
+
+
+@pytest.fixture
+def db_copy(tmp_path, monkeypatch):
+    """Point the DB layer at a fresh copy of the bundled database, with empty caches."""
+    from app.db import common
+    from app.db.training_events import close_writer
+    from app.services.cache import clear_all_caches
+
+    path = tmp_path / "employees.db"
+    shutil.copy(common.DB_PATH, path)
+    monkeypatch.setattr(common, "DB_PATH", path)
+    clear_all_caches()
+    yield path
+    close_writer()
+    clear_all_caches()
@@ -0,0 +1,153 @@
+import csv
+import io
+import json
+import os
+import anyio
+import pytest
+
+from app.main import app
+from app.db.ciso import fetch_all_employees_with_this_training_status
+from app.db.regular_employee import fetch_employee_data
+from app.services.session.session_store import SessionStore
+from app.services.llm.llm_config import ROLE_CISO, ROLE_EMPLOYEE
+from app.api import analytics
+
+
+async def asgi_get(path, headers=None, query=""):
+    """Send one GET request straight through the ASGI app and return (status, headers, body)."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "headers": [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()],
+        "client": ("127.0.0.1", 1), "server": ("testserver", 80), "root_path": "",
+    }
+    messages = []
+    request_sent, response_done = False, anyio.Event()
+
+    async def receive():
+        # The request body once, then a disconnect after the response, which streamed responses wait for
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+        if message["type"] == "http.response.body" and not message.get("more_body", False):
+            response_done.set()
+
+    await app(scope, receive, send)
+    start = next(message for message in messages if message["type"] == "http.response.start")
+    body = b"".join(message.get("body", b"") for message in messages if message["type"] == "http.response.body")
+    return start["status"], {k.decode(): v.decode() for k, v in start["headers"]}, body
+
+
+pytestmark = pytest.mark.usefixtures("db_copy")
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    store = SessionStore()
+    monkeypatch.setattr(analytics, "session_store", store)
+    return store
+
+
+def bearer(session):
+    return {"Authorization": f"Bearer {session.token}"}
+
+
+@pytest.mark.anyio
+async def test_summary_is_tagged_and_revalidated_with_304(sessions, db_copy):
+    ciso = sessions.create("123456789", "CISO", ROLE_CISO)
+
+    status, headers, body = await asgi_get("/analytics/summary", bearer(ciso))
+    assert status == 200
+    assert json.loads(body)["amount_of_finished_employees"] == 1
+
+    status, _, body = await asgi_get("/analytics/summary", {**bearer(ciso), "If-None-Match": headers["etag"]})
+    assert (status, body) == (304, b"")
+
+    stat = os.stat(db_copy)
+    os.utime(db_copy, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    status, new_headers, _ = await asgi_get("/analytics/summary", {**bearer(ciso), "If-None-Match": headers["etag"]})
+    assert status == 200
+    assert new_headers["etag"] != headers["etag"]
+
+
+@pytest.mark.anyio
+async def test_employees_by_status_is_paginated(sessions):
+    ciso = sessions.create("123456789", "CISO", ROLE_CISO)
+
+    status, _, body = await asgi_get("/analytics/employees", bearer(ciso), "status=IN_PROGRESS&offset=25&limit=10")
+    page = json.loads(body)
+
+    assert status == 200
+    assert page["count"] == 28
+    assert len(page["employees"]) == 3
+    assert (await asgi_get("/analytics/employees", bearer(ciso), "status=DONE"))[0] == 422
+
+
+@pytest.mark.anyio
+async def test_employee_profile(sessions):
+    ciso = sessions.create("123456789", "CISO", ROLE_CISO)
+
+    status, _, body = await asgi_get("/analytics/employees/120255628", bearer(ciso), "name=Bob")
+    assert status == 200
+    assert json.loads(body)["training_status"] == "FINISHED"
+    assert (await asgi_get("/analytics/employees/120255628", bearer(ciso), "name=Nobody"))[0] == 404
+
+
+@pytest.mark.anyio
+async def test_export_streams_filtered_csv_with_derived_fields(sessions):
+    ciso = sessions.create("123456789", "CISO", ROLE_CISO)
+
+    status, headers, body = await asgi_get("/analytics/export", bearer(ciso), "status=IN_PROGRESS&status=NOT_STARTED")
+    header, *rows = list(csv.reader(io.StringIO(body.decode())))
+
+    assert status == 200
+    assert headers["content-type"].startswith("text/csv")
+    assert "attachment" in headers["content-disposition"]
+    assert header[:5] == ["employee_id", "employee_name", "employee_last_name", "employee_division", "training_status"]
+    assert "time_to_finish_fourth_video" in header
+    assert {row[4] for row in rows} == {"IN_PROGRESS", "NOT_STARTED"}
+    assert len(rows) == 28 + len(fetch_all_employees_with_this_training_status("NOT_STARTED"))
+
+    charlie = dict(zip(header, next(row for row in rows if row[0] == "873239713")))
+    expected = fetch_employee_data("873239713", "Charlie")
+    assert charlie["started_first_video_time"] == (expected["started_first_video_time"] or "")
+    assert float(charlie["time_to_finish_first_video"]) == pytest.approx(expected["time_to_finish_first_video"], abs=1e-5)
+
+
+@pytest.mark.anyio
+async def test_export_as_ndjson_by_division(sessions):
+    ciso = sessions.create("123456789", "CISO", ROLE_CISO)
+
+    status, headers, body = await asgi_get("/analytics/export", bearer(ciso), "format=ndjson&division=Marketing")
+    lines = [json.loads(line) for line in body.decode().splitlines()]
+
+    assert status == 200
+    assert headers["content-type"] == "application/x-ndjson"
+    assert len(lines) == 6 and {line["employee_division"] for line in lines} == {"Marketing"}
+    bob = next(line for line in lines if line["employee_id"] == "120255628")
+    assert bob["training_status"] == "FINISHED" and bob["time_to_finish_training"] > 0
+    assert (await asgi_get("/analytics/export", bearer(ciso), "format=xlsx"))[0] == 422
+
+
+def test_csv_export_sends_the_header_first_then_fixed_size_chunks(monkeypatch):
+    monkeypatch.setattr(analytics, "EXPORT_ROWS_PER_CHUNK", 2)
+    rows = iter([("id", "name")] + [(str(i), f"name {i}") for i in range(5)])
+
+    chunks = list(analytics._csv_chunks(rows))
+
+    assert chunks[0] == b"id,name\r\n"
+    assert [chunk.count(b"\n") for chunk in chunks[1:]] == [2, 2, 1]
+
+
+@pytest.mark.anyio
+async def test_analytics_require_a_ciso_session(sessions):
+    employee = sessions.create("873239713", "Charlie", ROLE_EMPLOYEE)
+
+    assert (await asgi_get("/analytics/summary"))[0] == 401
+    assert (await asgi_get("/analytics/summary", bearer(employee)))[0] == 403
@@ -42,3 +42,21 @@ async def test_cache_llm_decorator_caches_async_calls():
     assert first == {"message": "hello", "employee_id": "42", "employee_name": "Alice"}
     assert second == first
     assert calls == [("hello", "42", "Alice")]
+
+
+def test_cache_analytics_is_invalidated_when_the_database_changes(monkeypatch):
+    from app.services.cache import db_cache
+
+    version = ["v1"]
+    monkeypatch.setattr(db_cache, "get_db_version", lambda: version[0])
+    calls = []
+
+    @cache_analytics
+    def count_rows():
+        calls.append(1)
+        return len(calls)
+
+    assert count_rows() == 1
+    assert count_rows() == 1
+    version[0] = "v2"
+    assert count_rows() == 2
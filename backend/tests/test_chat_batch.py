@@ -0,0 +1,70 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+
+from app.api import endpoints
+from app.schemas.api_schemas import ChatBatchRequest
+from app.services.session.session_store import SessionStore
+from app.services.llm.llm_config import ROLE_CISO, ERROR_MESSAGE_PREFIX
+
+
+@pytest.fixture
+def ciso_session(monkeypatch):
+    store = SessionStore()
+    monkeypatch.setattr(endpoints, "session_store", store)
+    return store.create("123456789", "CISO", ROLE_CISO)
+
+
+@pytest.mark.anyio
+async def test_batch_dedupes_keeps_order_and_reports_item_errors(monkeypatch, ciso_session):
+    calls = []
+
+    async def fake_ciso_query(message, history=None, employee_id=None, employee_name=None, session_id=None):
+        calls.append(message)
+        if message == "broken":
+            return {"message": f"{ERROR_MESSAGE_PREFIX} boom"}
+        if message == "crash":
+            raise RuntimeError("crashed")
+        return {"message": f"answer to {message}"}
+
+    monkeypatch.setattr(endpoints, "ciso_query", fake_ciso_query)
+    request = ChatBatchRequest(messages=["a", "broken", "a", "crash", "b"], session_token=ciso_session.token)
+
+    response = await endpoints.chat_batch(request)
+
+    assert sorted(calls) == ["a", "b", "broken", "crash"]
+    assert [(item.message, item.error) for item in response.results] == [
+        ("answer to a", None),
+        (None, f"{ERROR_MESSAGE_PREFIX} boom"),
+        ("answer to a", None),
+        (None, "crashed"),
+        ("answer to b", None),
+    ]
+    assert response.employee_id == "123456789"
+
+
+@pytest.mark.anyio
+async def test_batch_runs_concurrently_under_the_limit(monkeypatch, ciso_session):
+    monkeypatch.setattr(endpoints, "BATCH_CONCURRENCY", 3)
+    running, peak = 0, 0
+
+    async def fake_ciso_query(message, **kwargs):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return {"message": message}
+
+    monkeypatch.setattr(endpoints, "ciso_query", fake_ciso_query)
+    await endpoints.chat_batch(ChatBatchRequest(messages=[str(i) for i in range(10)], session_token=ciso_session.token))
+
+    assert peak == 3
+
+
+@pytest.mark.anyio
+async def test_batch_requires_a_principal(monkeypatch):
+    monkeypatch.setattr(endpoints, "employee_exists_in_database", lambda emp_id, name: False)
+    with pytest.raises(HTTPException) as error:
+        await endpoints.chat_batch(ChatBatchRequest(messages=["a"], employee_id="1", employee_name="Nobody"))
+    assert error.value.status_code == 401
@@ -1,5 +1,10 @@
-from app.db import ciso
+import pytest
+
+from app.db import ciso, common
 from app.db.common import STATUS_FINISHED, STATUS_IN_PROGRESS, STATUS_NOT_STARTED
+from app.db.regular_employee import calculate_employee_time_to_finish_training
+from app.services.llm import llm_tool_handlers
+from app.services.serialization import loads
 
 
 def make_employee(emp_id, first_name, last_name, duration_days):
@@ -18,7 +23,7 @@ def make_employee(emp_id, first_name, last_name, duration_days):
 def test_fetch_all_employees_with_status(monkeypatch):
     expected_query = "expected"
 
-    def fake_build(status, finish_cols):
+    def fake_build(status):
         return expected_query + status
 
     def fake_execute(query, params=None, fetch_one=False):
@@ -42,3 +47,52 @@ def test_calculate_time_to_finish_training(monkeypatch):
     assert stats["average_time_to_finish_training"] == (2.0 + 6.0) / 2
     assert stats["fastest_employee_to_finish_training"]["employee_name"] == "Fast"
     assert stats["slowest_employee_to_finish_training"]["employee_name"] == "Slow"
+
+
+def _ranked_in_python(status, division=None):
+    employees = ciso.fetch_all_employees_with_this_training_status(status) or []
+    timed = [
+        (calculate_employee_time_to_finish_training(emp), emp[0]) for emp in employees
+        if emp[5] is not None and (division is None or emp[3] == division)
+    ]
+    return sorted(timed)
+
+
+@pytest.mark.parametrize("status", [STATUS_FINISHED, STATUS_IN_PROGRESS])
+def test_leaderboard_matches_ranking_every_employee(db_copy, status):
+    expected = _ranked_in_python(status)
+
+    fastest = ciso.get_time_to_finish_leaderboard(5, "fastest", status=status)
+    slowest = ciso.get_time_to_finish_leaderboard(5, "slowest", status=status)
+
+    assert [emp["employee_id"] for emp in fastest] == [employee_id for _, employee_id in expected[:5]]
+    assert [emp["employee_id"] for emp in slowest] == [employee_id for _, employee_id in reversed(expected[-5:])]
+    assert [emp["rank"] for emp in slowest] == list(range(1, len(slowest) + 1))
+    assert fastest[0]["days"] == pytest.approx(expected[0][0], abs=1e-6)
+
+
+def test_leaderboard_filters_by_division(db_copy):
+    expected = _ranked_in_python(STATUS_IN_PROGRESS, "Marketing")
+
+    ranked = ciso.get_time_to_finish_leaderboard(50, "slowest", "Marketing", STATUS_IN_PROGRESS)
+
+    assert {emp["employee_division"] for emp in ranked} == {"Marketing"}
+    assert [emp["employee_id"] for emp in ranked] == [employee_id for _, employee_id in reversed(expected)]
+    assert ciso.get_time_to_finish_leaderboard(3, status=STATUS_NOT_STARTED) == []
+
+
+def test_leaderboard_rejects_unknown_arguments(db_copy):
+    with pytest.raises(ValueError):
+        ciso.get_time_to_finish_leaderboard(5, "middle")
+    with pytest.raises(ValueError):
+        ciso.get_time_to_finish_leaderboard(0)
+
+
+def test_leaderboard_tool_caps_k(db_copy):
+    output, _, _ = llm_tool_handlers._handle_get_time_leaderboard(
+        {"order": "slowest", "k": 500, "status": STATUS_IN_PROGRESS}, None, None
+    )
+    result = loads(output)
+
+    assert result["count"] == len(_ranked_in_python(STATUS_IN_PROGRESS))
+    assert result["order"] == "slowest" and result["division"] is None
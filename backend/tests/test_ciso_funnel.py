@@ -0,0 +1,103 @@
+import sqlite3
+import statistics
+from collections import defaultdict
+from datetime import datetime
+
+import pytest
+
+from app.db import common
+from app.db.ciso import get_video_funnel
+from app.db.training_events import TrainingEvent, ingest_events
+from app.services.llm import llm_tool_handlers
+from app.services.llm.llm_formatters import format_video_funnel
+from app.services.serialization import loads
+
+
+pytestmark = pytest.mark.usefixtures("db_copy")
+
+
+def _minutes(finish, start):
+    delta = datetime.strptime(finish, common.DATE_FORMAT) - datetime.strptime(start, common.DATE_FORMAT)
+    return delta.total_seconds() / 60
+
+
+def _naive_funnel(path):
+    """Stage counts and latencies computed employee by employee."""
+    with sqlite3.connect(path) as conn:
+        catalog = [row[0] for row in conn.execute("SELECT VIDEO_ID FROM training_videos ORDER BY VIDEO_ID")]
+        progress = defaultdict(dict)
+        for employee_id, video_id, started, finished in conn.execute("SELECT * FROM employee_video_state"):
+            progress[employee_id][video_id] = (started, finished)
+    stages = []
+    for index, video_id in enumerate(catalog):
+        following = catalog[index + 1] if index + 1 < len(catalog) else None
+        stage = {"started": 0, "finished": 0, "stalled": 0, "dropped": 0, "watch": [], "gap": []}
+        for videos in progress.values():
+            started, finished = videos.get(video_id, (None, None))
+            stage["started"] += started is not None
+            stage["finished"] += finished is not None
+            stage["stalled"] += started is not None and finished is None
+            if started and finished:
+                stage["watch"].append(_minutes(finished, started))
+            if finished and following is not None:
+                next_started = videos.get(following, (None, None))[0]
+                if next_started:
+                    stage["gap"].append(max(0.0, _minutes(next_started, finished)))
+                else:
+                    stage["dropped"] += 1
+        stages.append(stage)
+    return stages
+
+
+def _assert_matches(funnel, expected):
+    assert len(funnel["stages"]) == len(expected)
+    for stage, naive in zip(funnel["stages"], expected):
+        assert stage["started"] == naive["started"]
+        assert stage["finished"] == naive["finished"]
+        assert stage["started_not_finished"] == naive["stalled"]
+        assert stage["watch_time"]["count"] == len(naive["watch"])
+        if naive["watch"]:
+            assert stage["watch_time"]["median_days"] == pytest.approx(statistics.median_low(naive["watch"]) / 1440, abs=1e-3)
+        if "finished_not_started_next" in stage:
+            assert stage["finished_not_started_next"] == naive["dropped"]
+            assert stage["gap_to_next_video"]["count"] == len(naive["gap"])
+            if naive["gap"]:
+                assert stage["gap_to_next_video"]["median_days"] == pytest.approx(statistics.median_low(naive["gap"]) / 1440, abs=1e-3)
+
+
+def test_funnel_matches_a_per_employee_computation(db_copy):
+    funnel = get_video_funnel()
+
+    assert funnel["total_employees"] == 31
+    assert [stage["video"] for stage in funnel["stages"]] == common.VIDEO_NAMES
+    assert "gap_to_next_video" not in funnel["stages"][-1]
+    _assert_matches(funnel, _naive_funnel(db_copy))
+
+
+def test_funnel_follows_new_events(db_copy):
+    before = get_video_funnel()
+    ciso_id = "123456789"
+    ingest_events([
+        TrainingEvent(ciso_id, 1, "started", "2030-01-01 09:00:00"),
+        TrainingEvent(ciso_id, 1, "finished", "2030-01-01 10:30:00"),
+        TrainingEvent(ciso_id, 2, "started", "2030-01-03 10:30:00"),
+    ])
+    after = get_video_funnel()
+
+    first, second = after["stages"][0], after["stages"][1]
+    assert first["finished"] == before["stages"][0]["finished"] + 1
+    assert first["gap_to_next_video"]["count"] == before["stages"][0]["gap_to_next_video"]["count"] + 1
+    assert second["started_not_finished"] == before["stages"][1]["started_not_finished"] + 1
+    _assert_matches(after, _naive_funnel(db_copy))
+
+
+def test_funnel_tool_encodes_one_row_per_video(db_copy):
+    funnel = get_video_funnel()
+    compact = format_video_funnel(funnel, compact=True)
+
+    assert compact["stages"]["cols"][:4] == ["video", "started", "finished", "stalled"]
+    assert [row[0] for row in compact["stages"]["rows"]] == common.VIDEO_NAMES
+    assert compact["stages"]["rows"][-1][6:] == [None, None, None]
+
+    output, _, _ = llm_tool_handlers._handle_get_video_funnel({}, None, None)
+    assert loads(output)["total_employees"] == funnel["total_employees"]
@@ -0,0 +1,126 @@
+import sqlite3
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.db import common
+from app.db.ciso_timeseries import clear_timeseries_cache, get_completion_timeseries
+from app.db.training_events import TrainingEvent, ingest_events, rebuild_training_state, register_video
+from app.services.llm import llm_tool_handlers
+from app.services.llm.llm_formatters import format_completion_timeseries
+from app.services.serialization import loads
+
+
+pytestmark = pytest.mark.usefixtures("db_copy")
+
+
+def _monday(timestamp):
+    day = datetime.strptime(timestamp[:10], "%Y-%m-%d")
+    return (day - timedelta(days=day.weekday())).strftime("%Y-%m-%d")
+
+
+def _expected_completions(path, bucket):
+    with sqlite3.connect(path) as conn:
+        finishes = [row[0] for row in conn.execute("SELECT LAST_FINISH FROM employee_training_state WHERE STATUS = 'FINISHED'")]
+    return sorted(Counter(bucket(finish) for finish in finishes).items())
+
+
+def _full_recomputation(granularity):
+    clear_timeseries_cache()
+    return get_completion_timeseries(granularity)
+
+
+def test_daily_and_weekly_completions_match_the_state(db_copy):
+    for granularity, bucket in (("day", lambda ts: ts[:10]), ("week", _monday)):
+        series = get_completion_timeseries(granularity)
+        expected = _expected_completions(db_copy, bucket)
+
+        assert [(row["bucket"], row["completed"]) for row in series["completions"]] == expected
+        cumulative = series["completions"][-1]["cumulative_completed"]
+        assert cumulative == sum(count for _, count in expected)
+        assert series["completions"][-1]["cumulative_finished_percentage"] == round(100 * cumulative / series["total_employees"], 2)
+
+
+def test_video_activity_counts_first_starts_and_finishes(db_copy):
+    series = get_completion_timeseries("day")
+    with sqlite3.connect(db_copy) as conn:
+        starts, finishes = conn.execute("SELECT count(STARTED_AT), count(FINISHED_AT) FROM employee_video_state").fetchone()
+
+    assert sum(row["started"] for row in series["video_activity"]) == starts
+    assert sum(row["finished"] for row in series["video_activity"]) == finishes
+    assert {row["video"] for row in series["video_activity"]} <= set(common.VIDEO_NAMES)
+
+
+def test_new_events_extend_the_cached_series_like_a_full_recomputation(db_copy):
+    get_completion_timeseries("week")
+    charlie = "873239713"
+    ingest_events([TrainingEvent(charlie, video_id, "finished", "2030-01-07 10:00:00") for video_id in (1, 2, 3, 4)])
+    extended = get_completion_timeseries("week")
+
+    assert extended["completions"][-1]["bucket"] == "2030-01-07"
+    assert extended == _full_recomputation("week")
+
+
+def test_out_of_order_events_recompute_from_their_bucket(db_copy):
+    get_completion_timeseries("day")
+    with sqlite3.connect(db_copy) as conn:
+        first_day = conn.execute("SELECT min(EVENT_TIME) FROM training_events").fetchone()[0][:10]
+    ingest_events([TrainingEvent("873239713", 4, "started", f"{first_day} 00:00:01")])
+    extended = get_completion_timeseries("day")
+
+    assert extended == _full_recomputation("day")
+
+
+def test_registering_a_video_recomputes_everything(db_copy):
+    before = get_completion_timeseries("week")
+    register_video("fifth")
+    after = get_completion_timeseries("week")
+
+    assert after["completions"] == []
+    assert before["completions"] and after == _full_recomputation("week")
+
+
+def test_rebuilding_after_deleting_an_older_event_recomputes_everything(db_copy):
+    before = get_completion_timeseries("day")
+    with sqlite3.connect(db_copy) as conn:
+        # A finish of a FINISHED employee's completing video, older than the newest event
+        event_id, finished_day = conn.execute(
+            "SELECT e.EVENT_ID, date(e.EVENT_TIME) FROM training_events e "
+            "JOIN employee_training_state t ON t.EMPLOYEE_ID = e.EMPLOYEE_ID AND t.LAST_FINISH = e.EVENT_TIME "
+            "WHERE t.STATUS = 'FINISHED' AND e.EVENT_TYPE = 'finished' "
+            "AND e.EVENT_ID < (SELECT max(EVENT_ID) FROM training_events) ORDER BY e.EVENT_TIME LIMIT 1"
+        ).fetchone()
+        conn.execute("DELETE FROM training_events WHERE EVENT_ID = ?", (event_id,))
+    rebuild_training_state()
+    after = get_completion_timeseries("day")
+
+    completed = {row["bucket"]: row["completed"] for row in after["completions"]}
+    assert completed.get(finished_day, 0) < {row["bucket"]: row["completed"] for row in before["completions"]}[finished_day]
+    assert after == _full_recomputation("day")
+
+
+def test_unknown_granularity_is_rejected():
+    with pytest.raises(ValueError):
+        get_completion_timeseries("month")
+
+
+def test_formatter_keeps_the_latest_buckets(db_copy):
+    series = get_completion_timeseries("day")
+    buckets = sorted({row["bucket"] for row in series["completions"]} | {row["bucket"] for row in series["video_activity"]})
+    trimmed = format_completion_timeseries(series, 2, compact=True)
+
+    assert trimmed["buckets_omitted"] == len(buckets) - 2
+    assert trimmed["completions"]["cols"] == ["bucket", "done", "total", "pct"]
+    kept = {row[0] for row in trimmed["completions"]["rows"]} | {row[0] for row in trimmed["video_activity"]["rows"]}
+    assert kept == set(buckets[-2:])
+
+
+def test_timeseries_tool_clamps_the_number_of_buckets(db_copy):
+    output, _, _ = llm_tool_handlers._handle_get_completion_timeseries({"granularity": "day", "last_buckets": -5}, None, None)
+    result = loads(output)
+    series = get_completion_timeseries("day")
+    buckets = {row["bucket"] for row in series["completions"]} | {row["bucket"] for row in series["video_activity"]}
+
+    assert result["granularity"] == "day"
+    assert result["buckets_omitted"] == len(buckets) - 1
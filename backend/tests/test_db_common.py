@@ -13,11 +13,12 @@ def test_calculate_time_diff_handles_valid_dates():
     assert calculate_time_diff(finish, start) == 3.0
 
 
-def test_build_status_query_for_finished_and_not_started():
-    finished_query = _build_status_query(STATUS_FINISHED, ["f1", "f2"])
-    in_progress_query = _build_status_query(STATUS_IN_PROGRESS, ["f1", "f2"])
-    not_started_query = _build_status_query(STATUS_NOT_STARTED, ["f1", "f2"])
+def test_build_status_query_reads_the_maintained_state():
+    finished_query = _build_status_query(STATUS_FINISHED)
+    in_progress_query = _build_status_query(STATUS_IN_PROGRESS)
+    not_started_query = _build_status_query(STATUS_NOT_STARTED)
 
-    assert finished_query == "SELECT * FROM employees WHERE f1 IS NOT NULL AND f2 IS NOT NULL"
-    assert "f1 IS NOT NULL" in in_progress_query and "NOT (f1 IS NOT NULL AND f2 IS NOT NULL)" in in_progress_query
-    assert not_started_query == "SELECT * FROM employees WHERE f1 IS NULL AND f2 IS NULL"
+    assert "FROM employee_training_state t" in finished_query and "t.STATUS = 'FINISHED'" in finished_query
+    assert "t.STATUS = 'IN_PROGRESS'" in in_progress_query
+    assert "LEFT JOIN employee_training_state" in not_started_query and "t.STATUS IS NULL" in not_started_query
+    assert _build_status_query("UNKNOWN").endswith("WHERE 1=0")
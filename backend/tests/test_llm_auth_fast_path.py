@@ -0,0 +1,57 @@
+import pytest
+
+from app.services.llm import llm_auth_fast_path, llm_queries, llm_config
+from app.services.cache import clear_all_caches
+
+
+NAME_INDEX = {"dana": "Dana", "alice": "Alice"}
+
+
+@pytest.fixture(autouse=True)
+def fake_name_index(monkeypatch):
+    clear_all_caches()
+    monkeypatch.setattr(llm_auth_fast_path, "fetch_employee_first_names", lambda: NAME_INDEX)
+    yield
+    clear_all_caches()
+
+
+def test_extract_credentials_finds_id_and_name():
+    assert llm_auth_fast_path.extract_credentials("I'm dana, 123456789") == ("123456789", "Dana")
+
+
+@pytest.mark.parametrize("message", [
+    "hello",
+    "I'm Dana",
+    "my id is 123456789",
+    "Dana and Alice, 123456789",
+    "I'm Dana, 123456789 or 987654321",
+    "I'm Dana, 1234567890",
+])
+def test_extract_credentials_is_none_when_ambiguous(message):
+    assert llm_auth_fast_path.extract_credentials(message) is None
+
+
+@pytest.mark.anyio
+async def test_authenticate_employee_skips_llm_when_confident(monkeypatch):
+    monkeypatch.setattr(llm_auth_fast_path, "employee_exists_in_database", lambda emp_id, name: True)
+
+    async def fail_initial_request(*args, **kwargs):
+        raise AssertionError("LLM should not be called")
+
+    monkeypatch.setattr(llm_queries, "_make_initial_request", fail_initial_request)
+
+    result = await llm_queries.authenticate_employee("Hi, I'm Dana 123456789")
+
+    assert result[llm_config.KEY_MESSAGE] == "Hi Dana, how can I help you?"
+    assert result[llm_config.KEY_EMPLOYEE_ID] == "123456789"
+    assert result[llm_config.KEY_EMPLOYEE_NAME] == "Dana"
+
+
+@pytest.mark.anyio
+async def test_authenticate_employee_fast_path_rejects_unknown_employee(monkeypatch):
+    monkeypatch.setattr(llm_auth_fast_path, "employee_exists_in_database", lambda emp_id, name: False)
+
+    result = await llm_queries.authenticate_employee("Dana 123456789")
+
+    assert result[llm_config.KEY_MESSAGE] == llm_config.AUTH_FAILURE_MESSAGE
+    assert result[llm_config.KEY_EMPLOYEE_ID] is None
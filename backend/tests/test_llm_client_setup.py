@@ -0,0 +1,72 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services.llm import llm_client_setup, llm_config
+from tests.test_llm_resilience import make_response_body
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        payload = json.dumps(make_response_body("ok")).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def keep_alive_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def fresh_client(monkeypatch):
+    monkeypatch.setattr(llm_client_setup, "_client", None)
+    monkeypatch.setattr(llm_client_setup, "_http_client", None)
+    llm_client_setup.connection_stats.reset()
+    yield
+    llm_client_setup.connection_stats.reset()
+
+
+def test_client_is_built_on_first_use_and_requires_key(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    with pytest.raises(ValueError):
+        llm_client_setup.get_client()
+    assert llm_client_setup._client is None
+
+
+@pytest.mark.anyio
+async def test_shared_pool_reuses_connections_and_closes(monkeypatch, keep_alive_server):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_BASE_URL", keep_alive_server)
+
+    client = llm_client_setup.get_client()
+    assert llm_client_setup.get_client() is client
+    for _ in range(3):
+        response = await llm_client_setup.client.responses.create(model=llm_config.MODEL_NAME, input="hi")
+        assert response.output_text == "ok"
+
+    stats = llm_client_setup.connection_stats.snapshot()
+    assert stats["requests"] == 3
+    assert stats["new_connections"] == 1
+    assert stats["reused_connections"] == 2
+
+    http_client = llm_client_setup._http_client
+    await llm_client_setup.close_client()
+    assert http_client.is_closed
+    assert llm_client_setup._client is None
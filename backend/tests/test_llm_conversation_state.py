@@ -0,0 +1,158 @@
+import pytest
+from types import SimpleNamespace
+
+from app.services.llm import llm_queries, llm_config, llm_conversation_state
+from app.services.cache import clear_all_caches
+
+
+class ChainLostError(Exception):
+    status_code = 404
+
+
+class DummyResponses:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class DummyClient:
+    def __init__(self, responses):
+        self.responses = DummyResponses(responses)
+
+
+def make_response(response_id, output=None, output_text="answer"):
+    return SimpleNamespace(id=response_id, output=output or [], output_text=output_text)
+
+
+@pytest.fixture(autouse=True)
+def reset_state():
+    clear_all_caches()
+    llm_conversation_state.clear_conversation_state()
+    yield
+    clear_all_caches()
+    llm_conversation_state.clear_conversation_state()
+
+
+@pytest.mark.anyio
+async def test_second_turn_sends_only_new_message(monkeypatch):
+    dummy_client = DummyClient([make_response("resp_1"), make_response("resp_2")])
+    monkeypatch.setattr(llm_queries, "client", dummy_client)
+
+    first_history = [{"role": "user", "content": "hi"}]
+    await llm_queries.execute_query_with_tools("hi", first_history, [], "instruction", 1, "1", "John", session_id="s1")
+    second_history = first_history + [{"role": "assistant", "content": "answer"}, {"role": "user", "content": "next"}]
+    await llm_queries.execute_query_with_tools("next", second_history, [], "instruction", 1, "1", "John", session_id="s1")
+
+    first_call, second_call = dummy_client.responses.calls
+    assert "previous_response_id" not in first_call
+    assert second_call["previous_response_id"] == "resp_1"
+    assert second_call["input"] == [{"role": "user", "content": "next"}]
+
+
+@pytest.mark.anyio
+async def test_chain_is_not_shared_between_employees(monkeypatch):
+    dummy_client = DummyClient([make_response("resp_1"), make_response("resp_2")])
+    monkeypatch.setattr(llm_queries, "client", dummy_client)
+
+    await llm_queries.execute_query_with_tools("hi", [], [], "instruction", 1, "1", "John", session_id="s1")
+    await llm_queries.execute_query_with_tools("hi", [{}, {}], [], "instruction", 1, "2", "Jane", session_id="s1")
+
+    assert "previous_response_id" not in dummy_client.responses.calls[1]
+
+
+@pytest.mark.anyio
+async def test_lost_chain_falls_back_to_full_history(monkeypatch):
+    dummy_client = DummyClient([make_response("resp_1"), ChainLostError("gone"), make_response("resp_3")])
+    monkeypatch.setattr(llm_queries, "client", dummy_client)
+
+    await llm_queries.execute_query_with_tools("hi", [], [], "instruction", 1, "1", "John", session_id="s1")
+    history = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "answer"}]
+    result = await llm_queries.execute_query_with_tools("next", history, [], "instruction", 1, "1", "John", session_id="s1")
+
+    fallback_call = dummy_client.responses.calls[2]
+    assert result[llm_config.KEY_MESSAGE] == "answer"
+    assert "previous_response_id" not in fallback_call
+    assert fallback_call["input"][-1] == {"role": "user", "content": "next"}
+    assert len(fallback_call["input"]) == 3
+
+
+@pytest.mark.anyio
+async def test_follow_up_sends_only_tool_outputs(monkeypatch):
+    dummy_client = DummyClient([make_response("resp_2")])
+    monkeypatch.setattr(llm_queries, "client", dummy_client)
+    tool_outputs = [{"type": "function_call_output", "call_id": "c1", "output": "{}"}]
+
+    async def fake_make_initial_request(*args, **kwargs):
+        return make_response("resp_1"), [{"role": "user", "content": "hi"}], tool_outputs, None, None
+
+    monkeypatch.setattr(llm_queries, "_make_initial_request", fake_make_initial_request)
+
+    await llm_queries.execute_query_with_tools("hi", [], [], "instruction", 1)
+
+    follow_up = dummy_client.responses.calls[0]
+    assert follow_up["previous_response_id"] == "resp_1"
+    assert follow_up["input"] == tool_outputs
+
+
+def test_out_of_sync_history_drops_chain():
+    llm_conversation_state.remember_response("s1", [], SimpleNamespace(id="resp_1"))
+    assert llm_conversation_state.get_previous_response_id("s1", [{}, {}]) == "resp_1"
+    assert llm_conversation_state.get_previous_response_id("s1", [{}]) is None
+    assert llm_conversation_state.get_previous_response_id("s1", [{}, {}]) is None
+
+
+@pytest.mark.anyio
+async def test_context_is_preinjected_only_on_the_first_turn_of_a_chain(monkeypatch):
+    dummy_client = DummyClient([make_response("resp_1"), make_response("resp_2"), make_response("resp_3")])
+    monkeypatch.setattr(llm_queries, "client", dummy_client)
+    monkeypatch.setattr(llm_queries, "fetch_employee_data", lambda emp_id, name: {"training_status": "FINISHED"})
+
+    history = []
+    for message in ("did I finish?", "when?", "thanks"):
+        await llm_queries.regular_employee_query(message, history, "1", "John", session_id="s1")
+        history = history + [{"role": "user", "content": message}, {"role": "assistant", "content": "answer"}]
+
+    first_call, *chained_calls = dummy_client.responses.calls
+    assert first_call["input"][-2]["role"] == llm_config.PREINJECTED_CONTEXT_ROLE
+    assert [call["input"] for call in chained_calls] == [
+        [{"role": "user", "content": "when?"}],
+        [{"role": "user", "content": "thanks"}],
+    ]
+
+
+@pytest.mark.anyio
+async def test_cached_answer_keeps_the_chain(monkeypatch):
+    dummy_client = DummyClient([make_response("resp_1"), make_response("resp_2")])
+    monkeypatch.setattr(llm_queries, "client", dummy_client)
+    monkeypatch.setattr(llm_queries, "PREINJECT_CONTEXT_ROLES", frozenset())
+
+    await llm_queries.regular_employee_query("hi", [], "1", "John", session_id="s1")
+    await llm_queries.regular_employee_query("hi", [], "1", "John", session_id="s2")
+    history = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "answer"}]
+    await llm_queries.regular_employee_query("next", history, "1", "John", session_id="s2")
+
+    first_call, second_call = dummy_client.responses.calls
+    assert second_call["previous_response_id"] == "resp_1"
+    assert second_call["input"] == [{"role": "user", "content": "next"}]
+
+
+@pytest.mark.anyio
+async def test_bounded_session_log_stays_chained_by_turn(monkeypatch):
+    turns = 5
+    dummy_client = DummyClient([make_response(f"resp_{turn}") for turn in range(turns)])
+    monkeypatch.setattr(llm_queries, "client", dummy_client)
+
+    # A full log of a server-side session: its length no longer changes from one turn to the next
+    log = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "answer"}] * 2
+    for turn in range(turns):
+        await llm_queries.execute_query_with_tools(f"question {turn}", log, [], "instruction", 1, "1", "John", session_id="s1", turn=10 + turn)
+
+    chained = [call.get("previous_response_id") for call in dummy_client.responses.calls]
+    assert chained == [None] + [f"resp_{turn}" for turn in range(turns - 1)]
@@ -1,9 +1,11 @@
+import json
+
 from app.services.llm import llm_formatters
 
 
 def test_format_json_output_returns_error_when_empty():
     result = llm_formatters.format_json_output(None, "missing")
-    assert result == '{"error": "missing"}'
+    assert json.loads(result) == {"error": "missing"}
 
 
 def test_format_employees_by_status_formats_payload():
@@ -16,3 +18,50 @@ def test_format_employees_by_status_formats_payload():
 def test_format_employees_by_status_with_no_employees():
     formatted = llm_formatters.format_employees_by_status([])
     assert formatted == {"error": "No employees found with this status", "employees": [], "count": 0}
+
+
+EMPLOYEE_DATA = {
+    "personal data": {
+        "employee_id": "1",
+        "employee_name": "John",
+        "employee_last_name": "Doe",
+        "employee_division": "Finance",
+    },
+    "started_first_video_time": "2024-01-01 00:00:00",
+    "finished_first_video_time": "2024-01-01 04:00:00",
+    "time_to_finish_first_video": 0.16666666666666666,
+    "started_second_video_time": "2024-01-02 00:00:00",
+    "finished_second_video_time": None,
+    "time_to_finish_second_video": 0.0,
+    "training_status": "IN_PROGRESS",
+}
+
+
+def test_compact_employee_data_uses_short_keys_and_video_table():
+    compact = llm_formatters.compact_employee_data(EMPLOYEE_DATA)
+    assert compact["id"] == "1"
+    assert compact["status"] == "IN_PROGRESS"
+    assert compact["videos"]["cols"] == ["video", "start", "finish", "days"]
+    assert compact["videos"]["rows"] == [
+        ["first", "2024-01-01 00:00", "2024-01-01 04:00", 0.17],
+        ["second", "2024-01-02 00:00", None, None],
+    ]
+
+
+def test_compact_output_is_smaller_than_verbose():
+    verbose = llm_formatters.format_employee_data_output(EMPLOYEE_DATA)
+    compact = llm_formatters.format_employee_data_output(EMPLOYEE_DATA, compact=True)
+    assert len(compact) < len(verbose) * 0.6
+
+
+def test_format_employees_by_status_compact_is_columnar():
+    formatted = llm_formatters.format_employees_by_status([("1", "John", "Doe", "Division")], compact=True)
+    assert formatted == {"employees": {"cols": ["id", "name", "last", "div"], "rows": [["1", "John", "Doe", "Division"]]}, "count": 1}
+
+
+def test_with_output_legend_follows_selected_format(monkeypatch):
+    tool = {"type": "function", "name": "get_all_employees_with_this_training_status", "description": "List employees."}
+    monkeypatch.setattr(llm_formatters, "TOOL_OUTPUT_FORMATS", {})
+    assert llm_formatters.with_output_legend(tool)["description"].endswith(llm_formatters.COMPACT_EMPLOYEE_LIST_LEGEND)
+    monkeypatch.setattr(llm_formatters, "TOOL_OUTPUT_FORMATS", {tool["name"]: "verbose"})
+    assert llm_formatters.with_output_legend(tool) is tool
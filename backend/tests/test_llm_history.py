@@ -0,0 +1,123 @@
+import pytest
+from types import SimpleNamespace
+
+from app.services.llm import llm_history, llm_config
+from app.services.cache import clear_all_caches
+
+
+class DummyResponses:
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return SimpleNamespace(output_text=f"summary {len(self.calls)}")
+
+
+class DummyClient:
+    def __init__(self):
+        self.responses = DummyResponses()
+
+
+def make_history(count, content_length=40):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"{i:03d}" + "x" * (content_length - 3)}
+        for i in range(count)
+    ]
+
+
+@pytest.fixture(autouse=True)
+def dummy_client(monkeypatch):
+    clear_all_caches()
+    client = DummyClient()
+    monkeypatch.setattr(llm_history, "client", client)
+    yield client
+    clear_all_caches()
+
+
+def test_estimate_tokens_uses_chars_per_token():
+    assert llm_history.estimate_tokens("") == 0
+    assert llm_history.estimate_tokens("a" * llm_config.CHARS_PER_TOKEN) == 1
+    assert llm_history.estimate_tokens("a" * (llm_config.CHARS_PER_TOKEN + 1)) == 2
+
+
+def test_split_history_keeps_last_messages_within_budget():
+    history = make_history(10)
+    folded, recent = llm_history.split_history(history, token_budget=10_000, keep_last=4)
+    assert recent == history[-4:]
+    assert folded == history[:-4]
+
+
+def test_split_history_keeps_everything_when_short():
+    history = make_history(3)
+    folded, recent = llm_history.split_history(history, token_budget=10_000, keep_last=4)
+    assert folded == []
+    assert recent == history
+
+
+def test_split_history_drops_recent_messages_that_exceed_budget():
+    history = make_history(6, content_length=400)
+    budget = llm_config.HISTORY_SUMMARY_MAX_TOKENS + 250
+    folded, recent = llm_history.split_history(history, token_budget=budget, keep_last=6)
+    assert len(recent) == 2
+    assert llm_history.estimate_message_tokens(recent) + llm_config.HISTORY_SUMMARY_MAX_TOKENS <= budget
+    assert folded + recent == history
+
+
+@pytest.mark.anyio
+async def test_budgeted_prompt_is_bounded_for_long_sessions():
+    sizes = []
+    for turns in (20, 100, 1000):
+        messages = await llm_history.build_budgeted_prompt("new question", make_history(turns, content_length=200))
+        sizes.append(llm_history.estimate_message_tokens(messages))
+        assert messages[0]["role"] == llm_config.HISTORY_SUMMARY_ROLE
+        assert messages[-1] == {"role": "user", "content": "new question"}
+    summary_tokens = llm_history.estimate_message_tokens([{"content": "summary 3"}])
+    assert max(sizes) <= llm_config.HISTORY_TOKEN_BUDGET - llm_config.HISTORY_SUMMARY_MAX_TOKENS + summary_tokens
+
+
+@pytest.mark.anyio
+async def test_summary_is_reused_until_a_chunk_fills(dummy_client):
+    chunk, keep_last = llm_config.HISTORY_SUMMARY_CHUNK_MESSAGES, llm_config.HISTORY_KEEP_LAST_MESSAGES
+    longer = make_history(keep_last + 2 * chunk)
+    history = longer[:keep_last + chunk]
+    await llm_history.build_budgeted_prompt("q", history)
+    await llm_history.build_budgeted_prompt("q", history + longer[len(history):][:chunk - 1])
+    assert len(dummy_client.responses.calls) == 1
+
+    await llm_history.build_budgeted_prompt("q", longer)
+    assert len(dummy_client.responses.calls) == 2
+    rolling_prompt = dummy_client.responses.calls[1]["input"][0]["content"]
+    assert rolling_prompt.startswith("Previous summary: summary 1")
+    assert history[0]["content"] not in rolling_prompt
+
+
+@pytest.mark.anyio
+async def test_long_sessions_summarize_once_per_chunk(dummy_client):
+    chunk, keep_last = llm_config.HISTORY_SUMMARY_CHUNK_MESSAGES, llm_config.HISTORY_KEEP_LAST_MESSAGES
+    history = []
+    calls_per_turn = []
+    for _ in range(4 * chunk):
+        before = len(dummy_client.responses.calls)
+        messages = await llm_history.build_budgeted_prompt("q", history)
+        calls_per_turn.append(len(dummy_client.responses.calls) - before)
+        assert messages[-1] == {"role": "user", "content": "q"}
+        history += make_history(2)
+
+    # One call each time another chunk of messages beyond the kept ones is complete, none in between
+    turns = len(calls_per_turn)
+    expected = [1 if 2 * turn > keep_last and (2 * turn - keep_last) % chunk == 0 else 0 for turn in range(turns)]
+    assert calls_per_turn == expected
+    assert sum(calls_per_turn) == (2 * (turns - 1) - keep_last) // chunk
+
+
+@pytest.mark.anyio
+async def test_summary_failure_keeps_recent_messages(dummy_client):
+    async def failing_create(**kwargs):
+        raise RuntimeError("upstream down")
+
+    dummy_client.responses.create = failing_create
+    chunk, keep_last = llm_config.HISTORY_SUMMARY_CHUNK_MESSAGES, llm_config.HISTORY_KEEP_LAST_MESSAGES
+    history = make_history(keep_last + chunk + 2)
+    messages = await llm_history.build_budgeted_prompt("q", history)
+    assert messages[:-1] == history[chunk:]
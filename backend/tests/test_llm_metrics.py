@@ -0,0 +1,72 @@
+import pytest
+from types import SimpleNamespace
+
+from app.services.llm import llm_metrics, llm_queries, llm_config
+from app.services.llm.llm_conversation_state import clear_conversation_state
+from app.services.cache import clear_all_caches
+
+
+def make_response(response_id, output=None, input_tokens=100, cached_tokens=0, output_tokens=10):
+    usage = SimpleNamespace(
+        input_tokens=input_tokens,
+        output_tokens=output_tokens,
+        input_tokens_details=SimpleNamespace(cached_tokens=cached_tokens),
+    )
+    return SimpleNamespace(id=response_id, output=output or [], output_text="answer", usage=usage)
+
+
+class DummyResponses:
+    def __init__(self, responses):
+        self.responses = list(responses)
+
+    async def create(self, **kwargs):
+        return self.responses.pop(0)
+
+
+class DummyClient:
+    def __init__(self, responses):
+        self.responses = DummyResponses(responses)
+
+
+@pytest.fixture(autouse=True)
+def reset_state(monkeypatch):
+    clear_all_caches()
+    clear_conversation_state()
+    llm_metrics.turn_stats.clear()
+    monkeypatch.setattr(llm_queries, "PREINJECT_CONTEXT_ROLES", frozenset())
+    yield
+    clear_all_caches()
+    clear_conversation_state()
+    llm_metrics.turn_stats.clear()
+
+
+@pytest.mark.anyio
+async def test_turn_accounts_tokens_phases_and_tools(monkeypatch):
+    tool_call = SimpleNamespace(type=llm_config.FUNCTION_CALL_TYPE, name=llm_config.TOOL_FETCH_TRAINING_STATUS, call_id="c1", arguments="{}")
+    dummy_client = DummyClient([
+        make_response("resp_1", output=[tool_call], input_tokens=120, cached_tokens=64),
+        make_response("resp_2", input_tokens=150, output_tokens=30),
+    ])
+    monkeypatch.setattr(llm_queries, "client", dummy_client)
+    monkeypatch.setattr("app.services.llm.llm_tool_handlers.fetch_employee_training_status", lambda emp_id, name: "FINISHED")
+
+    await llm_queries.regular_employee_query("status?", employee_id="1", employee_name="John")
+    await llm_queries.regular_employee_query("status?", employee_id="1", employee_name="John")
+
+    stats = llm_metrics.turn_stats.snapshot()[f"{llm_config.ROLE_EMPLOYEE}/regular_employee_query"]
+    assert stats["turns"] == 2
+    assert stats["cache_hit_rate"] == 0.5
+    assert stats["mean_input_tokens"] == (120 + 150) / 2
+    assert stats["mean_cached_tokens"] == 64 / 2
+    assert stats["mean_output_tokens"] == (10 + 30) / 2
+    assert stats["mean_tools_invoked"] == 0.5
+    assert stats["mean_llm_calls"] == 1.0
+    assert set(stats["mean_phase_ms"]) == {
+        llm_metrics.PHASE_INITIAL_REQUEST, llm_metrics.PHASE_TOOLS, llm_metrics.PHASE_FOLLOW_UP_REQUEST
+    }
+
+
+def test_records_are_ignored_outside_a_turn():
+    llm_metrics.record_llm_call(llm_metrics.PHASE_INITIAL_REQUEST, make_response("resp_1"), 5.0)
+    llm_metrics.record_cache_result(True)
+    assert llm_metrics.turn_stats.snapshot() == {}
@@ -78,3 +78,35 @@ async def test_execute_query_with_tools_triggers_follow_up(monkeypatch):
 
     assert result[llm_config.KEY_MESSAGE] == "final text"
     assert len(dummy_client.responses.calls) == 1
+
+
+@pytest.mark.anyio
+async def test_regular_employee_query_preinjects_context(monkeypatch):
+    dummy_client = DummyClient([make_response(output_text="You finished the training")])
+    monkeypatch.setattr(llm_queries, "client", dummy_client)
+    monkeypatch.setattr(llm_queries, "fetch_employee_data", lambda emp_id, name: {"training_status": "FINISHED"})
+
+    result = await llm_queries.regular_employee_query("did I finish?", employee_id="1", employee_name="John")
+
+    assert result[llm_config.KEY_MESSAGE] == "You finished the training"
+    assert len(dummy_client.responses.calls) == 1
+    sent = dummy_client.responses.calls[0]["input"]
+    assert sent[-1] == {"role": "user", "content": "did I finish?"}
+    assert sent[-2]["role"] == llm_config.PREINJECTED_CONTEXT_ROLE
+    assert "FINISHED" in sent[-2]["content"]
+
+
+@pytest.mark.anyio
+async def test_preinjection_can_be_disabled_per_role(monkeypatch):
+    dummy_client = DummyClient([make_response(output_text="answer")])
+    monkeypatch.setattr(llm_queries, "client", dummy_client)
+    monkeypatch.setattr(llm_queries, "PREINJECT_CONTEXT_ROLES", frozenset())
+
+    def fail_fetch(emp_id, name):
+        raise AssertionError("context should not be loaded")
+
+    monkeypatch.setattr(llm_queries, "fetch_employee_data", fail_fetch)
+
+    await llm_queries.regular_employee_query("did I finish?", employee_id="1", employee_name="John")
+
+    assert dummy_client.responses.calls[0]["input"] == [{"role": "user", "content": "did I finish?"}]
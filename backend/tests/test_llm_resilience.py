@@ -0,0 +1,193 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from openai import AsyncOpenAI
+
+from app.services.llm import llm_resilience, llm_queries, llm_config
+from app.services.cache import clear_all_caches
+
+
+def make_response_body(text):
+    return {
+        "id": f"resp_{time.monotonic_ns()}",
+        "object": "response",
+        "created_at": 0,
+        "model": llm_config.MODEL_NAME,
+        "status": "completed",
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "output": [{
+            "type": "message",
+            "id": "msg_1",
+            "role": "assistant",
+            "status": "completed",
+            "content": [{"type": "output_text", "text": text, "annotations": []}],
+        }],
+    }
+
+
+class StubResponsesServer:
+    """Local stand-in for the Responses API that plays a script of (status, delay_seconds) actions."""
+
+    def __init__(self):
+        self.script = []
+        self.requests = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                with stub.lock:
+                    stub.requests += 1
+                    status, delay = stub.script.pop(0) if stub.script else (200, 0)
+                time.sleep(delay)
+                body = make_response_body("ok") if status == 200 else {"error": {"message": "stub error", "type": "server_error"}}
+                payload = json.dumps(body).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}/v1"
+
+
+@pytest.fixture
+def stub_server():
+    server = StubResponsesServer()
+    server.thread.start()
+    yield server
+    server.server.shutdown()
+    server.server.server_close()
+
+
+@pytest.fixture
+def stub_client(stub_server):
+    return AsyncOpenAI(api_key="test-key", base_url=stub_server.base_url, max_retries=0)
+
+
+@pytest.fixture(autouse=True)
+def reset_state(monkeypatch):
+    clear_all_caches()
+    llm_resilience.reset_resilience_state()
+    monkeypatch.setattr(llm_resilience, "RETRY_BASE_DELAY_SECONDS", 0.01)
+    yield
+    clear_all_caches()
+    llm_resilience.reset_resilience_state()
+
+
+@pytest.mark.anyio
+async def test_transient_errors_are_retried(stub_server, stub_client):
+    stub_server.script = [(500, 0), (503, 0)]
+
+    response = await llm_resilience.resilient_create(stub_client, model=llm_config.MODEL_NAME, input="hi")
+
+    assert response.output_text == "ok"
+    assert stub_server.requests == 3
+
+
+@pytest.mark.anyio
+async def test_client_errors_are_not_retried(stub_server, stub_client):
+    stub_server.script = [(400, 0)]
+
+    with pytest.raises(Exception) as error:
+        await llm_resilience.resilient_create(stub_client, model=llm_config.MODEL_NAME, input="hi")
+
+    assert getattr(error.value, "status_code", None) == 400
+    assert stub_server.requests == 1
+    assert llm_resilience.circuit_breaker.state == "closed"
+
+
+@pytest.mark.anyio
+async def test_deadline_bounds_slow_upstream(stub_server, stub_client):
+    stub_server.script = [(200, 2.0), (200, 2.0), (200, 2.0)]
+
+    started = time.monotonic()
+    with llm_resilience.request_deadline(0.3):
+        with pytest.raises((llm_resilience.DeadlineExceededError, asyncio.TimeoutError)):
+            await llm_resilience.resilient_create(stub_client, model=llm_config.MODEL_NAME, input="hi")
+
+    assert time.monotonic() - started < 1.0
+
+
+@pytest.mark.anyio
+async def test_circuit_breaker_fails_fast_and_recovers(stub_server, stub_client, monkeypatch):
+    breaker = llm_resilience.CircuitBreaker(failure_threshold=2, reset_seconds=0.2)
+    monkeypatch.setattr(llm_resilience, "circuit_breaker", breaker)
+    monkeypatch.setattr(llm_resilience, "MAX_RETRIES", 0)
+    stub_server.script = [(500, 0), (500, 0)]
+
+    for _ in range(2):
+        with pytest.raises(Exception):
+            await llm_resilience.resilient_create(stub_client, model=llm_config.MODEL_NAME, input="hi")
+    assert breaker.state == "open"
+
+    with pytest.raises(llm_resilience.CircuitOpenError):
+        await llm_resilience.resilient_create(stub_client, model=llm_config.MODEL_NAME, input="hi")
+    assert stub_server.requests == 2
+
+    await asyncio.sleep(0.25)
+    response = await llm_resilience.resilient_create(stub_client, model=llm_config.MODEL_NAME, input="hi")
+    assert response.output_text == "ok"
+    assert breaker.state == "closed"
+
+
+@pytest.mark.anyio
+async def test_hedged_request_beats_slow_first_attempt(stub_server, stub_client, monkeypatch):
+    monkeypatch.setattr(llm_resilience, "HEDGE_ENABLED", True)
+    for _ in range(llm_config.HEDGE_MIN_SAMPLES):
+        llm_resilience.latency_tracker.record(0.05)
+    stub_server.script = [(200, 1.5), (200, 0)]
+
+    started = time.monotonic()
+    response = await llm_resilience.resilient_create(stub_client, model=llm_config.MODEL_NAME, input="hi")
+
+    assert response.output_text == "ok"
+    assert time.monotonic() - started < 1.0
+    assert stub_server.requests == 2
+    # The hedge was admitted by the scheduler like any other call, and both slots are back
+    assert llm_resilience.scheduler.counters["admitted"] == 2
+    assert llm_resilience.scheduler.in_flight == 0
+
+
+@pytest.mark.anyio
+async def test_no_hedge_without_a_free_scheduler_slot(stub_server, stub_client, monkeypatch):
+    monkeypatch.setattr(llm_resilience, "HEDGE_ENABLED", True)
+    for _ in range(llm_config.HEDGE_MIN_SAMPLES):
+        llm_resilience.latency_tracker.record(0.05)
+    llm_resilience.scheduler.concurrency_limit = 1
+    stub_server.script = [(200, 0.3)]
+
+    response = await llm_resilience.resilient_create(stub_client, model=llm_config.MODEL_NAME, input="hi")
+
+    assert response.output_text == "ok"
+    assert stub_server.requests == 1
+    assert llm_resilience.scheduler.in_flight == 0
+
+
+@pytest.mark.anyio
+async def test_open_circuit_returns_degraded_answer(stub_client, monkeypatch):
+    monkeypatch.setattr(llm_queries, "client", stub_client)
+    llm_resilience.circuit_breaker.opened_at = time.monotonic()
+
+    result = await llm_queries.execute_query_with_tools("hi", [], [], "instruction", 1, "1", "John")
+
+    assert result[llm_config.KEY_MESSAGE] == llm_config.DEGRADED_RESPONSE_MESSAGE
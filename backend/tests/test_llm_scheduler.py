@@ -0,0 +1,123 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+
+from app.services.llm import llm_scheduler, llm_resilience
+from app.services.llm.llm_config import PRIORITY_AUTHENTICATION, PRIORITY_CISO, PRIORITY_EMPLOYEE
+
+
+@pytest.fixture(autouse=True)
+def reset_state():
+    llm_resilience.reset_resilience_state()
+    yield
+    llm_resilience.reset_resilience_state()
+
+
+def make_scheduler(**kwargs):
+    kwargs.setdefault("queue_limits", {PRIORITY_AUTHENTICATION: 5, PRIORITY_CISO: 5, PRIORITY_EMPLOYEE: 5})
+    return llm_scheduler.LLMScheduler(**kwargs)
+
+
+@pytest.mark.anyio
+async def test_waiters_are_admitted_in_priority_order():
+    scheduler = make_scheduler(max_concurrency=1)
+    await scheduler.acquire(PRIORITY_EMPLOYEE, 10)
+    admitted = []
+
+    async def wait(priority):
+        await scheduler.acquire(priority, 10)
+        admitted.append(priority)
+        scheduler.release(10, 10)
+
+    tasks = [asyncio.create_task(wait(priority)) for priority in (PRIORITY_EMPLOYEE, PRIORITY_CISO, PRIORITY_AUTHENTICATION)]
+    await asyncio.sleep(0)
+    assert scheduler.stats()["queues"]["employee"]["depth"] == 1
+    scheduler.release(10, 10)
+    await asyncio.gather(*tasks)
+
+    assert admitted == [PRIORITY_AUTHENTICATION, PRIORITY_CISO, PRIORITY_EMPLOYEE]
+    assert scheduler.in_flight == 0
+
+
+@pytest.mark.anyio
+async def test_full_queue_rejects_without_waiting():
+    scheduler = make_scheduler(max_concurrency=1, queue_limits={PRIORITY_EMPLOYEE: 1})
+    await scheduler.acquire(PRIORITY_EMPLOYEE, 10)
+    queued = asyncio.create_task(scheduler.acquire(PRIORITY_EMPLOYEE, 10))
+    await asyncio.sleep(0)
+
+    with pytest.raises(llm_scheduler.SchedulerRejectedError):
+        await scheduler.acquire(PRIORITY_EMPLOYEE, 10)
+
+    assert scheduler.stats()["rejected"] == 1
+    queued.cancel()
+
+
+@pytest.mark.anyio
+async def test_token_budget_delays_admission():
+    scheduler = make_scheduler(tokens_per_minute=600)
+    await scheduler.acquire(PRIORITY_EMPLOYEE, 600)
+    scheduler.release(600, 600)
+
+    with pytest.raises(asyncio.TimeoutError):
+        await scheduler.acquire(PRIORITY_EMPLOYEE, 50, timeout=0.05)
+    await scheduler.acquire(PRIORITY_EMPLOYEE, 5, timeout=1)
+    assert scheduler.stats()["queues"]["employee"]["p95_wait_ms"] > 0
+
+
+@pytest.mark.anyio
+async def test_rate_limit_shrinks_concurrency_and_recovers():
+    scheduler = make_scheduler(max_concurrency=8, recovery_successes=2)
+    scheduler.record_rate_limited(retry_after=0.05)
+    assert scheduler.concurrency_limit == 4
+
+    with pytest.raises(asyncio.TimeoutError):
+        await scheduler.acquire(PRIORITY_EMPLOYEE, 10, timeout=0.01)
+    await scheduler.acquire(PRIORITY_EMPLOYEE, 10, timeout=1)
+
+    scheduler.record_success()
+    scheduler.record_success()
+    assert scheduler.concurrency_limit == 5
+
+
+@pytest.mark.anyio
+async def test_resilient_create_reports_429_to_scheduler(monkeypatch):
+    class RateLimited(Exception):
+        status_code = 429
+        response = SimpleNamespace(headers={"retry-after": "0"})
+
+    class Responses:
+        calls = 0
+
+        async def create(self, **kwargs):
+            self.calls += 1
+            if self.calls == 1:
+                raise RateLimited()
+            return SimpleNamespace(usage=SimpleNamespace(total_tokens=5))
+
+    monkeypatch.setattr(llm_resilience, "_retry_delay", lambda attempt: 0)
+    client = SimpleNamespace(responses=Responses())
+
+    await llm_resilience.resilient_create(client, model="m", input="hi")
+
+    stats = llm_scheduler.scheduler.stats()
+    assert stats["rate_limited"] == 1
+    assert stats["admitted"] == 2
+    assert stats["in_flight"] == 0
+    assert stats["concurrency_limit"] == stats["max_concurrency"] // 2
+
+
+@pytest.mark.anyio
+async def test_try_acquire_never_waits_or_overtakes():
+    scheduler = make_scheduler(max_concurrency=2, tokens_per_minute=600)
+
+    assert scheduler.try_acquire(500)
+    assert not scheduler.try_acquire(200)
+    assert scheduler.try_acquire(50)
+    assert not scheduler.try_acquire(10)
+
+    queued = asyncio.create_task(scheduler.acquire(PRIORITY_CISO, 10))
+    await asyncio.sleep(0)
+    scheduler.in_flight -= 1
+    assert not scheduler.try_acquire(10)
+    queued.cancel()
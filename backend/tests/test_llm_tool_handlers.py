@@ -0,0 +1,73 @@
+import asyncio
+import json
+import time
+import pytest
+from types import SimpleNamespace
+
+from app.services.llm import llm_tool_handlers, llm_config
+
+
+def make_call(name, call_id, arguments="{}"):
+    return SimpleNamespace(type=llm_config.FUNCTION_CALL_TYPE, name=name, call_id=call_id, arguments=arguments)
+
+
+def slow_handler(result, delay=0.2):
+    def handler(arguments, current_employee_id, current_employee_name):
+        time.sleep(delay)
+        return json.dumps({"result": result}), None, None
+    return handler
+
+
+@pytest.mark.anyio
+async def test_tool_calls_run_concurrently_and_keep_order(monkeypatch):
+    monkeypatch.setattr(llm_tool_handlers, "TOOL_HANDLERS", {
+        "summary": slow_handler("summary"),
+        "status_list": slow_handler("status_list"),
+        "employee": slow_handler("employee", delay=0.1),
+    })
+    calls = [make_call("summary", "c1"), make_call("status_list", "c2"), make_call("employee", "c3")]
+
+    started = time.perf_counter()
+    outputs, _, _ = await llm_tool_handlers.get_function_call_outputs(calls)
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.4
+    assert [output[llm_config.KEY_CALL_ID] for output in outputs] == ["c1", "c2", "c3"]
+    assert json.loads(outputs[1][llm_config.KEY_OUTPUT]) == {"result": "status_list"}
+
+
+@pytest.mark.anyio
+async def test_async_handlers_are_awaited(monkeypatch):
+    async def async_handler(arguments, current_employee_id, current_employee_name):
+        await asyncio.sleep(0)
+        return {"exists": True}, arguments["employee_id"], current_employee_name
+
+    monkeypatch.setattr(llm_tool_handlers, "TOOL_HANDLERS", {"check": async_handler})
+
+    outputs, employee_id, employee_name = await llm_tool_handlers.get_function_call_outputs(
+        [make_call("check", "c1", '{"employee_id": "7"}')], current_employee_name="Alice")
+
+    assert outputs[0][llm_config.KEY_OUTPUT] == {"exists": True}
+    assert (employee_id, employee_name) == ("7", "Alice")
+
+
+@pytest.mark.anyio
+async def test_failing_and_timed_out_tools_do_not_cancel_others(monkeypatch):
+    def failing_handler(arguments, current_employee_id, current_employee_name):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(llm_tool_handlers, "TOOL_HANDLERS", {
+        "fails": failing_handler,
+        "hangs": slow_handler("late", delay=0.5),
+        "works": slow_handler("ok", delay=0.05),
+    })
+    monkeypatch.setattr(llm_tool_handlers, "TOOL_CALL_TIMEOUTS", {"hangs": 0.1})
+    calls = [make_call("fails", "c1"), make_call("hangs", "c2"), make_call("works", "c3"), make_call("missing", "c4")]
+
+    outputs, _, _ = await llm_tool_handlers.get_function_call_outputs(calls)
+
+    payloads = [json.loads(output[llm_config.KEY_OUTPUT]) for output in outputs]
+    assert "db down" in payloads[0]["error"]
+    assert "timed out" in payloads[1]["error"]
+    assert payloads[2] == {"result": "ok"}
+    assert "Unknown tool" in payloads[3]["error"]
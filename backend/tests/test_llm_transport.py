@@ -0,0 +1,143 @@
+import json
+import time
+import pytest
+from openai.types.responses import Response
+
+from app.services.llm import llm_transport, llm_queries, llm_tool_handlers, llm_config
+from app.services.llm.llm_conversation_state import clear_conversation_state
+from app.services.cache import clear_all_caches
+
+
+def make_response(response_id, output):
+    return Response.model_validate({
+        "id": response_id,
+        "object": "response",
+        "created_at": 0,
+        "model": llm_config.MODEL_NAME,
+        "status": "completed",
+        "parallel_tool_calls": True,
+        "tool_choice": "auto",
+        "tools": [],
+        "output": output,
+    })
+
+
+FUNCTION_CALL = {
+    "type": "function_call",
+    "id": "fc_1",
+    "call_id": "call_1",
+    "name": llm_config.TOOL_FETCH_TRAINING_STATUS,
+    "arguments": "{}",
+    "status": "completed",
+}
+TEXT_MESSAGE = {
+    "type": "message",
+    "id": "msg_1",
+    "role": "assistant",
+    "status": "completed",
+    "content": [{"type": "output_text", "text": "You are in progress", "annotations": []}],
+}
+
+
+class LiveResponses:
+    def __init__(self):
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        if "previous_response_id" in kwargs:
+            return make_response("resp_2", [TEXT_MESSAGE])
+        return make_response("resp_1", [FUNCTION_CALL])
+
+
+class LiveClient:
+    def __init__(self):
+        self.responses = LiveResponses()
+
+
+@pytest.fixture(autouse=True)
+def reset_state(monkeypatch):
+    clear_all_caches()
+    clear_conversation_state()
+    monkeypatch.setattr(llm_tool_handlers, "fetch_employee_training_status", lambda emp_id, name: "IN_PROGRESS")
+    yield
+    clear_all_caches()
+    clear_conversation_state()
+
+
+async def run_turn():
+    return await llm_queries.execute_query_with_tools(
+        "what is my status?", [], [], "instruction", 1, employee_id="1", employee_name="John"
+    )
+
+
+@pytest.mark.anyio
+async def test_recorded_exchanges_replay_offline(tmp_path, monkeypatch):
+    cassette = str(tmp_path / "cassette.jsonl")
+    live_client = LiveClient()
+    monkeypatch.setattr(llm_queries, "client", llm_transport.RecordingClient(live_client, cassette))
+    recorded = await run_turn()
+
+    monkeypatch.setattr(llm_queries, "client", llm_transport.ReplayClient(cassette))
+    replayed = await run_turn()
+
+    assert recorded[llm_config.KEY_MESSAGE] == "You are in progress"
+    assert replayed == recorded
+    assert live_client.responses.calls == 2
+    assert len(llm_transport.load_cassette(cassette)) == 2
+
+
+@pytest.mark.anyio
+async def test_replay_raises_on_unrecorded_request(tmp_path):
+    client = llm_transport.ReplayClient(str(tmp_path / "empty.jsonl"))
+    with pytest.raises(llm_transport.CassetteMissError):
+        await client.responses.create(model=llm_config.MODEL_NAME, input="hi")
+
+
+@pytest.mark.anyio
+async def test_replay_applies_latency_model(tmp_path):
+    cassette = str(tmp_path / "cassette.jsonl")
+    await llm_transport.RecordingClient(LiveClient(), cassette).responses.create(model="m", input="hi")
+    client = llm_transport.ReplayClient(cassette, llm_transport.LatencyModel("fixed:0.1"))
+
+    started = time.perf_counter()
+    response = await client.responses.create(model="m", input="hi", timeout=5)
+
+    assert time.perf_counter() - started >= 0.1
+    assert response.id == "resp_1"
+
+
+def test_latency_model_is_seeded():
+    first_model = llm_transport.LatencyModel("lognormal:-1,0.5", seed=7)
+    second_model = llm_transport.LatencyModel("lognormal:-1,0.5", seed=7)
+    first = [first_model.sample(0) for _ in range(3)]
+    assert first == [second_model.sample(0) for _ in range(3)]
+    assert len(set(first)) == 3
+    assert llm_transport.LatencyModel("recorded").sample(0.25) == 0.25
+
+
+@pytest.mark.anyio
+async def test_stub_client_calls_a_tool_then_answers(monkeypatch):
+    monkeypatch.setattr(llm_queries, "client", llm_transport.StubClient())
+
+    result = await run_turn()
+
+    assert result[llm_config.KEY_MESSAGE] == llm_transport.STUB_ANSWER
+
+
+@pytest.mark.anyio
+async def test_stub_client_fills_tool_arguments_from_the_message():
+    client = llm_transport.StubClient()
+    tools = [{"type": "function", "name": llm_config.TOOL_FETCH_CISO_DATA}] + [
+        tool for tool in llm_queries.CISO_TOOLS if tool["name"] == llm_config.TOOL_GET_EMPLOYEES_BY_STATUS
+    ] + llm_queries.AUTHENTICATION_TOOLS
+
+    by_status = await client.responses.create(input=[{"role": "user", "content": "Who has not started yet?"}], tools=tools)
+    credentials = await client.responses.create(
+        input=[{"role": "user", "content": "Dana said hi. I am Bob, 120255628"}], tools=llm_queries.AUTHENTICATION_TOOLS
+    )
+
+    assert by_status.output[0].name == llm_config.TOOL_GET_EMPLOYEES_BY_STATUS
+    assert json.loads(by_status.output[0].arguments) == {"status": "NOT_STARTED"}
+    assert json.loads(credentials.output[0].arguments) == {"employee_id": "120255628", "employee_first_name": "Bob"}
+    assert by_status.usage.total_tokens > 0
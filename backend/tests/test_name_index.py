@@ -0,0 +1,105 @@
+import json
+import sqlite3
+
+import pytest
+
+from app.db import name_index
+from app.db.name_index import EmployeeNameIndex, resolve_employee_name, similarity, suggest_employees, trigrams
+from app.services.llm import llm_tool_handlers, llm_config
+
+CHARLIE = ("873239713", "Charlie")
+
+
+@pytest.fixture(autouse=True)
+def fresh_name_index(monkeypatch):
+    monkeypatch.setattr(name_index, "employee_name_index", EmployeeNameIndex())
+
+
+def test_trigram_similarity_tolerates_case_and_typos():
+    assert trigrams("Bob") == {"  b", " bo", "bob", "ob "}
+    assert similarity(trigrams("charlie"), trigrams("CHARLIE")) == 1.0
+    assert similarity(trigrams("Charly"), trigrams("Charlie")) >= name_index.AUTO_CORRECT_SIMILARITY
+    assert similarity(trigrams("Dana"), trigrams("Charlie")) == 0.0
+
+
+def test_apply_reindexes_only_changed_employees():
+    index = EmployeeNameIndex()
+    assert index.apply([("1", "Alice", "Levi"), ("2", "Alice", "Levi"), ("3", "Bob", "Cohen")]) == 3
+    assert index.apply([("1", "Alice", "Levi"), ("3", "Rob", "Cohen"), ("4", "Dana", None)]) == 3
+
+    assert len(index) == 3
+    assert [match.employee_id for match in index.search("alice levi")] == ["1"]
+    assert index.search("bob") == []
+    assert index.search("Robb")[0].employee_id == "3"
+
+
+def test_search_ranks_closest_names_first(db_copy):
+    matches = suggest_employees(None, "Charly")
+
+    assert matches[0].employee_name == "Charlie"
+    assert [match.score for match in matches] == sorted((match.score for match in matches), reverse=True)
+    assert suggest_employees(CHARLIE[0], "Bob")[0].employee_id == CHARLIE[0]
+
+
+def test_resolve_corrects_casing_and_typos_only_for_the_given_id(db_copy):
+    employee_id, name = CHARLIE
+    assert resolve_employee_name(employee_id, "charlie") == name
+    assert resolve_employee_name(employee_id, "Charly") == name
+    assert resolve_employee_name(employee_id, "Bob") is None
+    assert resolve_employee_name("000000000", "Charlie") is None
+
+
+def test_index_follows_database_changes(db_copy):
+    employee_id, _ = CHARLIE
+    assert resolve_employee_name(employee_id, "Charly") == "Charlie"
+
+    with sqlite3.connect(db_copy) as conn:
+        conn.execute("UPDATE employees SET EMPLOYEE_NAME = 'Dana' WHERE EMPLOYEE_ID = ?", (employee_id,))
+
+    assert resolve_employee_name(employee_id, "Charly") is None
+    assert resolve_employee_name(employee_id, "dana") == "Dana"
+
+
+def test_check_employee_exists_accepts_the_first_name_in_any_casing(db_copy):
+    employee_id, name = CHARLIE
+    arguments = {llm_config.KEY_EMPLOYEE_ID: employee_id, llm_config.KEY_EMPLOYEE_NAME: "cHARLIE"}
+
+    output, extracted_id, extracted_name = llm_tool_handlers._handle_check_employee_exists(arguments, None, None)
+
+    assert output == {llm_config.KEY_EXISTS: True, llm_config.KEY_EMPLOYEE_NAME: name}
+    assert (extracted_id, extracted_name) == (employee_id, name)
+
+    arguments[llm_config.KEY_EMPLOYEE_NAME] = "Bob"
+    output, _, _ = llm_tool_handlers._handle_check_employee_exists(arguments, None, None)
+    assert output == {llm_config.KEY_EXISTS: False}
+
+
+@pytest.mark.parametrize("employee_id, employee_name", [
+    ("873239713", "Charly"),
+    ("873239713", "Levi"),
+    ("873239713", "Charlotte"),
+    ("120255628", "Tzadok"),
+    ("120255628", "Bobby"),
+    ("204183328", "Hartman"),
+    ("928111132", "Will"),
+])
+def test_check_employee_exists_rejects_misspelled_last_and_look_alike_names(db_copy, employee_id, employee_name):
+    arguments = {llm_config.KEY_EMPLOYEE_ID: employee_id, llm_config.KEY_EMPLOYEE_NAME: employee_name}
+
+    output, _, _ = llm_tool_handlers._handle_check_employee_exists(arguments, None, None)
+
+    # No hint at the stored name either: login must not reveal who is behind a guessed ID
+    assert output == {llm_config.KEY_EXISTS: False}
+
+
+def test_fetch_different_employee_corrects_or_suggests(db_copy):
+    employee_id, name = CHARLIE
+    arguments = {llm_config.KEY_EMPLOYEE_ID: employee_id, llm_config.KEY_EMPLOYEE_NAME: "CHARLY"}
+
+    output, _, _ = llm_tool_handlers._handle_fetch_different_employee(arguments, None, None)
+    assert name in output and "did_you_mean" not in output
+
+    arguments = {llm_config.KEY_EMPLOYEE_ID: "000000000", llm_config.KEY_EMPLOYEE_NAME: "Charly"}
+    output = json.loads(llm_tool_handlers._handle_fetch_different_employee(arguments, None, None)[0])
+    assert output["error"] == "Employee data not found"
+    assert output["did_you_mean"][0]["employee_name"] == name
@@ -1,24 +1,18 @@
 from app.db import regular_employee
-from app.db.common import STATUS_FINISHED
+from app.db.common import STATUS_FINISHED, STATUS_NOT_STARTED
 
 
 def test_fetch_employee_data_returns_structured_payload(monkeypatch):
-    sample_result = (
-        "2024-01-01 00:00:00", "2024-01-02 00:00:00",
-        "2024-01-03 00:00:00", "2024-01-04 00:00:00",
-        "2024-01-05 00:00:00", "2024-01-06 00:00:00",
-        "2024-01-07 00:00:00", "2024-01-08 00:00:00",
-        "Engineering", "Doe"
-    )
+    sample_rows = [
+        ("first", "2024-01-01 00:00:00", "2024-01-02 00:00:00", "Engineering", "Doe", STATUS_FINISHED),
+        ("second", "2024-01-03 00:00:00", "2024-01-04 00:00:00", "Engineering", "Doe", STATUS_FINISHED),
+        ("fifth", None, None, "Engineering", "Doe", STATUS_FINISHED),
+    ]
 
     def fake_execute(query, params=None, fetch_one=False):
-        return sample_result
-
-    def fake_fetch_status(emp_id, emp_name):
-        return STATUS_FINISHED
+        return sample_rows
 
     monkeypatch.setattr(regular_employee, "_execute_query", fake_execute)
-    monkeypatch.setattr(regular_employee, "fetch_employee_training_status", fake_fetch_status)
 
     data = regular_employee.fetch_employee_data("1", "John")
 
@@ -30,29 +24,27 @@ def test_fetch_employee_data_returns_structured_payload(monkeypatch):
     }
     assert data["training_status"] == STATUS_FINISHED
     assert data["time_to_finish_first_video"] == 1.0
+    assert data["started_fifth_video_time"] is None and data["time_to_finish_fifth_video"] == 0.0
+
+
+def test_fetch_employee_data_returns_none_for_unknown_employee(monkeypatch):
+    monkeypatch.setattr(regular_employee, "_execute_query", lambda q, p=None, fetch_one=False: [])
+    assert regular_employee.fetch_employee_data("1", "John") is None
 
 
 def test_fetch_employee_training_status(monkeypatch):
-    finish_dates = (
-        "2024-01-02 00:00:00",
-        "2024-01-04 00:00:00",
-        "2024-01-06 00:00:00",
-        "2024-01-08 00:00:00",
-    )
-
-    monkeypatch.setattr(regular_employee, "_execute_query", lambda q, p=None, fetch_one=False: finish_dates)
+    monkeypatch.setattr(regular_employee, "_execute_query", lambda q, p=None, fetch_one=False: (STATUS_FINISHED,))
     status = regular_employee.fetch_employee_training_status("1", "John")
     assert status == STATUS_FINISHED
 
+    # An employee without any recorded event has no state row
+    monkeypatch.setattr(regular_employee, "_execute_query", lambda q, p=None, fetch_one=False: (None,))
+    assert regular_employee.fetch_employee_training_status("1", "John") == STATUS_NOT_STARTED
+
 
 def test_calculate_employee_time_to_finish_training(monkeypatch):
-    employee_tuple = (
-        "1", "John", "Doe", "Engineering",
-        "2024-01-01 00:00:00", "2024-01-02 00:00:00",
-        "2024-01-03 00:00:00", "2024-01-05 00:00:00",
-        "2024-01-06 00:00:00", "2024-01-07 00:00:00",
-        "2024-01-08 00:00:00", "2024-01-09 00:00:00",
-    )
+    # Status query row: first start and last finish follow the personal columns
+    employee_tuple = ("1", "John", "Doe", "Engineering", "2024-01-01 00:00:00", "2024-01-09 00:00:00")
 
     total_days = regular_employee.calculate_employee_time_to_finish_training(employee_tuple)
     assert total_days == 8.0
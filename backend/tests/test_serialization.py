@@ -0,0 +1,42 @@
+import json
+import pytest
+
+from app.services import serialization
+
+
+@pytest.fixture(params=[serialization.SERIALIZER_ORJSON, serialization.SERIALIZER_STDLIB])
+def serializer(request, monkeypatch):
+    if request.param == serialization.SERIALIZER_ORJSON and serialization.orjson is None:
+        pytest.skip("orjson is not installed")
+    monkeypatch.setattr(serialization, "SERIALIZER", request.param)
+    return request.param
+
+
+def test_backends_produce_the_same_compact_json(serializer):
+    data = {"b": [1, 2.5, None], "a": {"name": "Łukasz", "ok": True}}
+
+    assert serialization.dumps(data, sort_keys=True) == '{"a":{"name":"Łukasz","ok":true},"b":[1,2.5,null]}'
+    assert serialization.loads(serialization.dumps_bytes(data)) == data
+
+
+def test_unknown_types_fall_back_to_str(serializer):
+    class Item:
+        def __str__(self):
+            return "item"
+
+    assert json.loads(serialization.dumps({"value": Item()})) == {"value": "item"}
+
+
+def test_structural_key_ignores_key_order_and_keeps_types_apart():
+    key = serialization.structural_key
+    assert key({"a": 1, "b": [1, {"c": 2}]}) == key({"b": [1, {"c": 2}], "a": 1})
+    assert key({"a": [1]}) != key({"a": [True]})
+    assert key([None]) != key(["None"])
+    assert key([1, 2]) != key({"1": 2})
+    hash(key({"a": {"b": [1, {2, 3}]}}))
+
+
+def test_fast_json_response_renders_compact_json():
+    response = serialization.FastJSONResponse({"message": "hi"})
+    assert json.loads(response.body) == {"message": "hi"}
+    assert response.headers["content-type"] == "application/json"
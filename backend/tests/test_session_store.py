@@ -0,0 +1,133 @@
+import os
+import stat
+import threading
+import time
+
+import pytest
+
+from app.api import endpoints
+from app.schemas.api_schemas import ChatRequest
+from app.services.session.session_store import SessionStore, SESSION_LOG_MAX_MESSAGES, session_id_for
+from app.services.llm.llm_config import ROLE_CISO, ROLE_EMPLOYEE
+
+
+def test_sessions_get_opaque_tokens_and_bounded_logs():
+    store = SessionStore()
+    session = store.create("873239713", "Charlie", ROLE_EMPLOYEE)
+    other = store.create("873239713", "Charlie", ROLE_EMPLOYEE)
+
+    assert session.token != other.token
+    assert "873239713" not in session.token and "873239713" not in other.token
+    turns = SESSION_LOG_MAX_MESSAGES // 2 + 1
+    for turn in range(turns):
+        session.record_turn(f"question {turn}", f"answer {turn}")
+    assert store.get(session.token).history()[0] == {"role": "user", "content": "question 1"}
+    assert len(session.history()) == SESSION_LOG_MAX_MESSAGES
+    assert session.turns == turns
+    assert store.get("unknown") is None
+
+
+def test_evicted_sessions_spill_to_disk_and_come_back(tmp_path):
+    store = SessionStore(maxsize=1, spill_dir=str(tmp_path))
+    first = store.create("1", "John", ROLE_EMPLOYEE)
+    first.record_turn("hi", "hello")
+    store.create("2", "Jane", ROLE_CISO)
+
+    assert first.token not in store.sessions
+    assert len(list(tmp_path.iterdir())) == 1
+    restored = store.get(first.token)
+    assert (restored.employee_id, restored.role, restored.history()[1]["content"]) == ("1", ROLE_EMPLOYEE, "hello")
+    assert restored.turns == 1
+
+
+def test_spilled_sessions_hold_no_token_and_are_private(tmp_path):
+    store = SessionStore(maxsize=1, spill_dir=str(tmp_path / "spill"))
+    first = store.create("1", "John", ROLE_EMPLOYEE)
+    store.create("2", "Jane", ROLE_CISO)
+
+    (spilled,) = (tmp_path / "spill").iterdir()
+    assert first.token not in spilled.name
+    assert first.token not in spilled.read_text()
+    assert stat.S_IMODE(spilled.stat().st_mode) == 0o600
+    assert store.get(first.token).token == first.token
+
+
+def test_sessions_can_be_used_from_several_threads(tmp_path):
+    store = SessionStore(maxsize=8, spill_dir=str(tmp_path))
+    errors = []
+
+    def churn(worker):
+        try:
+            for i in range(200):
+                session = store.create(f"{worker}{i}", "John", ROLE_EMPLOYEE)
+                store.touch(session)
+                store.get(session.token)
+                if i % 3 == 0:
+                    store.close(session.token)
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+
+    threads = [threading.Thread(target=churn, args=(worker,)) for worker in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(store.sessions) <= 8
+
+
+def test_expired_spilled_sessions_are_ignored(tmp_path):
+    store = SessionStore(maxsize=1, spill_dir=str(tmp_path), idle_ttl=60)
+    first = store.create("1", "John", ROLE_EMPLOYEE)
+    first.last_seen -= 120
+    store.create("2", "Jane", ROLE_EMPLOYEE)
+
+    assert store.get(first.token) is None
+
+
+@pytest.mark.anyio
+async def test_session_turns_skip_identity_checks_and_history(monkeypatch):
+    monkeypatch.setattr(endpoints, "session_store", SessionStore())
+    monkeypatch.setattr(endpoints, "is_ciso", lambda emp_id, name: False)
+
+    async def fake_authenticate(message, history=None):
+        return {"message": "Hi John", "employee_id": "1", "employee_first_name": "John"}
+
+    histories, session_ids = [], []
+
+    async def fake_query(message, history=None, employee_id=None, employee_name=None, session_id=None, turn=None):
+        histories.append(history)
+        session_ids.append(session_id)
+        return {"message": f"answer to {message}"}
+
+    def fail_identity_check(*args):
+        raise AssertionError("identity must come from the session")
+
+    monkeypatch.setattr(endpoints, "authenticate_employee", fake_authenticate)
+    monkeypatch.setattr(endpoints, "regular_employee_query", fake_query)
+
+    login = await endpoints.chat(ChatRequest(message="I am John 1", history=[]))
+    monkeypatch.setattr(endpoints, "employee_exists_in_database", fail_identity_check)
+    monkeypatch.setattr(endpoints, "is_ciso", fail_identity_check)
+    first = await endpoints.chat(ChatRequest(message="status?", session_token=login.session_token))
+    second = await endpoints.chat(ChatRequest(message="videos?", session_token=login.session_token))
+
+    assert login.session_token and first.session_token == login.session_token
+    assert (second.message, second.employee_id) == ("answer to videos?", "1")
+    assert histories == [[], [{"role": "user", "content": "status?"}, {"role": "assistant", "content": "answer to status?"}]]
+    # Conversation state is keyed, and logged, by an ID that does not give the bearer token away
+    assert session_ids[0] == session_ids[1] == session_id_for(login.session_token)
+    assert login.session_token not in session_ids[0]
+
+
+def test_expired_spill_files_are_swept(tmp_path):
+    store = SessionStore(maxsize=1, spill_dir=str(tmp_path), idle_ttl=60)
+    stale = tmp_path / ("0" * 64 + ".json")
+    stale.write_text("{}")
+    os.utime(stale, (time.time() - 120, time.time() - 120))
+
+    first = store.create("1", "John", ROLE_EMPLOYEE)
+    store.create("2", "Jane", ROLE_EMPLOYEE)
+
+    assert [path.name for path in tmp_path.iterdir()] == [session_id_for(first.token) + ".json"]
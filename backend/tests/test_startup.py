@@ -0,0 +1,15 @@
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def test_importing_the_app_does_not_load_the_openai_sdk_or_build_the_client():
+    probe = (
+        "import sys, app.main; from app.services.llm import llm_client_setup; "
+        "print('openai' in sys.modules, llm_client_setup._client is None)"
+    )
+    output = subprocess.run([sys.executable, "-c", probe], cwd=BACKEND_DIR, capture_output=True, text=True, check=True).stdout
+
+    assert output.split() == ["False", "True"]
@@ -0,0 +1,51 @@
+import sqlite3
+
+from app.db import common
+from app.db.ciso import get_statistic_summary
+from app.db.regular_employee import fetch_employee_training_status
+from benchmarks import bench_db
+from benchmarks.synthetic_db import CISO_ID, CISO_NAME, STATUS_WEIGHTS, create_synthetic_db
+
+
+def _schema(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT sql FROM sqlite_master WHERE name = 'employees'").fetchone()[0]
+
+
+def test_synthetic_db_is_schema_identical_and_seeded(tmp_path):
+    first = create_synthetic_db(tmp_path / "a.db", 500, seed=3)
+    second = create_synthetic_db(tmp_path / "b.db", 500, seed=3)
+
+    assert _schema(first) == _schema(common.DB_PATH)
+    with sqlite3.connect(first) as a, sqlite3.connect(second) as b:
+        rows = a.execute("SELECT * FROM employees ORDER BY EMPLOYEE_ID").fetchall()
+        assert rows == b.execute("SELECT * FROM employees ORDER BY EMPLOYEE_ID").fetchall()
+    assert len(rows) == 500
+
+
+def test_db_layer_reads_synthetic_statuses(tmp_path):
+    path = create_synthetic_db(tmp_path / "org.db", 2000)
+
+    with bench_db.uncached_database(path):
+        summary = get_statistic_summary()
+        assert fetch_employee_training_status(CISO_ID, CISO_NAME) == common.STATUS_FINISHED
+
+    counts = {
+        common.STATUS_FINISHED: summary["amount_of_finished_employees"],
+        common.STATUS_IN_PROGRESS: summary["amount_of_in_progress_employees"],
+        common.STATUS_NOT_STARTED: summary["amount_of_not_started_employees"],
+    }
+    assert sum(counts.values()) == 2000
+    for status, weight in STATUS_WEIGHTS.items():
+        assert abs(counts[status] / 2000 - weight) < 0.05
+    assert summary["minimum_time_to_finish_training"] < summary["average_time_to_finish_training"] < summary["maximum_time_to_finish_training"]
+
+
+def test_compare_reports_only_regressions_beyond_tolerance():
+    baseline = {"1000": {"summary": {"p50_ms": 10.0, "throughput_per_s": 100.0, "peak_mib": 2.0}}}
+    results = {"1000": {"summary": {"p50_ms": 11.0, "throughput_per_s": 60.0, "peak_mib": 1.0}, "new": {"p50_ms": 1.0}}}
+
+    regressions = bench_db.compare(results, baseline, tolerance=0.25)
+
+    assert len(regressions) == 1
+    assert "throughput_per_s" in regressions[0]
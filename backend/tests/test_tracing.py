@@ -0,0 +1,122 @@
+import asyncio
+import json
+import pytest
+
+from app.api import analytics, endpoints
+from app.schemas.api_schemas import ChatRequest
+from app.services import tracing
+from app.services.cache import clear_all_caches
+from app.services.llm.llm_config import ROLE_CISO, ROLE_EMPLOYEE
+from app.services.session.session_store import SessionStore
+from test_analytics_api import asgi_get, bearer
+
+
+@pytest.fixture(autouse=True)
+def fresh_exporter():
+    tracing.trace_exporter.clear()
+    clear_all_caches()
+    yield
+    tracing.trace_exporter.clear()
+    clear_all_caches()
+
+
+def test_span_outside_a_trace_is_a_noop():
+    with tracing.span("orphan") as orphan:
+        orphan.set(ignored=True)
+    assert tracing.current_trace_id() is None
+    assert tracing.trace_exporter.recent() == []
+
+
+@pytest.mark.anyio
+async def test_spans_nest_across_tasks_and_threads():
+    async def child(name, delay):
+        with tracing.span(name):
+            await asyncio.sleep(delay)
+
+    def blocking():
+        with tracing.span("thread"):
+            pass
+
+    with tracing.start_trace("root", sample_rate=1.0) as root:
+        await asyncio.gather(child("fast", 0.01), child("slow", 0.05))
+        await asyncio.to_thread(blocking)
+
+    trace = tracing.trace_exporter.get(root.trace_id)
+    by_name = {item.name: item for item in trace.spans}
+    assert {by_name[name].parent_id for name in ("fast", "slow", "thread")} == {root.span_id}
+    names = [item.name for item in tracing.critical_path(trace)]
+    assert names[0] == "root"
+    assert "slow" in names and "fast" not in names
+
+
+def test_unsampled_trace_is_not_exported():
+    with tracing.start_trace("root", sample_rate=0.0) as root:
+        with tracing.span("child"):
+            pass
+    assert root is None
+    assert tracing.trace_exporter.recent() == []
+
+
+def test_finished_traces_are_appended_to_jsonl(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    exporter = tracing.TraceExporter(buffer_size=2, jsonl_path=str(path))
+    trace = tracing.Trace(trace_id="t1")
+    trace.spans.append(tracing.Span(trace_id="t1", span_id="s1", parent_id=None, name="root", start=0.0, duration_ms=5))
+
+    exporter.export(trace)
+
+    record = json.loads(path.read_text())
+    assert record["trace_id"] == "t1"
+    assert record["spans"][0]["critical"] is True
+
+
+@pytest.mark.anyio
+async def test_chat_request_records_identity_and_db_spans(monkeypatch):
+    async def authenticate(message, history):
+        return {"message": "Please give your ID and name.", "employee_id": None, "employee_first_name": None}
+
+    # Unknown employees go to authentication, stubbed so no LLM call is made
+    monkeypatch.setattr(endpoints, "authenticate_employee", authenticate)
+    with tracing.start_trace("POST /chat", sample_rate=1.0) as root:
+        await endpoints._chat(ChatRequest(message="hi", history=[], employee_id="000", employee_name="Nobody"))
+
+    spans = tracing.trace_exporter.get(root.trace_id).spans
+    names = {item.span_id: item.name for item in spans}
+    verify = next(item for item in spans if item.name == "verify_identity")
+    assert verify.parent_id == root.span_id
+    db_queries = [item for item in spans if item.name == "db.query"]
+    assert db_queries and all(names[item.parent_id] in ("verify_identity", "cache_analytics") for item in db_queries)
+
+
+@pytest.mark.anyio
+async def test_middleware_sets_trace_header_and_debug_endpoints_serve_it(monkeypatch):
+    monkeypatch.setattr(tracing, "TRACE_SAMPLE_RATE", 1.0)
+    sessions = SessionStore()
+    monkeypatch.setattr(analytics, "session_store", sessions)
+    ciso = bearer(sessions.create("123456789", "CISO", ROLE_CISO))
+    status, headers, _ = await asgi_get("/health")
+    assert status == 200
+    trace_id = headers[tracing.TRACE_ID_HEADER]
+
+    status, _, body = await asgi_get("/debug/traces", ciso)
+    summaries = json.loads(body)["traces"]
+    assert [summary["trace_id"] for summary in summaries] == [trace_id]
+    assert summaries[0]["name"] == "GET /health"
+    assert summaries[0]["status"] == 200
+
+    status, _, body = await asgi_get(f"/debug/traces/{trace_id}", ciso)
+    assert status == 200
+    assert json.loads(body)["spans"][0]["critical"] is True
+    status, _, _ = await asgi_get("/debug/traces/missing", ciso)
+    assert status == 404
+
+
+@pytest.mark.anyio
+async def test_debug_endpoints_require_a_ciso_session(monkeypatch):
+    sessions = SessionStore()
+    monkeypatch.setattr(analytics, "session_store", sessions)
+    employee = sessions.create("873239713", "Charlie", ROLE_EMPLOYEE)
+
+    assert (await asgi_get("/debug/traces"))[0] == 401
+    assert (await asgi_get("/debug/traces", bearer(employee)))[0] == 403
+    assert (await asgi_get("/debug/traces/any", bearer(employee)))[0] == 403
@@ -0,0 +1,116 @@
+import sqlite3
+
+import pytest
+
+from app.db import common
+from app.db.ciso import fetch_all_employees_with_this_training_status, get_statistic_summary
+from app.db.regular_employee import fetch_employee_data, fetch_employee_training_status
+from app.db.training_events import TrainingEvent, ingest_events, rebuild_training_state, register_video
+
+BOB = ("120255628", "Bob")
+CHARLIE = ("873239713", "Charlie")
+
+
+pytestmark = pytest.mark.usefixtures("db_copy")
+
+
+def _state(path, employee_id):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(
+            "SELECT VIDEOS_STARTED, VIDEOS_FINISHED, FIRST_START, LAST_FINISH, STATUS FROM employee_training_state WHERE EMPLOYEE_ID = ?",
+            (employee_id,)
+        ).fetchone()
+
+
+def _legacy_status(path, employee_id):
+    with sqlite3.connect(path) as conn:
+        row = conn.execute(f"SELECT {', '.join(common.VIDEO_FINISH_COLUMNS)} FROM employees WHERE EMPLOYEE_ID = ?", (employee_id,)).fetchone()
+    finished = sum(value is not None for value in row)
+    return common.STATUS_NOT_STARTED if finished == 0 else common.STATUS_FINISHED if finished == common.NUM_VIDEOS else common.STATUS_IN_PROGRESS
+
+
+def test_backfill_matches_the_legacy_video_columns(db_copy):
+    with sqlite3.connect(db_copy) as conn:
+        employees = conn.execute("SELECT EMPLOYEE_ID, EMPLOYEE_NAME FROM employees").fetchall()
+
+    for employee_id, name in employees:
+        assert fetch_employee_training_status(employee_id, name) == _legacy_status(db_copy, employee_id)
+    assert fetch_employee_data(*BOB)["training_status"] == common.STATUS_FINISHED
+
+
+def test_events_move_an_employee_through_the_statuses(db_copy):
+    employee_id, name = CHARLIE
+    with sqlite3.connect(db_copy) as conn:
+        missing = [video_id for (video_id,) in conn.execute(
+            "SELECT VIDEO_ID FROM training_videos WHERE VIDEO_ID NOT IN "
+            "(SELECT VIDEO_ID FROM employee_video_state WHERE EMPLOYEE_ID = ? AND FINISHED_AT IS NOT NULL)", (employee_id,)
+        )]
+    assert fetch_employee_training_status(employee_id, name) == common.STATUS_IN_PROGRESS
+    in_progress_before = len(fetch_all_employees_with_this_training_status(common.STATUS_IN_PROGRESS))
+
+    ingest_events(
+        [TrainingEvent(employee_id, video_id, "started", "2026-01-01 09:00:00") for video_id in missing]
+        + [TrainingEvent(employee_id, video_id, "finished", "2026-01-02 09:00:00") for video_id in missing]
+    )
+
+    assert fetch_employee_training_status(employee_id, name) == common.STATUS_FINISHED
+    videos_finished, _, last_finish, status = _state(db_copy, employee_id)[1:]
+    assert (videos_finished, last_finish, status) == (common.NUM_VIDEOS, "2026-01-02 09:00:00", common.STATUS_FINISHED)
+    assert len(fetch_all_employees_with_this_training_status(common.STATUS_IN_PROGRESS)) == in_progress_before - 1
+    assert get_statistic_summary()["amount_of_in_progress_employees"] == in_progress_before - 1
+
+
+def test_out_of_order_and_duplicate_events_keep_the_earliest_times(db_copy):
+    with sqlite3.connect(db_copy) as conn:
+        conn.execute("INSERT INTO employees (EMPLOYEE_ID, EMPLOYEE_NAME, EMPLOYEE_LAST_NAME, EMPLOYEE_DIVISION) VALUES ('555000001', 'Dana', 'Levi', 'Data')")
+    assert fetch_employee_training_status("555000001", "Dana") == common.STATUS_NOT_STARTED
+
+    # A finish can arrive before its start, and replays carry later timestamps
+    ingest_events([
+        TrainingEvent("555000001", 1, "finished", "2026-01-03 10:00:00"),
+        TrainingEvent("555000001", 1, "started", "2026-01-03 08:00:00"),
+    ])
+    ingest_events([
+        TrainingEvent("555000001", 1, "started", "2026-01-05 08:00:00"),
+        TrainingEvent("555000001", 1, "finished", "2026-01-05 10:00:00"),
+    ])
+
+    data = fetch_employee_data("555000001", "Dana")
+    assert data["started_first_video_time"] == "2026-01-03 08:00:00"
+    assert data["finished_first_video_time"] == "2026-01-03 10:00:00"
+    assert data["started_second_video_time"] is None
+    assert data["training_status"] == common.STATUS_IN_PROGRESS
+    assert _state(db_copy, "555000001") == (1, 1, "2026-01-03 08:00:00", "2026-01-03 10:00:00", common.STATUS_IN_PROGRESS)
+
+
+def test_registering_a_video_reopens_finished_training(db_copy):
+    employee_id, name = BOB
+    video_id = register_video("fifth")
+
+    assert fetch_employee_training_status(employee_id, name) == common.STATUS_IN_PROGRESS
+    assert fetch_employee_data(employee_id, name)["started_fifth_video_time"] is None
+
+    ingest_events([TrainingEvent(employee_id, video_id, "finished", "2026-02-01 12:00:00")])
+    assert fetch_employee_training_status(employee_id, name) == common.STATUS_FINISHED
+    assert _state(db_copy, employee_id)[3] == "2026-02-01 12:00:00"
+
+
+def test_unknown_videos_reject_the_whole_batch(db_copy):
+    employee_id, _ = CHARLIE
+    before = _state(db_copy, employee_id)
+
+    with pytest.raises(ValueError):
+        ingest_events([TrainingEvent(employee_id, 1, "finished", "2026-01-01 00:00:00"), TrainingEvent(employee_id, 99, "started", "2026-01-01 00:00:00")])
+
+    assert _state(db_copy, employee_id) == before
+
+
+def test_rebuild_from_the_log_reproduces_the_incremental_state(db_copy):
+    ingest_events([TrainingEvent(CHARLIE[0], video_id, "finished", f"2026-01-0{video_id} 00:00:00") for video_id in (1, 2, 3, 4)], batch_size=3)
+    with sqlite3.connect(db_copy) as conn:
+        incremental = conn.execute("SELECT * FROM employee_training_state ORDER BY EMPLOYEE_ID").fetchall()
+
+    rebuild_training_state()
+
+    with sqlite3.connect(db_copy) as conn:
+        assert conn.execute("SELECT * FROM employee_training_state ORDER BY EMPLOYEE_ID").fetchall() == incremental
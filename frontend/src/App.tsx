@@ -22,7 +22,8 @@ function App() {
     messages: Message[],
     history: Array<{ role: string; content: string }>,
     employeeId?: string | null,
-    employeeName?: string | null
+    employeeName?: string | null,
+    sessionToken?: string | null
   ) => {
     updateCurrentSession((session) => {
       // If it's the first user message, update the title
@@ -42,6 +43,7 @@ function App() {
         title,
         employeeId: employeeId ?? session.employeeId,
         employeeName: employeeName ?? session.employeeName,
+        sessionToken: sessionToken === undefined ? session.sessionToken : sessionToken,
       };
     });
   };
@@ -61,10 +63,12 @@ function App() {
         <div className={`main-content ${isSidebarOpen ? 'sidebar-open' : ''}`}>
           <Chat
             key={currentSessionId} // Remount chat on session change to reset transient state
+            sessionId={currentSessionId}
             messages={currentSession?.messages || []}
             history={currentSession?.history || []}
             employeeId={currentSession?.employeeId}
             employeeName={currentSession?.employeeName}
+            sessionToken={currentSession?.sessionToken}
             onUpdateSession={handleUpdateSession}
             onToggleSidebar={() => setIsSidebarOpen(!isSidebarOpen)}
           />
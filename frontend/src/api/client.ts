@@ -3,15 +3,18 @@ const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || (import.meta.env.PROD
 
 export interface ChatRequest {
   message: string;
-  history: Array<{ role: string; content: string }>;
+  history?: Array<{ role: string; content: string }>;
   employee_id: string | null;
   employee_name: string | null;
+  session_id: string | null;
+  session_token?: string | null;
 }
 
 export interface ChatResponse {
   message: string;
   employee_id: string | null;
   employee_name: string | null;
+  session_token?: string | null;
 }
 
 class ApiClient {
@@ -41,16 +44,18 @@ class ApiClient {
     message: string,
     history: Array<{ role: string; content: string }>,
     employeeId: string | null,
-    employeeName: string | null
+    employeeName: string | null,
+    sessionId: string | null = null,
+    sessionToken: string | null = null
   ): Promise<ChatResponse> {
+    // With a server-side session the server already has the conversation; the identity is only
+    // used to re-verify the employee if the session has expired
+    const body: ChatRequest = sessionToken
+      ? { message, employee_id: employeeId, employee_name: employeeName, session_id: sessionId, session_token: sessionToken }
+      : { message, history, employee_id: employeeId, employee_name: employeeName, session_id: sessionId };
     return this.request<ChatResponse>('/chat', {
       method: 'POST',
-      body: JSON.stringify({
-        message,
-        history,
-        employee_id: employeeId,
-        employee_name: employeeName,
-      }),
+      body: JSON.stringify(body),
     });
   }
 }
@@ -11,24 +11,29 @@ export interface Message extends Omit<ChatMessageProps, 'timestamp'> {
 }
 
 interface ChatProps {
+  sessionId?: string | null;
   messages: Message[];
   history: Array<{ role: string; content: string }>;
   employeeId?: string | null;
   employeeName?: string | null;
+  sessionToken?: string | null;
   onUpdateSession: (
     messages: Message[],
     history: Array<{ role: string; content: string }>,
     employeeId?: string | null,
-    employeeName?: string | null
+    employeeName?: string | null,
+    sessionToken?: string | null
   ) => void;
   onToggleSidebar: () => void;
 }
 
 export const Chat: React.FC<ChatProps> = ({
+  sessionId,
   messages,
   history,
   employeeId,
   employeeName,
+  sessionToken,
   onUpdateSession,
   onToggleSidebar
 }) => {
@@ -105,7 +110,9 @@ export const Chat: React.FC<ChatProps> = ({
         messageText,
         newHistory,
         employeeId ?? null,
-        employeeName ?? null
+        employeeName ?? null,
+        sessionId ?? null,
+        sessionToken ?? null
       );
 
       const assistantMessage: Message = {
@@ -119,7 +126,8 @@ export const Chat: React.FC<ChatProps> = ({
         [...newMessages, assistantMessage],
         [...newHistory, { role: 'assistant', content: response.message }],
         response.employee_id,
-        response.employee_name
+        response.employee_name,
+        response.session_token ?? null
       );
 
     } catch (err) {
@@ -9,6 +9,7 @@ export interface ChatSession {
     timestamp: number;
     employeeId?: string | null;
     employeeName?: string | null;
+    sessionToken?: string | null;
 }
 
 const STORAGE_KEY = 'chat_sessions';